@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Check template-processor startup time against a budget.
+
+Runs the predefined-scheme paths (the most frequent theme switch) under
+`python3 -X importtime` and sums the import time of everything the CLI
+loads beyond bare interpreter startup. Bytecode caching is enabled and a
+warm-up run is discarded, matching a normal install. Exits non-zero if the
+median of any path exceeds the budget.
+
+Usage:
+    ./template-processor-startup.py
+    ./template-processor-startup.py --budget 40 --runs 9 --verbose
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent.resolve()
+ROOT = SCRIPT_DIR.parent.parent
+THEMING_DIR = SCRIPT_DIR.parent / "python" / "src" / "theming"
+PROCESSOR = THEMING_DIR / "template-processor.py"
+SCHEME = ROOT / "Assets" / "ColorScheme" / "Noctalia-default" / "Noctalia-default.json"
+
+
+def parse_importtime(stderr: str) -> dict[str, int]:
+    """Map top-level module name -> cumulative import time (us)."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # header line
+        name = fields[2].rstrip()
+        # Nested imports are indented below their parent; keep top-level only
+        if name.startswith("  "):
+            continue
+        modules[name.strip()] = int(fields[1])
+    return modules
+
+
+def run_importtime(args: list[str]) -> tuple[dict[str, int], float]:
+    """Run a command under -X importtime; return imports and wall time (ms)."""
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    start = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        capture_output=True, text=True, cwd=THEMING_DIR, env=env
+    )
+    wall = (time.perf_counter() - start) * 1000
+    if proc.returncode != 0:
+        print(proc.stderr, file=sys.stderr)
+        raise SystemExit(f"Command failed: {' '.join(args)}")
+    return parse_importtime(proc.stderr), wall
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Check template-processor startup time")
+    parser.add_argument("--budget", type=float, default=40.0, help="Import time budget in ms (default: 40)")
+    parser.add_argument("--runs", type=int, default=7, help="Runs per path; the median is compared (default: 7)")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Show the slowest imports per path")
+    args = parser.parse_args()
+
+    # Modules every interpreter loads (site, encodings, ...) are not ours to budget
+    baseline, _ = run_importtime(["-c", "pass"])
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp_dir = Path(tmp)
+        terminal_output = json.dumps({"foot": str(tmp_dir / "foot"), "kitty": str(tmp_dir / "kitty")})
+        paths = {
+            "scheme": [str(PROCESSOR), "--scheme", str(SCHEME), "-o", str(tmp_dir / "theme.json")],
+            "scheme+terminal": [str(PROCESSOR), "--scheme", str(SCHEME), "-o", str(tmp_dir / "theme.json"),
+                                "--terminal-output", terminal_output],
+        }
+
+        over_budget = False
+        for label, cmd in paths.items():
+            import_ms = []
+            wall_ms = []
+            slowest: dict[str, int] = {}
+            run_importtime(cmd)  # warm-up: writes bytecode caches
+            for _ in range(args.runs):
+                modules, wall = run_importtime(cmd)
+                own = {name: us for name, us in modules.items() if name not in baseline}
+                import_ms.append(sum(own.values()) / 1000)
+                wall_ms.append(wall)
+                for name, us in own.items():
+                    slowest[name] = max(slowest.get(name, 0), us)
+
+            median_import = statistics.median(import_ms)
+            status = "ok" if median_import <= args.budget else "OVER BUDGET"
+            over_budget |= median_import > args.budget
+            print(f"{label:16} imports {median_import:6.1f} ms  process {statistics.median(wall_ms):6.1f} ms  "
+                  f"(budget {args.budget:.0f} ms) {status}")
+
+            if args.verbose:
+                for name, us in sorted(slowest.items(), key=lambda item: -item[1])[:10]:
+                    print(f"    {us / 1000:6.1f} ms  {name}")
+
+    return 1 if over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
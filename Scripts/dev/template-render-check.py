@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Render every shipped template and fail on template errors.
+
+template-processor logs a template error, skips that output and still
+exits 0, so a renderer regression only shows up as a stale config file.
+This renders each file under Assets/Templates from a predefined scheme in
+one run and fails if any template reports an error or writes no output.
+
+Wallpaper themes write terminal themes with --terminal-output instead of
+the terminal templates, so it also derives a theme from a wallpaper and
+checks that the foot and ghostty themes carry the same colors as those
+templates rendered from the same theme.
+
+Usage:
+    ./template-render-check.py
+    ./template-render-check.py --scheme Assets/ColorScheme/Nord/Nord.json --image ~/wallpaper.png
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+SCRIPT_DIR = Path(__file__).parent.resolve()
+ROOT = SCRIPT_DIR.parent.parent
+THEMING_DIR = SCRIPT_DIR.parent / "python" / "src" / "theming"
+PROCESSOR = THEMING_DIR / "template-processor.py"
+TEMPLATES_DIR = ROOT / "Assets" / "Templates"
+SCHEME = ROOT / "Assets" / "ColorScheme" / "Noctalia-default" / "Noctalia-default.json"
+WALLPAPER = ROOT / "Assets" / "Wallpaper" / "noctalia.png"
+
+# Terminals whose shipped template follows the --terminal-output mapping
+COMPARED_TERMINALS = {"foot": "terminal/foot", "ghostty": "terminal/ghostty"}
+
+
+def shipped_templates() -> list[Path]:
+    return sorted(path for path in TEMPLATES_DIR.rglob("*") if path.is_file())
+
+
+def output_name(template: Path) -> str:
+    """Flat output file name for a template (terminal/foot -> terminal_foot)."""
+    return "_".join(template.relative_to(TEMPLATES_DIR).parts)
+
+
+def render_all(scheme: Path, out_dir: Path) -> list[str]:
+    """Render every shipped template; return a list of problems."""
+    templates = shipped_templates()
+    cmd = [sys.executable, str(PROCESSOR), "--scheme", str(scheme)]
+    for template in templates:
+        cmd += ["-r", f"{template}:{out_dir / output_name(template)}"]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+
+    problems = []
+    if proc.returncode != 0:
+        problems.append(f"template-processor exited with {proc.returncode}")
+    problems += [line for line in proc.stderr.splitlines() if "error" in line.lower() or line.startswith("Skipping")]
+    for template in templates:
+        if not (out_dir / output_name(template)).is_file():
+            problems.append(f"no output for {template.relative_to(TEMPLATES_DIR)}")
+    return problems
+
+
+def parse_terminal_theme(text: str) -> dict[str, str]:
+    """Color settings of a foot or ghostty theme, normalized (lowercase hex, no #)."""
+    colors = {}
+    for line in text.splitlines():
+        key, sep, value = line.partition("=")
+        if not sep:
+            continue
+        key = key.strip()
+        if key == "palette":
+            # ghostty: palette = <index>=<color>
+            index, _, value = value.partition("=")
+            key = f"palette {index.strip()}"
+        colors[key] = value.strip().lstrip("#").lower()
+    return colors
+
+
+def compare_terminals(image: Path, out_dir: Path) -> list[str]:
+    """Compare --terminal-output with the terminal templates for one wallpaper theme."""
+    terminal_outputs = {terminal_id: str(out_dir / terminal_id) for terminal_id in COMPARED_TERMINALS}
+    cmd = [sys.executable, str(PROCESSOR), str(image), "--no-cache", "--default-mode", "dark",
+           "--terminal-output", json.dumps(terminal_outputs)]
+    for terminal_id, template in COMPARED_TERMINALS.items():
+        cmd += ["-r", f"{TEMPLATES_DIR / template}:{out_dir / (terminal_id + '.template')}"]
+    proc = subprocess.run(cmd, capture_output=True, text=True)
+    if proc.returncode != 0:
+        return [f"template-processor exited with {proc.returncode}: {proc.stderr.strip()}"]
+
+    problems = []
+    for terminal_id in COMPARED_TERMINALS:
+        try:
+            generated = parse_terminal_theme((out_dir / terminal_id).read_text())
+            expected = parse_terminal_theme((out_dir / (terminal_id + ".template")).read_text())
+        except OSError as e:
+            problems.append(f"{terminal_id}: {e}")
+            continue
+        # The generator may write settings the template leaves unset (e.g. foot's cursor)
+        for key, value in expected.items():
+            if generated.get(key) != value:
+                problems.append(f"{terminal_id}: {key} is {generated.get(key)}, template has {value}")
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Render every shipped template and fail on errors")
+    parser.add_argument("--scheme", type=Path, default=SCHEME, help="Predefined scheme JSON (default: Noctalia-default)")
+    parser.add_argument("--image", type=Path, default=WALLPAPER, help="Wallpaper for the terminal comparison "
+                                                                      "(default: Assets/Wallpaper/noctalia.png)")
+    args = parser.parse_args()
+
+    failed = False
+    checks = [
+        (f"{len(shipped_templates())} templates", render_all, args.scheme),
+        ("terminal themes", compare_terminals, args.image),
+    ]
+    for label, check, source in checks:
+        with tempfile.TemporaryDirectory() as tmp:
+            problems = check(source, Path(tmp))
+        for problem in problems:
+            print(f"  {problem}")
+        print(f"{label}: {'FAILED' if problems else 'ok'}")
+        failed |= bool(problems)
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+"""
+Benchmark of the calendar backends on synthetic calendars, without any
+calendar service or account.
+
+Generates a vdir of .ics fixtures (single, all-day and recurring events,
+dense rules with EXDATE/RDATE/overrides, many timezones) and runs, on a
+window as long as the shell's default one (45 days, across DST changes):
+- recurrence: lib/ics parsing, timezone normalization and windowed
+  recurrence expansion, the core shared by every backend
+- vdir: vdir-events.py's index, cold and warm
+- khal: khal-events.py's database reader, on a khal database built from
+  the fixtures
+- eds: calendar-events.py's component normalization, fed ICalGLib
+  components through a fixture source instead of an EDS registry
+  (skipped when gi/ICalGLib are not installed)
+
+Reports VEVENTs/s, occurrences and peak memory. --json prints the
+results for CI; --baseline compares against a saved --json run and
+exits 1 on a regression.
+"""
+
+import argparse
+import calendar
+import importlib.util
+import json
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from lib.khal_db import read_khal_events
+from lib.recurrence import RecurrenceRule, expand_occurrences
+from lib.timezones import zone_for_tzid
+from lib.vdir import VdirIndex, find_calendars, parse_events
+
+SCRIPT_DIR = Path(__file__).resolve().parent
+
+# Fixture TZIDs: DST zones in both hemispheres, fixed-offset zones and
+# Evolution's prefixed form
+TZIDS = [
+    "Europe/Berlin", "Europe/London", "America/New_York", "America/Los_Angeles", "America/Sao_Paulo",
+    "Australia/Sydney", "Pacific/Auckland", "Asia/Tokyo", "Asia/Kolkata", "Africa/Nairobi", "UTC",
+    "/freeassociation.sourceforge.net/Europe/Paris", "/freeassociation.sourceforge.net/America/Chicago",
+]
+
+RULES = [
+    "FREQ=DAILY", "FREQ=DAILY;INTERVAL=2", "FREQ=DAILY;COUNT=30", "FREQ=WEEKLY", "FREQ=WEEKLY;INTERVAL=2",
+    "FREQ=WEEKLY;COUNT=20", "FREQ=MONTHLY", "FREQ=MONTHLY;INTERVAL=3", "FREQ=YEARLY", "FREQ=HOURLY;INTERVAL=6",
+]
+
+# Fixture DTSTARTs lie this far around the window start
+SPREAD_DAYS = 730
+
+KHAL_SCHEMA = """
+CREATE TABLE version (version INTEGER);
+CREATE TABLE calendars (calendar TEXT NOT NULL UNIQUE, resource TEXT NOT NULL, ctag TEXT);
+CREATE TABLE events (href TEXT NOT NULL, calendar TEXT NOT NULL, sequence INT, etag TEXT, item TEXT,
+                     primary key (href, calendar));
+CREATE TABLE recs_loc (dtstart INT NOT NULL, dtend INT NOT NULL, href TEXT NOT NULL REFERENCES events( href ),
+                       rec_inst TEXT NOT NULL, ref TEXT NOT NULL, dtype TEXT NOT NULL, calendar TEXT NOT NULL,
+                       primary key (href, rec_inst, calendar));
+CREATE TABLE recs_float (dtstart INT NOT NULL, dtend INT NOT NULL, href TEXT NOT NULL REFERENCES events( href ),
+                         rec_inst TEXT NOT NULL, ref TEXT NOT NULL, dtype TEXT NOT NULL, calendar TEXT NOT NULL,
+                         primary key (href, rec_inst, calendar));
+"""
+
+
+# --- Fixtures ---
+
+def ics_time(dt):
+    return dt.strftime("%Y%m%dT%H%M%S")
+
+def fixture_vevents(rng, uid, base):
+    """VEVENT blocks of one fixture file (a series may come with an override)."""
+    start = base + timedelta(days=rng.randint(-SPREAD_DAYS, SPREAD_DAYS // 4),
+                             minutes=15 * rng.randint(24, 80))
+    lines = [f"UID:{uid}", f"SUMMARY:Event {uid}", "LOCATION:Room 1",
+             "DESCRIPTION:Synthetic event\\nsecond line"]
+    kind = rng.random()
+    if kind < 0.1:
+        # All-day
+        lines.append(f"DTSTART;VALUE=DATE:{start:%Y%m%d}")
+        lines.append(f"DTEND;VALUE=DATE:{start + timedelta(days=rng.randint(1, 3)):%Y%m%d}")
+        return [lines]
+
+    tzid = rng.choice(TZIDS + [None, "Z"])
+    if tzid is None:
+        stamp = lambda dt: f":{ics_time(dt)}"  # floating
+    elif tzid == "Z":
+        stamp = lambda dt: f":{ics_time(dt)}Z"
+    else:
+        stamp = lambda dt: f";TZID={tzid}:{ics_time(dt)}"
+    lines.append("DTSTART" + stamp(start))
+    lines.append("DTEND" + stamp(start + timedelta(minutes=rng.choice([15, 30, 60, 90]))))
+    if kind < 0.5:
+        return [lines]
+
+    # Recurring, with exceptions
+    rule = rng.choice(RULES)
+    if rng.random() < 0.2 and "COUNT" not in rule:
+        rule += f";UNTIL={ics_time(base + timedelta(days=rng.randint(-30, 400)))}Z"
+    lines.append(f"RRULE:{rule}")
+    step = timedelta(days=7 if "WEEKLY" in rule else 1)
+    if "HOURLY" not in rule and "MONTHLY" not in rule and "YEARLY" not in rule:
+        exdates = [start + step * rng.randint(1, 60) for _ in range(rng.randint(0, 4))]
+        if exdates:
+            lines.append("EXDATE" + stamp(exdates[0]).split(":")[0] + ":"
+                         + ",".join(stamp(dt).split(":", 1)[1] for dt in exdates))
+    if rng.random() < 0.2:
+        lines.append("RDATE" + stamp(start + timedelta(days=rng.randint(1, 90), hours=3)))
+
+    vevents = [lines]
+    if rng.random() < 0.15 and "HOURLY" not in rule:
+        # A moved instance
+        rid = start + step * rng.randint(1, 10)
+        vevents.append([f"UID:{uid}", "RECURRENCE-ID" + stamp(rid), f"SUMMARY:Event {uid} (moved)",
+                        "DTSTART" + stamp(rid + timedelta(hours=2)), "DTEND" + stamp(rid + timedelta(hours=3))])
+    return vevents
+
+def generate_fixtures(root, calendars, events, base, seed):
+    """Write a vdir (one directory per calendar, one .ics per series) and return its directories."""
+    rng = random.Random(seed)
+    directories = []
+    for number in range(calendars):
+        directory = root / f"calendar-{number}"
+        directory.mkdir(parents=True, exist_ok=True)
+        (directory / "displayname").write_text(f"Calendar {number}\n")
+        directories.append(directory)
+    for number in range(events):
+        uid = f"event-{number}@benchmark"
+        body = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//noctalia//calendar-benchmark//EN"]
+        for lines in fixture_vevents(rng, uid, base):
+            body += ["BEGIN:VEVENT", *lines, "END:VEVENT"]
+        body.append("END:VCALENDAR")
+        (directories[number % calendars] / f"{number}.ics").write_text("\r\n".join(body) + "\r\n")
+    return directories
+
+def ics_files(directories):
+    return [path for directory in directories for path in sorted(directory.glob("*.ics"))]
+
+
+# --- Benchmarks ---
+
+def bench_recurrence(directories, start, end):
+    """Parse, normalize and expand every fixture file: (VEVENTs, occurrences)."""
+    vevents = occurrences = 0
+    for path in ics_files(directories):
+        events = parse_events(path.read_text())
+        vevents += len(events)
+        overridden = [event["rid"] for event in events if event["rid"] is not None]
+        for event in events:
+            rule = RecurrenceRule(*event["rule"]) if event["rule"] and event["rid"] is None else None
+            zone = zone_for_tzid(event["tzid"]) if event["tzid"] else None
+            exdates = event["exdates"] + (overridden if event["rid"] is None else [])
+            occurrences += len(expand_occurrences(event["start"], event["end"], rule, start, end,
+                                                  event["rdates"], exdates, zone))
+    return vevents, occurrences
+
+def bench_vdir(directories, index_path, start, end):
+    index = VdirIndex(index_path)
+    index.refresh(directories)
+    index.save()
+    vevents = sum(len(entry["events"]) for entry in index.files.values())
+    return vevents, len(index.occurrences(start, end))
+
+def float_time(timestamp):
+    """Wall-clock time of a local timestamp counted as UTC, like khal's recs_float."""
+    return calendar.timegm(datetime.fromtimestamp(timestamp).timetuple())
+
+def build_khal_db(directories, db_path, start, end):
+    """A khal (v5 layout) database of the fixtures, instances expanded around [start, end)."""
+    conn = sqlite3.connect(db_path)
+    conn.executescript(KHAL_SCHEMA)
+    conn.execute("INSERT INTO version VALUES (5)")
+    horizon = (start - 90 * 86400, end + 90 * 86400)
+    for directory in directories:
+        name = directory.name
+        conn.execute("INSERT INTO calendars VALUES (?, ?, ?)", (name, str(directory), ""))
+        for path in sorted(directory.glob("*.ics")):
+            item = path.read_text()
+            conn.execute("INSERT INTO events VALUES (?, ?, 0, '', ?)", (path.name, name, item))
+            events = parse_events(item)
+            overridden = [event["rid"] for event in events if event["rid"] is not None]
+            for event in events:
+                is_float = event["tzid"] is None
+                rule = RecurrenceRule(*event["rule"]) if event["rule"] and event["rid"] is None else None
+                zone = zone_for_tzid(event["tzid"]) if event["tzid"] else None
+                exdates = event["exdates"] + (overridden if event["rid"] is None else [])
+                ref = "PROTO" if event["rid"] is None else str(float_time(event["rid"]) if is_float else event["rid"])
+                for occ_start, occ_end in expand_occurrences(event["start"], event["end"], rule, *horizon,
+                                                             event["rdates"], exdates, zone):
+                    if is_float:
+                        occ_start, occ_end = float_time(occ_start), float_time(occ_end)
+                    conn.execute(
+                        f"INSERT OR REPLACE INTO {'recs_float' if is_float else 'recs_loc'} VALUES (?, ?, ?, ?, ?, ?, ?)",
+                        (occ_start, occ_end, path.name, str(occ_start), ref, "DATETIME", name)
+                    )
+    conn.commit()
+    conn.close()
+
+def bench_khal(db_path, vevents, start, end):
+    return vevents, len(read_khal_events(db_path, start, end, check_current=False))
+
+class FixtureSource:
+    """Stands in for an EDataServer.Source: one fixture calendar directory."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def get_uid(self):
+        return self.directory.name
+
+    def get_display_name(self):
+        return self.directory.name
+
+    def get_enabled(self):
+        return True
+
+    def objects(self, ICalGLib):
+        """VEVENTs of the calendar as ICalGLib components, as ECal.Client.get_object_list_sync() returns them."""
+        objects = []
+        for path in sorted(self.directory.glob("*.ics")):
+            root = ICalGLib.Component.new_from_string(path.read_text())
+            comp = root.get_first_component(ICalGLib.ComponentKind.VEVENT_COMPONENT)
+            while comp:
+                objects.append(comp)
+                comp = root.get_next_component(ICalGLib.ComponentKind.VEVENT_COMPONENT)
+        return objects
+
+def load_calendar_events():
+    """calendar-events.py as a module, or None if its gi dependencies are missing."""
+    spec = importlib.util.spec_from_file_location("calendar_events", SCRIPT_DIR / "calendar-events.py")
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    except (ImportError, ValueError):
+        return None
+    return module
+
+def eds_objects(module, directories):
+    return [(source, source.objects(module.ICalGLib)) for source in map(FixtureSource, directories)]
+
+def bench_eds(module, sources, start, end):
+    vevents = occurrences = 0
+    for source, objects in sources:
+        for obj in objects:
+            vevents += 1
+            occurrences += len(module.keyed_events(source, obj, start, end)[2])
+    return vevents, occurrences
+
+
+# --- Reporting ---
+
+def measure(name, run, with_memory):
+    """Time run() (and, separately, its peak traced memory)."""
+    began = time.perf_counter()
+    vevents, occurrences = run()
+    seconds = time.perf_counter() - began
+    result = {
+        "name": name,
+        "vevents": vevents,
+        "occurrences": occurrences,
+        "seconds": round(seconds, 4),
+        "vevents_per_sec": round(vevents / seconds, 1) if seconds > 0 else None,
+    }
+    if with_memory:
+        tracemalloc.start()
+        run()
+        result["peak_mib"] = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+        tracemalloc.stop()
+    return result
+
+def print_table(results):
+    print(f"{'benchmark':<20} {'VEVENTs':>8} {'occurrences':>12} {'seconds':>9} {'VEVENTs/s':>11} {'peak MiB':>9}")
+    for result in results:
+        if "skipped" in result:
+            print(f"{result['name']:<20} skipped: {result['skipped']}")
+            continue
+        print(f"{result['name']:<20} {result['vevents']:>8} {result['occurrences']:>12} {result['seconds']:>9.3f} "
+              f"{result['vevents_per_sec'] or 0:>11.1f} {result.get('peak_mib', '-'):>9}")
+
+def regressions(results, baseline_path, tolerance):
+    """Benchmarks whose VEVENTs/s fell more than `tolerance` below the baseline run."""
+    with open(baseline_path, "r") as f:
+        baseline = {result["name"]: result for result in json.load(f)["results"]}
+    slower = []
+    for result in results:
+        before = baseline.get(result["name"])
+        if before and before.get("vevents_per_sec") and result.get("vevents_per_sec") is not None:
+            if result["vevents_per_sec"] < before["vevents_per_sec"] * (1 - tolerance):
+                slower.append(f"{result['name']}: {result['vevents_per_sec']} VEVENTs/s, "
+                              f"baseline {before['vevents_per_sec']}")
+    return slower
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the calendar backends on synthetic .ics fixtures")
+    parser.add_argument("--events", type=int, default=5000, help="Fixture files (event series) to generate")
+    parser.add_argument("--calendars", type=int, default=8, help="Calendars to spread them over")
+    parser.add_argument("--start", default="2026-03-01", help="Window start (YYYY-MM-DD, spans DST changes by default)")
+    parser.add_argument("--days", type=int, default=45, help="Window length in days")
+    parser.add_argument("--seed", type=int, default=1, help="Fixture random seed")
+    parser.add_argument("--dir", type=Path, help="Write fixtures here and keep them (default: a temporary directory)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the (slower) peak memory pass")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    parser.add_argument("--baseline", type=Path, help="Fail if VEVENTs/s drops below this --json run's")
+    parser.add_argument("--tolerance", type=float, default=0.3, help="Allowed slowdown against --baseline (fraction)")
+    args = parser.parse_args()
+
+    base = datetime.strptime(args.start, "%Y-%m-%d")
+    start = int(base.timestamp())
+    end = int((base + timedelta(days=args.days)).timestamp())
+    with_memory = not args.no_memory
+
+    with tempfile.TemporaryDirectory(prefix="calendar-benchmark-") as tmp:
+        root = args.dir or Path(tmp) / "vdir"
+        generate_fixtures(root, args.calendars, args.events, base, args.seed)
+        directories = find_calendars([root])
+
+        results = [measure("recurrence", lambda: bench_recurrence(directories, start, end), with_memory)]
+
+        index_path = Path(tmp) / "vdir-index.json"
+        def cold_vdir():
+            index_path.unlink(missing_ok=True)
+            return bench_vdir(directories, index_path, start, end)
+        results.append(measure("vdir (cold index)", cold_vdir, with_memory))
+        results.append(measure("vdir (warm index)", lambda: bench_vdir(directories, index_path, start, end),
+                               with_memory))
+
+        db_path = Path(tmp) / "khal.db"
+        build_khal_db(directories, db_path, start, end)
+        vevents = results[0]["vevents"]
+        results.append(measure("khal database", lambda: bench_khal(db_path, vevents, start, end), with_memory))
+
+        module = load_calendar_events()
+        if module is None:
+            results.append({"name": "eds normalization", "skipped": "gi/ICalGLib not installed"})
+        else:
+            sources = eds_objects(module, directories)
+            results.append(measure("eds normalization", lambda: bench_eds(module, sources, start, end), with_memory))
+
+    report = {
+        "fixtures": {"events": args.events, "calendars": args.calendars, "start": args.start, "days": args.days,
+                     "seed": args.seed},
+        "results": results,
+    }
+    if args.json:
+        print(json.dumps(report, indent=4))
+    else:
+        print(f"{args.events} fixture files in {args.calendars} calendars, window {args.start} + {args.days} days")
+        print_table(results)
+
+    if args.baseline:
+        slower = regressions(results, args.baseline, args.tolerance)
+        for line in slower:
+            print(f"Regression: {line}", file=sys.stderr)
+        if slower:
+            sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -3,18 +3,40 @@ import gi
 gi.require_version('EDataServer', '1.2')
 gi.require_version('ECal', '2.0')
 gi.require_version('ICalGLib', "3.0")
-
-import json, sys
-from datetime import datetime, timedelta, timezone
-from zoneinfo import ZoneInfo
-from gi.repository import ECal, EDataServer, ICalGLib
-
-start_time = int(sys.argv[1])
-end_time = int(sys.argv[2])
-
-print(f"Starting with time range: {start_time} to {end_time}", file=sys.stderr)
-
-all_events = []
+gi.require_version('Gio', '2.0')
+
+import argparse, heapq, json, os, queue, sys, threading, time
+from datetime import datetime, timezone
+from gi.repository import ECal, EDataServer, Gio, GLib, ICalGLib
+
+from lib.recurrence import (
+    SECONDLY, MINUTELY, HOURLY, DAILY, WEEKLY, MONTHLY, YEARLY, RecurrenceRule, expand_occurrences
+)
+from lib.sources import SourceList
+from lib.shards import ShardCache, add_months, month_bounds, months_inside, months_overlapping
+from lib.timezones import wall_to_timestamp, zone_for_tzid
+
+# Seconds a calendar may take to connect and answer the range query. Calendars
+# are fetched concurrently; ones still running at the deadline (e.g. an
+# unreachable CalDAV server) are cancelled and the others are printed.
+SOURCE_DEADLINE = 10
+
+# --daemon: quiet period that batches view notifications into one message
+CHANGE_DEBOUNCE_MS = 250
+
+# Normalized events per calendar and month (see lib/shards.py)
+shards = ShardCache()
+
+def time_zone(ical_time):
+    """Zone of an ICalGLib.Time: UTC, its TZID's zone, or None (local) for dates and floating times."""
+    if hasattr(ical_time, "is_date") and ical_time.is_date():
+        return None
+    if ical_time.is_utc() if hasattr(ical_time, 'is_utc') else False:
+        return timezone.utc  # Explicit UTC time
+    tz_obj = ical_time.get_timezone() if hasattr(ical_time, 'get_timezone') else None
+    tzid = tz_obj.get_tzid() if tz_obj else None
+    # Resolved once per TZID, Evolution's prefix included
+    return zone_for_tzid(tzid) if tzid else None
 
 def safe_get_time(ical_time):
     if not ical_time:
@@ -25,31 +47,42 @@ def safe_get_time(ical_time):
         if is_all_day:
             # All-day events (birthdays, holidays) should not need
             # to be timezone converted
-            return int(datetime(year, month, day).timestamp()), True
+            return wall_to_timestamp(datetime(year, month, day), None), True
 
         hour, minute, second = ical_time.get_hour(), ical_time.get_minute(), ical_time.get_second()
-
-        # Determine timezone for proper conversion
-        tz_obj = ical_time.get_timezone() if hasattr(ical_time, 'get_timezone') else None
-        tzid = tz_obj.get_tzid() if tz_obj else None
-        tz = None
-        if ical_time.is_utc() if hasattr(ical_time, 'is_utc') else False:
-            tz = timezone.utc  # Explicit UTC time
-        elif tzid:
-            # Evolution uses non-standard format: /freeassociation.sourceforge.net/America/Los_Angeles
-            # Strip prefix to get IANA name: America/Los_Angeles
-            iana = tzid.replace('/freeassociation.sourceforge.net/', '') if tzid.startswith('/') else tzid
-            try: tz = ZoneInfo(iana)
-            except: pass
-
-        # Create timezone-aware datetime
-        dt = datetime(year, month, day, hour, minute, second, tzinfo=tz)
-        return int(dt.timestamp()), False
+        return wall_to_timestamp(datetime(year, month, day, hour, minute, second), time_zone(ical_time)), False
     except:
         return None, False
 
-def add_event(summary, calendar_name, start_ts, end_ts, location="", description="", all_day=False):
-    all_events.append({
+def recurrence_rule(recurrence):
+    """RecurrenceRule for an ICalGLib.Recurrence (None if it never repeats)."""
+    freq = int(recurrence.get_freq())
+    if freq not in (SECONDLY, MINUTELY, HOURLY, DAILY, WEEKLY, MONTHLY, YEARLY):
+        return None
+    until_ts, _ = safe_get_time(recurrence.get_until())
+    return RecurrenceRule(freq, recurrence.get_interval() or 1, max(0, recurrence.get_count()), until_ts)
+
+def rdate_time(prop):
+    """Start time of an RDATE property (a date-time or a period)."""
+    rdate = prop.get_rdate()  # ICalGLib.Datetimeperiod
+    ical_time = rdate.get_time()
+    if ical_time is None or ical_time.is_null_time():
+        ical_time = rdate.get_period().get_start()
+    return ical_time
+
+def property_times(comp, kind, get_time):
+    """Timestamps of every `kind` property (RDATE/EXDATE lists) of a component."""
+    times = []
+    prop = comp.get_first_property(kind)
+    while prop:
+        ts, _ = safe_get_time(get_time(prop))
+        if ts is not None:
+            times.append(ts)
+        prop = comp.get_next_property(kind)
+    return times
+
+def add_event(events, summary, calendar_name, start_ts, end_ts, location="", description="", all_day=False):
+    events.append({
         'calendar': calendar_name,
         'summary': summary,
         'start': start_ts,
@@ -58,175 +91,570 @@ def add_event(summary, calendar_name, start_ts, end_ts, location="", description
         'description': description
     })
 
-registry = EDataServer.SourceRegistry.new_sync(None)
-sources = registry.list_sources(EDataServer.SOURCE_EXTENSION_CALENDAR)
-
-for source in sources:
-    if not source.get_enabled():
-        continue
 
-    calendar_name = source.get_display_name()
-    print(f"\nProcessing calendar: {calendar_name}", file=sys.stderr)
+def time_range_query(start_time, end_time):
+    """EDS S-expression selecting events that occur in [start_time, end_time]."""
+    start_str = datetime.fromtimestamp(start_time).strftime("%Y%m%dT%H%M%S")
+    end_str = datetime.fromtimestamp(end_time).strftime("%Y%m%dT%H%M%S")
+    return f'(occur-in-time-range? (make-time "{start_str}") (make-time "{end_str}"))'
+
+def component_events(obj, calendar_name, start_time, end_time):
+    """Events (one per occurrence in the range) for one object returned by EDS."""
+    events = []
+    comp = None
+
+    if isinstance(obj, ICalGLib.Component):
+        comp = obj
+    elif isinstance(obj, ECal.Component):
+        try:
+            ical_str = obj.to_string()
+            temp_comp = ICalGLib.Component.new_from_string(ical_str)
+            if temp_comp.getName() == "VEVENT":
+                comp = temp_comp
+        except Exception:
+            comp = None
 
+    if not comp:
+        summary = getattr(obj, "get_summary", lambda: "(No title)")()
+        dtstart = getattr(obj, "get_dtstart", lambda: None)()
+        dtend = getattr(obj, "get_dtend", lambda: None)()
+        start_ts, all_day = safe_get_time(dtstart)
+        end_ts, _ = safe_get_time(dtend)
+        if start_ts:
+            if end_ts is None:
+                end_ts = start_ts + 3600
+            add_event(events, summary, calendar_name, start_ts, end_ts)
+        return events
+
+    summary = getattr(comp, "get_summary", lambda: "(No title)")()
+    dtstart = getattr(comp, "get_dtstart", lambda: None)()
+    dtend = getattr(comp, "get_dtend", lambda: None)()
+    start_ts, all_day = safe_get_time(dtstart)
+    end_ts, _ = safe_get_time(dtend)
+    if start_ts is None:
+        return events
+    if end_ts is None:
+        end_ts = start_ts + 3600
+
+    rule = None
+    rrule_prop = comp.get_first_property(ICalGLib.PropertyKind.RRULE_PROPERTY)
+    if rrule_prop:
+        rrule_value = rrule_prop.get_value()  # ICalGLib.Value
+
+        try:
+            recurrence = rrule_value.get_recur()  # -> ICalGLib.Recurrence
+
+        except AttributeError:
+            rrule_str = str(rrule_value)
+            recurrence = ICalGLib.Recurrence.new_from_string(rrule_str)
+
+        if recurrence:
+            rule = recurrence_rule(recurrence)
+
+    rdates = property_times(comp, ICalGLib.PropertyKind.RDATE_PROPERTY, rdate_time)
+
+    # --- normal event ---
+    if rule is None and not rdates:
+        add_event(events, summary, calendar_name, start_ts, end_ts)
+        return events
+
+    # --- recurrent events: only the occurrences in the query range ---
+    exdates = property_times(comp, ICalGLib.PropertyKind.EXDATE_PROPERTY, lambda prop: prop.get_exdate())
+    zone = time_zone(dtstart)
+    for occ_start, occ_end in expand_occurrences(start_ts, end_ts, rule, start_time, end_time, rdates, exdates, zone):
+        add_event(events, summary, calendar_name, occ_start, occ_end)
+    return events
+
+def component_id(obj):
+    """(UID, RECURRENCE-ID) of an EDS object; the RECURRENCE-ID is "" except for detached instances."""
+    uid = getattr(obj, "get_uid", lambda: "")() or ""
+    try:
+        recurrence_id = obj.get_recurrenceid() if isinstance(obj, ICalGLib.Component) else None
+    except Exception:
+        recurrence_id = None
+    rid = recurrence_id.as_ical_string() if recurrence_id and not recurrence_id.is_null_time() else ""
+    return uid, rid
+
+def keyed_events(source, obj, start_time, end_time):
+    """component_events() tagged with a "key" naming their calendar and component."""
+    uid, rid = component_id(obj)
+    key = f"{source.get_uid()}/{uid}/{rid}"
+    events = component_events(obj, source.get_display_name(), start_time, end_time)
+    for event in events:
+        event['key'] = key
+    return (uid, rid), key, events
+
+def source_revision(client, source):
+    """Revision that signs a calendar's event shards, or None (no caching).
+
+    EDS backends report a "revision" that changes with every edit; for a
+    local calendar without one, the calendar file's mtime is used.
+    """
+    try:
+        success, revision = client.get_backend_property_sync("revision", None)
+        if success and revision:
+            return revision
+    except Exception:
+        pass
+    data_home = os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share")
     try:
-        client = ECal.Client.connect_sync(source, ECal.ClientSourceType.EVENTS, 30, None)
+        stat = os.stat(os.path.join(data_home, "evolution", "calendar", source.get_uid(), "calendar.ics"))
+    except OSError:
+        return None
+    return f"mtime:{stat.st_mtime_ns}:{stat.st_size}"
 
-        start_dt = datetime.fromtimestamp(start_time)
-        end_dt = datetime.fromtimestamp(end_time)
-        start_str = start_dt.strftime("%Y%m%dT%H%M%S")
-        end_str = end_dt.strftime("%Y%m%dT%H%M%S")
+def fetch_source(source, cancellable, start_time, end_time):
+    """Connect to one calendar and return its events in the query range.
 
-        query = f'(occur-in-time-range? (make-time "{start_str}") (make-time "{end_str}"))'
-        success, raw_events = client.get_object_list_sync(query, None)
-        
-        if not success or not raw_events:
-            continue
+    Ranges whose months all have current shards are answered from the
+    shard cache; fetched ranges fill the shards of the months they cover.
+    """
+    events = []
+    client = ECal.Client.connect_sync(source, ECal.ClientSourceType.EVENTS, SOURCE_DEADLINE, cancellable)
 
-        for raw_obj in raw_events:
-            obj = raw_obj[1] if isinstance(raw_obj, tuple) else raw_obj
-            comp = None
+    revision = source_revision(client, source)
+    cached = shards.get_range(source.get_uid(), revision, start_time, end_time)
+    if cached is not None:
+        return cached
 
-            if isinstance(obj, ICalGLib.Component):
-                comp = obj
-            elif isinstance(obj, ECal.Component):
-                try:
-                    ical_str = obj.to_string()
-                    temp_comp = ICalGLib.Component.new_from_string(ical_str)
-                    if temp_comp.getName() == "VEVENT":
-                        comp = temp_comp
-                except Exception:
-                    comp = None
-
-            if not comp:
-                summary = getattr(obj, "get_summary", lambda: "(No title)")()
-                dtstart = getattr(obj, "get_dtstart", lambda: None)()
-                dtend = getattr(obj, "get_dtend", lambda: None)()
-                start_ts, all_day = safe_get_time(dtstart)
-                end_ts, _ = safe_get_time(dtend)
-                if start_ts:
-                    if end_ts is None:
-                        end_ts = start_ts + 3600
-                    add_event(summary, calendar_name, start_ts, end_ts)
-                continue
-
-            summary = getattr(comp, "get_summary", lambda: "(No title)")()
-            dtstart = getattr(comp, "get_dtstart", lambda: None)()
-            dtend = getattr(comp, "get_dtend", lambda: None)()
-            start_ts, all_day = safe_get_time(dtstart)
-            end_ts, _ = safe_get_time(dtend)
-            if end_ts is None and start_ts is not None:
-                end_ts = start_ts + 3600
+    query = time_range_query(start_time, end_time)
+    success, raw_events = client.get_object_list_sync(query, cancellable)
 
-            rrule_getter = getattr(comp, "get_first_property", None)
-            if rrule_getter:
-                rrule_prop = comp.get_first_property(73)  # ICAL_RRULE_PROPERTY
-                if rrule_prop:
-                    rrule_value = rrule_prop.get_value()  # ICalGLib.Value
-                    
-                    try:
-                        recurrence = rrule_value.get_recur()  # -> ICalGLib.Recurrence
-                        
-                    except AttributeError:
-                        rrule_str = str(rrule_value)
-                        recurrence = ICalGLib.Recurrence.new_from_string(rrule_str)
-
-                    if recurrence:
-                        freq = recurrence.get_freq()
-                        
-            rdates = getattr(comp, "get_rdate_list", lambda: [])()
-            exdates = getattr(comp, "get_exdate_list", lambda: [])()
-
-            # --- normal event ---
-            if not rrule_prop and not rdates:
-                add_event(summary, calendar_name, start_ts, end_ts)
-                continue
+    if success and raw_events:
+        for raw_obj in raw_events:
+            obj = raw_obj[1] if isinstance(raw_obj, tuple) else raw_obj
+            events.extend(keyed_events(source, obj, start_time, end_time)[2])
 
-            # --- recurrent events ---
-            if freq:
-                summary = comp.get_summary() or "(No title)"
-                dtstart = comp.get_dtstart()
-                dtend = comp.get_dtend()
-                start_ts, all_day = safe_get_time(dtstart)
-                end_ts, _ = safe_get_time(dtend)
-                if end_ts is None and start_ts is not None:
-                    end_ts = start_ts + 3600  # 1h default
-
-                interval = recurrence.get_interval() or 1
-                count = recurrence.get_count()
-                until_dt = recurrence.get_until()
-                until_ts, _ = safe_get_time(until_dt) if until_dt else (None, False)
-                if until_ts is None:
-                    until_ts = end_time
-
-                occurrences = []
-                current_ts = start_ts
-                added = 0
-
-                match freq:
-                    case 0: #SECONDLY
-                        delta = timedelta(seconds=interval)
-                        while (current_ts <= until_ts) and (not count or added < count):
-                            occurrences.append((current_ts, current_ts + (end_ts - start_ts)))
-                            current_ts += int(delta.total_seconds())
-                            added += 1
-
-                    case 1: #MINUTELY
-                        delta = timedelta(minutes=interval)
-                        while (current_ts <= until_ts) and (not count or added < count):
-                            occurrences.append((current_ts, current_ts + (end_ts - start_ts)))
-                            current_ts += int(delta.total_seconds())
-                            added += 1
-                            
-                    case 2: #HOURLY
-                        delta = timedelta(hours=interval)
-                        while (current_ts <= until_ts) and (not count or added < count):
-                            occurrences.append((current_ts, current_ts + (end_ts - start_ts)))
-                            current_ts += int(delta.total_seconds())
-                            added += 1
-
-                    case 3:  # DAILY
-                        delta = timedelta(days=interval)
-                        while (current_ts <= until_ts) and (not count or added < count):
-                            occurrences.append((current_ts, current_ts + (end_ts - start_ts)))
-                            current_ts += int(delta.total_seconds())
-                            added += 1
-
-                    case 4:  # WEEKLY
-                        delta = timedelta(weeks=interval)
-                        while (current_ts <= until_ts) and (not count or added < count):
-                            occurrences.append((current_ts, current_ts + (end_ts - start_ts)))
-                            current_ts += int(delta.total_seconds())
-                            added += 1
-
-                    case 5:  # MONTHLY
-                        from dateutil.relativedelta import relativedelta
-                        dt = datetime.fromtimestamp(current_ts)
-                        while (current_ts <= until_ts) and (not count or added < count):
-                            occurrences.append((current_ts, current_ts + (end_ts - start_ts)))
-                            dt += relativedelta(months=interval)
-                            current_ts = int(dt.timestamp())
-                            added += 1
-
-                    case 6:  # YEARLY
-                        from dateutil.relativedelta import relativedelta
-                        dt = datetime.fromtimestamp(current_ts)
-                        while (current_ts <= until_ts) and (not count or added < count):
-                            occurrences.append((current_ts, current_ts + (end_ts - start_ts)))
-                            dt += relativedelta(years=interval)
-                            current_ts = int(dt.timestamp())
-                            added += 1
-
-                    case _:  # NONE
-                        occurrences.append((start_ts, end_ts))
-
-                # --- add occurences to all_events ---
-                for occ_start, occ_end in occurrences:
-                    add_event(summary, calendar_name, occ_start, occ_end)
+    shards.put_range(source.get_uid(), revision, events, start_time, end_time)
+    return events
 
 
+def fetch_worker(source, cancellable, start_time, end_time, results):
+    """Thread body: fetch one calendar and report (uid, events, error)."""
+    try:
+        results.put((source.get_uid(), fetch_source(source, cancellable, start_time, end_time), None))
     except Exception as e:
-        print(f"  Error for {calendar_name}: {e}", file=sys.stderr)
-
-all_events.sort(key=lambda x: x['start'])
-print(json.dumps(all_events, indent=4))
-
+        results.put((source.get_uid(), [], e))
+
+
+def print_events(start_time, end_time, ndjson=False):
+    """One-shot mode: fetch every calendar and print one JSON array.
+
+    With ndjson, each calendar is printed as soon as it is fetched instead,
+    as one compact line shaped like a --daemon batch message.
+    """
+    print(f"Starting with time range: {start_time} to {end_time}", file=sys.stderr)
+
+    all_events = []
+    registry = EDataServer.SourceRegistry.new_sync(None)
+
+    # One daemon thread per calendar: connect/query calls block in C with the GIL
+    # released, and threads still stuck at the deadline must not delay exit
+    results = queue.Queue()
+    pending = {}
+    for source in SourceList(registry).sources():
+        print(f"\nProcessing calendar: {source.get_display_name()}", file=sys.stderr)
+        cancellable = Gio.Cancellable()
+        pending[source.get_uid()] = (source, cancellable)
+        threading.Thread(
+            target=fetch_worker, args=(source, cancellable, start_time, end_time, results), daemon=True
+        ).start()
+
+    deadline = time.monotonic() + SOURCE_DEADLINE
+    while pending:
+        try:
+            uid, events, error = results.get(timeout=max(0, deadline - time.monotonic()))
+        except queue.Empty:
+            break
+        source, _ = pending.pop(uid)
+        if error is not None:
+            print(f"  Error for {source.get_display_name()}: {error}", file=sys.stderr)
+        elif ndjson:
+            events.sort(key=snapshot_order)
+            print(json.dumps({"type": "batch", "start": start_time, "end": end_time, "calendar": uid,
+                              "events": events}, separators=(",", ":")), flush=True)
+        all_events.extend(events)
+
+    # Emit what finished; cancel the rest
+    for source, cancellable in pending.values():
+        print(f"  Timed out after {SOURCE_DEADLINE}s: {source.get_display_name()}", file=sys.stderr)
+        cancellable.cancel()
+
+    if not ndjson:
+        all_events.sort(key=lambda x: x['start'])
+        print(json.dumps(all_events, indent=4))
+
+    if pending:
+        # Don't wait for (or tear down under) threads still blocked in EDS calls
+        sys.stdout.flush()
+        os._exit(0)
+
+
+def snapshot_order(event):
+    """Total order for --daemon snapshots, so shard and live snapshots compare equal."""
+    return event['start'], event['end'], event['key']
+
+
+class LiveCalendar:
+    """--daemon state of one calendar: its client, live view and current events."""
+
+    def __init__(self, source):
+        self.source = source
+        self.name = source.get_display_name()
+        self.client = None
+        self.view = None
+        # Bumped per view request so replies for an old range are dropped
+        self.generation = 0
+        self.complete = False
+        # Connecting or loading the view failed: its (empty) events must not be cached
+        self.failed = False
+        # (uid, rid) -> (message key, events of that component in the range)
+        self.components = {}
+        # Months with a shard fetch in flight
+        self.prefetching = set()
+
+    def events(self):
+        return [event for _, component in self.components.values() for event in component]
+
+
+class CalendarDaemon:
+    """--daemon: stay connected to every calendar and stream changes.
+
+    Each calendar keeps an ECal.ClientView on the range, so EDS pushes
+    edits instead of being polled. Output is one compact JSON object per
+    line, sent only when something changed:
+        {"type": "batch", "start": ..., "end": ..., "calendar": "<uid>", "events": [...]}
+        {"type": "snapshot", "start": ..., "end": ..., "events": [...]}
+        {"type": "changes", "keys": [...], "events": [...]}
+        {"type": "error", "calendar": "...", "message": "..."}
+        {"type": "calendars", "calendars": [...]}
+    Events carry a "key" naming the component they came from, prefixed
+    with their calendar's UID. While a range loads, each calendar's events
+    are sent as a batch as soon as its view is complete, sorted like
+    snapshots, replacing that calendar's events; the snapshot that follows
+    is skipped when it holds exactly the batches sent. A snapshot replaces
+    all events; "changes" replaces the events of the listed keys (an empty
+    replacement means the component was removed). The calendar list is
+    sent at start and whenever the source registry changes it; added
+    calendars then stream their events as changes, removed ones have their
+    events removed.
+
+    Writing "START END" to stdin moves the range (a new snapshot follows);
+    EOF on stdin stops the daemon. When every month of the new range has
+    current shards, that snapshot is sent from them at once, and the live
+    views only send another one if they disagree. After each live snapshot
+    the months around the range are fetched into shards in the background,
+    so moving to the next or previous month is answered from disk.
+    """
+
+    def __init__(self, start_time, end_time):
+        self.start_time = start_time
+        self.end_time = end_time
+        self.loop = GLib.MainLoop()
+        self.calendars = {}
+        # Enabled calendar sources (lib/sources.py), set by run()
+        self.sources = None
+        # Message key -> replacement events, collected until the next flush
+        self.changed = {}
+        self.snapshot_due = True
+        self.flush_id = 0
+        self.deadline_id = 0
+        self.stdin_buffer = b""
+        # Events of the last snapshot (or the batches) sent for the current range
+        self.snapshot_events = None
+        # Calendars are sent as batches until the range's first snapshot
+        self.send_batches = True
+
+    def run(self):
+        registry = EDataServer.SourceRegistry.new_sync(None)
+        self.sources = SourceList(registry, self.on_sources_changed)
+        self.emit({"type": "calendars", "calendars": self.sources.calendars()})
+        for source in self.sources.sources():
+            self.add_calendar(source)
+
+        GLib.unix_fd_add_full(GLib.PRIORITY_DEFAULT, sys.stdin.fileno(),
+                              GLib.IOCondition.IN | GLib.IOCondition.HUP, self.on_stdin)
+        self.start_deadline()
+        self.check_complete()
+        try:
+            self.loop.run()
+        except KeyboardInterrupt:
+            pass
+
+    @staticmethod
+    def emit(message):
+        print(json.dumps(message, separators=(",", ":")), flush=True)
+
+    def report_error(self, calendar, message):
+        self.emit({"type": "error", "calendar": calendar.name, "message": message})
+
+    # --- Clients and views ---
+
+    def add_calendar(self, source):
+        calendar = LiveCalendar(source)
+        self.calendars[source.get_uid()] = calendar
+        ECal.Client.connect(source, ECal.ClientSourceType.EVENTS, SOURCE_DEADLINE, None, self.on_connected, calendar)
+
+    def on_sources_changed(self, calendars):
+        self.emit({"type": "calendars", "calendars": calendars})
+        sources = {source.get_uid(): source for source in self.sources.sources()}
+        for uid in [uid for uid in self.calendars if uid not in sources]:
+            calendar = self.calendars.pop(uid)
+            if calendar.view is not None:
+                calendar.view.stop()
+                calendar.view = None
+            calendar.generation += 1
+            for key, _ in calendar.components.values():
+                self.changed[key] = []
+        for uid, source in sources.items():
+            if uid not in self.calendars:
+                self.add_calendar(source)
+        self.schedule_flush()
+        self.check_complete()
+
+    def on_connected(self, _source_object, result, calendar):
+        if self.calendars.get(calendar.source.get_uid()) is not calendar:
+            return  # removed from the registry meanwhile
+        try:
+            calendar.client = ECal.Client.connect_finish(result)
+        except GLib.Error as e:
+            self.report_error(calendar, e.message)
+            calendar.complete = calendar.failed = True
+            self.check_complete()
+            return
+        self.open_view(calendar)
+
+    def open_view(self, calendar):
+        if calendar.view is not None:
+            calendar.view.stop()
+            calendar.view = None
+        calendar.generation += 1
+        calendar.complete = False
+        calendar.failed = False
+        calendar.components = {}
+        query = time_range_query(self.start_time, self.end_time)
+        calendar.client.get_view(query, None, self.on_view, (calendar, calendar.generation))
+
+    def on_view(self, client, result, request):
+        calendar, generation = request
+        try:
+            _, view = client.get_view_finish(result)
+        except GLib.Error as e:
+            if generation == calendar.generation:
+                self.report_error(calendar, e.message)
+                calendar.complete = calendar.failed = True
+                self.check_complete()
+            return
+        if generation != calendar.generation:
+            return
+
+        calendar.view = view
+        view.connect("objects-added", self.on_objects_changed, calendar)
+        view.connect("objects-modified", self.on_objects_changed, calendar)
+        view.connect("objects-removed", self.on_objects_removed, calendar)
+        view.connect("complete", self.on_view_complete, calendar)
+        view.start()
+
+    def on_objects_changed(self, view, objects, calendar):
+        if view is not calendar.view:
+            return
+        for comp in objects:
+            item, key, events = keyed_events(calendar.source, comp, self.start_time, self.end_time)
+            calendar.components[item] = (key, events)
+            self.changed[key] = events
+        self.schedule_flush()
+
+    def on_objects_removed(self, view, component_ids, calendar):
+        if view is not calendar.view:
+            return
+        for component_id in component_ids:
+            uid, rid = component_id.get_uid(), component_id.get_rid() or ""
+            # Removing a series (no RECURRENCE-ID) also removes its detached instances
+            removed = [item for item in calendar.components if item[0] == uid and (not rid or item[1] == rid)]
+            for item in removed:
+                key, _ = calendar.components.pop(item)
+                self.changed[key] = []
+        self.schedule_flush()
+
+    def on_view_complete(self, view, error, calendar):
+        if view is not calendar.view:
+            return
+        if error is not None:
+            self.report_error(calendar, error.message)
+            calendar.failed = True
+        calendar.complete = True
+        if not calendar.failed:
+            self.send_batch(calendar)
+        self.check_complete()
+
+    # --- Output ---
+
+    def check_complete(self):
+        if self.snapshot_due and all(calendar.complete for calendar in self.calendars.values()):
+            self.send_snapshot()
+
+    def send_batch(self, calendar):
+        """Send a calendar's events on their own while the range's snapshot is pending."""
+        if not self.snapshot_due or not self.send_batches:
+            return
+        events = sorted(calendar.events(), key=snapshot_order)
+        self.emit({"type": "batch", "start": self.start_time, "end": self.end_time,
+                   "calendar": calendar.source.get_uid(), "events": events})
+        # What the receiver now holds, so an identical snapshot can be skipped
+        self.snapshot_events = list(heapq.merge(self.snapshot_events or [], events, key=snapshot_order))
+
+    def start_deadline(self):
+        if self.deadline_id:
+            GLib.source_remove(self.deadline_id)
+        self.deadline_id = GLib.timeout_add_seconds(SOURCE_DEADLINE, self.on_deadline)
+
+    def on_deadline(self):
+        self.deadline_id = 0
+        if self.snapshot_due:
+            for calendar in self.calendars.values():
+                if not calendar.complete:
+                    self.report_error(calendar, f"Timed out after {SOURCE_DEADLINE}s")
+            self.send_snapshot()
+        return GLib.SOURCE_REMOVE
+
+    def send_snapshot(self):
+        self.snapshot_due = False
+        self.changed.clear()
+        if self.deadline_id:
+            GLib.source_remove(self.deadline_id)
+            self.deadline_id = 0
+        events = [event for calendar in self.calendars.values() for event in calendar.events()]
+        events.sort(key=snapshot_order)
+        if events != self.snapshot_events:
+            self.snapshot_events = events
+            self.emit({"type": "snapshot", "start": self.start_time, "end": self.end_time, "events": events})
+        self.update_shards()
+
+    # --- Shards ---
+
+    def send_cached_snapshot(self):
+        """Send the range's snapshot from shards if every calendar has them."""
+        events = []
+        for calendar in self.calendars.values():
+            if calendar.client is None:
+                if calendar.failed:
+                    continue  # never connected, has no events
+                return
+            cached = shards.get_range(calendar.source.get_uid(), source_revision(calendar.client, calendar.source),
+                                      self.start_time, self.end_time)
+            if cached is None:
+                return
+            events.extend(cached)
+        events.sort(key=snapshot_order)
+        self.snapshot_events = events
+        self.send_batches = False
+        self.emit({"type": "snapshot", "start": self.start_time, "end": self.end_time, "events": events})
+
+    def update_shards(self):
+        """Store the months the live views cover and prefetch the ones around them."""
+        months = months_overlapping(self.start_time, self.end_time)
+        covered = set(months_inside(self.start_time, self.end_time))
+        # Partly covered months of the range and one month on either side
+        wanted = [month for month in (add_months(months[0], -1), *months, add_months(months[-1], 1))
+                  if month not in covered]
+        for calendar in self.calendars.values():
+            if calendar.client is None or not calendar.complete or calendar.failed:
+                continue
+            uid = calendar.source.get_uid()
+            revision = source_revision(calendar.client, calendar.source)
+            if revision is None:
+                continue
+            shards.put_range(uid, revision, calendar.events(), self.start_time, self.end_time)
+            for month in shards.missing(uid, revision, wanted):
+                if month not in calendar.prefetching:
+                    calendar.prefetching.add(month)
+                    start, end = month_bounds(month)
+                    calendar.client.get_object_list(time_range_query(start, end), None, self.on_prefetched,
+                                                    (calendar, month, revision))
+
+    def on_prefetched(self, client, result, request):
+        calendar, month, revision = request
+        calendar.prefetching.discard(month)
+        try:
+            _, objects = client.get_object_list_finish(result)
+        except GLib.Error:
+            return
+        start, end = month_bounds(month)
+        events = [event for obj in objects or [] for event in keyed_events(calendar.source, obj, start, end)[2]]
+        shards.put(calendar.source.get_uid(), month, revision, events)
+
+    def schedule_flush(self):
+        # Before the snapshot, changes are simply part of it
+        if not self.snapshot_due and not self.flush_id:
+            self.flush_id = GLib.timeout_add(CHANGE_DEBOUNCE_MS, self.flush_changes)
+
+    def flush_changes(self):
+        self.flush_id = 0
+        if self.changed and not self.snapshot_due:
+            events = [event for component in self.changed.values() for event in component]
+            events.sort(key=lambda x: x['start'])
+            self.emit({"type": "changes", "keys": sorted(self.changed), "events": events})
+            self.changed.clear()
+            # The edit changed the calendar's revision: re-sign its shards
+            self.update_shards()
+        return GLib.SOURCE_REMOVE
+
+    # --- Range changes ---
+
+    def on_stdin(self, fd, condition):
+        data = os.read(fd, 4096) if condition & GLib.IOCondition.IN else b""
+        if not data:
+            self.loop.quit()
+            return GLib.SOURCE_REMOVE
+        *lines, self.stdin_buffer = (self.stdin_buffer + data).split(b"\n")
+        for line in lines:
+            try:
+                start_time, end_time = (int(value) for value in line.split())
+            except ValueError:
+                if line.strip():
+                    print(f"Ignoring invalid range: {line.decode(errors='replace')}", file=sys.stderr)
+                continue
+            self.set_range(start_time, end_time)
+        return GLib.SOURCE_CONTINUE
+
+    def set_range(self, start_time, end_time):
+        """Re-query every calendar for a new range; unchanged ranges are ignored."""
+        if (start_time, end_time) == (self.start_time, self.end_time):
+            return
+        self.start_time, self.end_time = start_time, end_time
+        self.snapshot_due = True
+        self.snapshot_events = None
+        self.send_batches = True
+        self.changed.clear()
+        self.send_cached_snapshot()
+        for calendar in self.calendars.values():
+            # Calendars still connecting open their view with the new range;
+            # failed ones stay complete (and empty)
+            if calendar.client is not None:
+                self.open_view(calendar)
+        self.start_deadline()
+        self.check_complete()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print Evolution Data Server events in a time range")
+    parser.add_argument("start", type=int, help="Range start (Unix timestamp)")
+    parser.add_argument("end", type=int, help="Range end (Unix timestamp)")
+    parser.add_argument(
+        "--daemon", action="store_true",
+        help="Stay connected and print JSON lines on changes; read new 'START END' ranges from stdin"
+    )
+    parser.add_argument(
+        "--ndjson", action="store_true",
+        help="Print one compact JSON line per calendar as soon as it is fetched (one-shot mode)"
+    )
+    args = parser.parse_args()
+
+    if args.daemon:
+        CalendarDaemon(args.start, args.end).run()
+    else:
+        print_events(args.start, args.end, args.ndjson)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+import argparse
+import json
+
+from lib.sources import SourceList
+
+def load_eds():
+    """(EDataServer module, None) if the EDS libraries can be loaded, else (None, reason)."""
+    try:
+        import gi
+        gi.require_version('EDataServer', '1.2')
+        gi.require_version('ECal', '2.0')
+        from gi.repository import ECal, EDataServer
+    except (ImportError, ValueError) as e:
+        return None, str(e)
+    return EDataServer, None
+
+def enabled_calendars(EDataServer):
+    """(calendars, None), or ([], reason) if the registry service can't be reached."""
+    from gi.repository import GLib
+    try:
+        registry = EDataServer.SourceRegistry.new_sync(None)
+    except GLib.Error as e:
+        return [], e.message
+    return SourceList(registry).calendars(), None
+
+def check():
+    _, error = load_eds()
+    print("available" if error is None else f"unavailable: {error}")
+
+def list_calendars():
+    EDataServer, error = load_eds()
+    if error is not None:
+        raise SystemExit(f"Error: {error}")
+    calendars, error = enabled_calendars(EDataServer)
+    if error is not None:
+        raise SystemExit(f"Error: {error}")
+    print(json.dumps(calendars))
+
+def probe():
+    EDataServer, error = load_eds()
+    if error is not None:
+        print(json.dumps({'available': False, 'error': error}))
+        return
+    # The libraries load but the registry service failed: still available, no calendars yet
+    calendars, error = enabled_calendars(EDataServer)
+    result = {'available': True, 'calendars': calendars}
+    if error is not None:
+        result['error'] = error
+    print(json.dumps(result))
+
+def main():
+    parser = argparse.ArgumentParser(description="Evolution Data Server availability and calendar list")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+    subcommands.add_parser("check", help="Print 'available' or 'unavailable: <reason>'")
+    subcommands.add_parser("list", help="Print the enabled calendars as a JSON array")
+    subcommands.add_parser("probe", help="Both at once, as {available, calendars[, error]} or {available, error}")
+    args = parser.parse_args()
+
+    {"check": check, "list": list_calendars, "probe": probe}[args.command]()
+
+if __name__ == '__main__':
+    main()
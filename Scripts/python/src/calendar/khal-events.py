@@ -1,12 +1,15 @@
 #!/usr/bin/env python3
+import argparse
 import json
 import os
 import re
 import subprocess
 import sys
-from datetime import datetime
+from datetime import datetime, timedelta
 from pathlib import Path
 
+from lib.khal_db import UnsupportedDatabase, default_db_path, read_khal_events
+
 def get_khal_date_format():
     """Read the khal config and extract the longdatetimeformat."""
     xdg_config = os.environ.get('XDG_CONFIG_HOME', os.path.expanduser('~/.config'))
@@ -39,10 +42,32 @@ def convert_event(event, khal_format):
     event['end-long-full'] = from_khal(event.get('end-long-full', ''), khal_format)
     return event
 
-def main():
-    start_date = sys.argv[1]
-    duration = sys.argv[2]
+def parse_duration(duration):
+    """Days in a khal duration such as "45d" or "2w" (None for other forms)."""
+    m = re.match(r'^(\d+)([dw])$', duration.strip())
+    if not m:
+        return None
+    return int(m.group(1)) * (7 if m.group(2) == 'w' else 1)
+
+def print_days(events):
+    """Print events like `khal list --json`: one JSON array per start day."""
+    day, day_events = None, []
+    for event in events:
+        event_day = event['start-long-full'][:10]
+        if event_day != day and day_events:
+            print(json.dumps(day_events))
+            day_events = []
+        day = event_day
+        day_events.append(event)
+    if day_events:
+        print(json.dumps(day_events))
+
+def list_from_db(db_path, start_date, days, check_current):
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = start + timedelta(days=days)
+    print_days(read_khal_events(db_path, int(start.timestamp()), int(end.timestamp()), check_current))
 
+def list_from_cli(start_date, duration):
     khal_format = get_khal_date_format()
     khal_start = to_khal(start_date, khal_format)
 
@@ -67,5 +92,28 @@ def main():
         day_events = json.loads(line)
         print(json.dumps([convert_event(e, khal_format) for e in day_events]))
 
+def main():
+    parser = argparse.ArgumentParser(description="Print khal events as JSON lines (one array per day)")
+    parser.add_argument("start_date", help="First day (YYYY-MM-DD)")
+    parser.add_argument("duration", help="khal duration, e.g. 45d")
+    parser.add_argument("--db", type=Path, help="Read this khal database as is (e.g. a test fixture)")
+    parser.add_argument("--cli", action="store_true", help="Always run khal instead of reading its database")
+    args = parser.parse_args()
+
+    # khal's own database answers without starting khal; when it can't be
+    # used (unknown layout, not refreshed since the calendars changed) khal
+    # runs instead, which also brings the database up to date
+    days = parse_duration(args.duration)
+    if not args.cli and days is not None:
+        try:
+            list_from_db(args.db or default_db_path(), args.start_date, days, check_current=args.db is None)
+            return
+        except UnsupportedDatabase as e:
+            if args.db is not None:
+                print(f"Error: {e}", file=sys.stderr)
+                sys.exit(1)
+
+    list_from_cli(args.start_date, args.duration)
+
 if __name__ == '__main__':
     main()
@@ -0,0 +1,16 @@
+"""
+Calendar library - backend-independent helpers for the calendar scripts.
+
+This package provides:
+- Windowed recurrence expansion (RRULE/RDATE/EXDATE)
+- Cached TZID resolution and DST-aware wall-clock conversion
+- Per-month shard cache of normalized events
+- A minimal iCalendar reader
+- khal's SQLite database reader
+- vdir calendars (.ics directories) with a persistent parse index
+- Calendar source listing cached between registry notifications
+
+Modules do not import gi, so they can be used (and benchmarked) without
+Evolution Data Server installed. Scripts import submodules directly, e.g.
+`from lib.recurrence import expand_occurrences`.
+"""
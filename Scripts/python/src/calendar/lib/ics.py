@@ -0,0 +1,186 @@
+"""
+Minimal iCalendar (RFC 5545) reader.
+
+Covers what event listing needs: content lines are unfolded and split into
+name, parameters and value, and components (VCALENDAR, VEVENT, ...) nest
+into a tree. TEXT values are unescaped on request; DATE and DATE-TIME
+values are parsed together with their TZID. Unknown properties and
+components are kept but not interpreted.
+"""
+
+from dataclasses import dataclass, field
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Iterator, Optional
+
+from .timezones import zone_for_tzid
+
+# dur-value: [+/-]P(nW | nD[T...] | T[nH][nM][nS])
+_DURATION = re.compile(r"^([+-])?P(?:(\d+)W)?(?:(\d+)D)?(?:T(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?)?$")
+
+
+@dataclass
+class Property:
+    """One content line: NAME;PARAM=value:VALUE."""
+    name: str
+    value: str
+    params: dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class Component:
+    """A BEGIN/END block with its properties and nested components."""
+    name: str
+    properties: list[Property] = field(default_factory=list)
+    components: list["Component"] = field(default_factory=list)
+
+    def get(self, name: str) -> Optional[Property]:
+        for prop in self.properties:
+            if prop.name == name:
+                return prop
+        return None
+
+    def get_all(self, name: str) -> list[Property]:
+        return [prop for prop in self.properties if prop.name == name]
+
+    def text(self, name: str, default: str = "") -> str:
+        """Unescaped TEXT value of the first `name` property."""
+        prop = self.get(name)
+        return unescape_text(prop.value) if prop else default
+
+    def walk(self, name: str) -> Iterator["Component"]:
+        """Nested components called `name`, depth first."""
+        for component in self.components:
+            if component.name == name:
+                yield component
+            yield from component.walk(name)
+
+
+def unfold(text: str) -> Iterator[str]:
+    """Logical content lines (continuation lines start with a space or tab)."""
+    current = None
+    for line in text.splitlines():
+        if line[:1] in (" ", "\t") and current is not None:
+            current += line[1:]
+            continue
+        if current:
+            yield current
+        current = line
+    if current:
+        yield current
+
+
+def parse_line(line: str) -> Optional[Property]:
+    """Split a content line; None if it has no value separator."""
+    params = {}
+    in_quotes = False
+    name_end = None
+    param_start = None
+    for index, char in enumerate(line):
+        if char == '"':
+            in_quotes = not in_quotes
+        elif in_quotes:
+            continue
+        elif char in ";:":
+            if name_end is None:
+                name_end = index
+            elif param_start is not None:
+                key, _, value = line[param_start:index].partition("=")
+                params[key.upper()] = value.replace('"', "")
+            if char == ":":
+                return Property(line[:name_end].upper(), line[index + 1:], params)
+            param_start = index + 1
+    return None
+
+
+def parse_components(text: str) -> list[Component]:
+    """Top-level components of an iCalendar stream (usually one VCALENDAR)."""
+    roots: list[Component] = []
+    stack: list[Component] = []
+    for line in unfold(text):
+        prop = parse_line(line)
+        if prop is None:
+            continue
+        if prop.name == "BEGIN":
+            component = Component(prop.value.strip().upper())
+            (stack[-1].components if stack else roots).append(component)
+            stack.append(component)
+        elif prop.name == "END":
+            name = prop.value.strip().upper()
+            # Tolerate missing END lines: close up to the matching BEGIN
+            while stack:
+                if stack.pop().name == name:
+                    break
+        elif stack:
+            stack[-1].properties.append(prop)
+    return roots
+
+
+def unescape_text(value: str) -> str:
+    """Decode TEXT escapes (\\n, \\, \\; \\\\)."""
+    if "\\" not in value:
+        return value
+    out = []
+    chars = iter(value)
+    for char in chars:
+        if char == "\\":
+            escaped = next(chars, "")
+            out.append("\n" if escaped in ("n", "N") else escaped)
+        else:
+            out.append(char)
+    return "".join(out)
+
+
+def parse_date_time(prop: Property) -> tuple[datetime, bool]:
+    """Value of a DATE or DATE-TIME property and whether it is a DATE.
+
+    DATE values and floating times are naive; UTC ("Z") and TZID times
+    are aware. A TZID that cannot be resolved is treated as local time.
+
+    Raises:
+        ValueError: If the value is not a valid DATE or DATE-TIME
+    """
+    value = prop.value.strip()
+    if prop.params.get("VALUE") == "DATE" or len(value) == 8:
+        return datetime.strptime(value[:8], "%Y%m%d"), True
+
+    dt = datetime.strptime(value[:15], "%Y%m%dT%H%M%S")
+    if value.endswith("Z"):
+        return dt.replace(tzinfo=timezone.utc), False
+    tzid = prop.params.get("TZID")
+    zone = zone_for_tzid(tzid) if tzid else None
+    return (dt.replace(tzinfo=zone) if zone else dt), False
+
+
+def parse_date_time_list(prop: Property) -> list[tuple[datetime, bool]]:
+    """Values of a comma-separated RDATE/EXDATE; a PERIOD contributes its start."""
+    values = []
+    for value in prop.value.split(","):
+        value = value.split("/", 1)[0].strip()
+        if value:
+            values.append(parse_date_time(Property(prop.name, value, prop.params)))
+    return values
+
+
+def parse_duration(value: str) -> timedelta:
+    """A DURATION value such as PT1H30M or P1D.
+
+    Raises:
+        ValueError: If the value is not a valid duration
+    """
+    m = _DURATION.match(value.strip().upper())
+    if not m or value.strip().upper() in ("P", "-P", "+P"):
+        raise ValueError(f"Invalid duration: {value}")
+    weeks, days, hours, minutes, seconds = (int(part or 0) for part in m.groups()[1:])
+    duration = timedelta(weeks=weeks, days=days, hours=hours, minutes=minutes, seconds=seconds)
+    return -duration if m.group(1) == "-" else duration
+
+
+def rrule_parts(value: str) -> dict[str, str]:
+    """RRULE value split into its parts, e.g. {"FREQ": "WEEKLY", "COUNT": "3"}."""
+    parts = {}
+    for part in value.split(";"):
+        key, _, part_value = part.partition("=")
+        if key:
+            parts[key.strip().upper()] = part_value.strip()
+    return parts
@@ -0,0 +1,180 @@
+"""
+Direct reader for khal's SQLite cache.
+
+khal mirrors its calendars into an SQLite database with recurring events
+already expanded into one row per instance: recs_loc holds instances with
+a timezone (dtstart/dtend as Unix time), recs_float all-day and floating
+ones (wall-clock time counted as if it were UTC). Reading it replaces a
+`khal list` run and the round trip through khal's localized date format.
+
+Only layouts listed in KHAL_DB_VERSIONS are read. A database with another
+layout, or one older than its calendar directories (khal refreshes it
+only when it runs), raises UnsupportedDatabase so callers can fall back
+to the khal CLI.
+"""
+
+import calendar
+import os
+import re
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from .ics import Component, parse_components, parse_date_time
+from .paths import xdg_data_home
+
+# khal's backend.DB_VERSION values this reader understands
+KHAL_DB_VERSIONS = (5,)
+
+_EPOCH = datetime(1970, 1, 1)
+
+_INSTANCE_QUERY = """
+SELECT r.dtstart, r.dtend, r.href, r.ref, r.dtype, events.calendar, events.item
+FROM {table} AS r JOIN events ON r.href = events.href AND r.calendar = events.calendar
+WHERE r.dtstart < :end AND (r.dtend > :start OR r.dtstart >= :start)
+"""
+
+
+class UnsupportedDatabase(Exception):
+    """The khal database is missing, out of date or has an unknown layout."""
+
+
+def default_db_path() -> Path:
+    """khal's database: [sqlite] path from the khal config, else the XDG default."""
+    xdg_config = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+    config_path = Path(xdg_config) / "khal" / "config"
+    try:
+        section = None
+        with open(config_path, "r") as f:
+            for line in f:
+                if m := re.match(r"^\s*\[\s*([^\[\]]+?)\s*\]\s*$", line):
+                    section = m.group(1)
+                elif section == "sqlite" and (m := re.match(r"^\s*path\s*=\s*(.+?)\s*$", line)):
+                    return Path(os.path.expandvars(os.path.expanduser(m.group(1))))
+    except OSError:
+        pass
+    return xdg_data_home() / "khal" / "khal.db"
+
+
+def _open(db_path: Path) -> sqlite3.Connection:
+    """Read-only connection to a khal database with a known layout."""
+    if not db_path.is_file():
+        raise UnsupportedDatabase(f"{db_path} does not exist")
+    try:
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        row = conn.execute("SELECT version FROM version").fetchone()
+    except sqlite3.Error as e:
+        raise UnsupportedDatabase(f"cannot read {db_path}: {e}")
+    if row is None or row[0] not in KHAL_DB_VERSIONS:
+        conn.close()
+        raise UnsupportedDatabase(f"unknown khal database version {row[0] if row else None}")
+    return conn
+
+
+def _check_current(conn: sqlite3.Connection):
+    """Raise UnsupportedDatabase if a calendar directory changed since khal last synced it.
+
+    khal stores a ctag per calendar: the directory's mtime, formatted like
+    khal's vdir.get_etag_from_file(). A vdirsyncer run changes it.
+    """
+    for name, resource, ctag in conn.execute("SELECT calendar, resource, ctag FROM calendars"):
+        try:
+            mtime_ns = os.stat(resource).st_mtime_ns
+        except OSError:
+            raise UnsupportedDatabase(f"calendar {name} is missing ({resource})")
+        if ctag != f"{mtime_ns:.9f}":
+            raise UnsupportedDatabase(f"calendar {name} changed since khal last ran")
+
+
+def _float_time(timestamp: int) -> int:
+    """Wall-clock time of a local timestamp, counted as UTC (recs_float's clock)."""
+    return calendar.timegm(datetime.fromtimestamp(timestamp).timetuple())
+
+
+def _instance_key(ref: str) -> str:
+    """Normalize a recs_* ref ("PROTO" or a Unix time, possibly "123.0")."""
+    try:
+        return str(int(float(ref)))
+    except ValueError:
+        return ref
+
+
+def _unix_time(dt: datetime) -> int:
+    """khal's to_unix_time(): aware times in UTC, naive ones as if UTC."""
+    if dt.tzinfo is not None:
+        return int(dt.timestamp())
+    return int((dt - _EPOCH).total_seconds())
+
+
+def _item_vevents(item: str) -> dict[str, Component]:
+    """VEVENTs of a stored item by instance key ("PROTO" for the master)."""
+    vevents = {}
+    for root in parse_components(item):
+        for vevent in ([root] if root.name == "VEVENT" else root.walk("VEVENT")):
+            recurrence_id = vevent.get("RECURRENCE-ID")
+            if recurrence_id is None:
+                vevents["PROTO"] = vevent
+                continue
+            try:
+                vevents[str(_unix_time(parse_date_time(recurrence_id)[0]))] = vevent
+            except ValueError:
+                pass
+    return vevents
+
+
+def read_khal_events(db_path: Path, start: int, end: int, check_current: bool = True) -> list[dict]:
+    """Event instances overlapping [start, end), shaped like `khal list --json` output.
+
+    Each dict has uid, title, start-long-full, end-long-full (ISO 8601,
+    local time), calendar, description, location and repeat-pattern (the
+    series' RRULE, "" for single events). Sorted by start.
+
+    Raises:
+        UnsupportedDatabase: If the database cannot be used (see module doc)
+    """
+    conn = _open(db_path)
+    try:
+        if check_current:
+            _check_current(conn)
+        rows = []
+        for table, bounds in (("recs_loc", (start, end)), ("recs_float", (_float_time(start), _float_time(end)))):
+            query = _INSTANCE_QUERY.format(table=table)
+            for row in conn.execute(query, {"start": bounds[0], "end": bounds[1]}):
+                rows.append((table, *row))
+    except sqlite3.Error as e:
+        raise UnsupportedDatabase(f"cannot query {db_path}: {e}")
+    finally:
+        conn.close()
+
+    items: dict[tuple[str, str], dict[str, Component]] = {}
+    events = []
+    for table, dtstart, dtend, href, ref, dtype, calendar_name, item in rows:
+        vevents = items.get((calendar_name, href))
+        if vevents is None:
+            vevents = items[(calendar_name, href)] = _item_vevents(item or "")
+        master = vevents.get("PROTO")
+        vevent = vevents.get(_instance_key(ref)) or master
+        if vevent is None:
+            continue
+
+        if table == "recs_float":
+            start_dt = _EPOCH + timedelta(seconds=dtstart)
+            end_dt = _EPOCH + timedelta(seconds=dtend)
+        else:
+            start_dt = datetime.fromtimestamp(dtstart)
+            end_dt = datetime.fromtimestamp(dtend)
+        rrule = master.get("RRULE") if master is not None else None
+
+        events.append({
+            "uid": vevent.text("UID"),
+            "title": vevent.text("SUMMARY"),
+            "start-long-full": start_dt.isoformat(),
+            "end-long-full": end_dt.isoformat(),
+            "calendar": calendar_name,
+            "description": vevent.text("DESCRIPTION"),
+            "location": vevent.text("LOCATION"),
+            "repeat-pattern": rrule.value if rrule else "",
+        })
+
+    events.sort(key=lambda event: event["start-long-full"])
+    return events
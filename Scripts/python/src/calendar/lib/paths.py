@@ -0,0 +1,19 @@
+"""
+Shared file locations of the calendar scripts.
+"""
+
+import os
+from pathlib import Path
+
+
+def noctalia_cache_dir() -> Path:
+    """Noctalia's cache directory (follows the shell's cacheDir setting)."""
+    base = os.environ.get("NOCTALIA_CACHE_DIR")
+    if not base:
+        xdg_cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        base = os.path.join(xdg_cache, "noctalia")
+    return Path(base)
+
+
+def xdg_data_home() -> Path:
+    return Path(os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share"))
@@ -0,0 +1,178 @@
+"""
+Windowed recurrence expansion.
+
+Expands an event's RRULE, RDATEs and EXDATEs into the occurrences that
+overlap a query window, without walking the occurrences before it. A daily
+event created years ago costs the same as one created yesterday:
+- SECONDLY to HOURLY rules, and DAILY/WEEKLY rules in a zone without UTC
+  offset changes over the expanded span, have a fixed period: the
+  occurrences in the window are computed directly from their index
+- DAILY and WEEKLY rules in a zone with DST keep their wall-clock time, so
+  a 09:00 meeting stays at 09:00 after the clocks change
+- MONTHLY and YEARLY rules step whole months in the event's zone from the
+  month of the window; a day that does not exist in a month (the 31st,
+  Feb 29) is skipped, not clamped (RFC 5545)
+
+COUNT is applied to the rule's occurrences by index (skipped dates do not
+count), RDATEs are added on top of the rule and never count toward it.
+Rules are expanded from FREQ, INTERVAL, COUNT and UNTIL; BYxxx parts are
+not interpreted.
+"""
+
+import heapq
+from calendar import monthrange
+from dataclasses import dataclass
+from datetime import timedelta, tzinfo
+from typing import Iterable, Iterator, Optional
+
+from .timezones import is_fixed_offset, timestamp_to_wall, wall_to_timestamp
+
+# Frequencies, numbered like ICalGLib.RecurrenceFrequency
+SECONDLY, MINUTELY, HOURLY, DAILY, WEEKLY, MONTHLY, YEARLY = range(7)
+
+# Seconds per step of the fixed-period frequencies
+FIXED_PERIODS = {
+    SECONDLY: 1,
+    MINUTELY: 60,
+    HOURLY: 3600,
+    DAILY: 86400,
+    WEEKLY: 7 * 86400,
+}
+
+# Occurrences returned per event and window; bounds SECONDLY/MINUTELY rules
+# over long windows
+MAX_OCCURRENCES = 10000
+
+
+@dataclass(frozen=True)
+class RecurrenceRule:
+    """The parts of an RRULE the expander uses."""
+    freq: int
+    interval: int = 1
+    # Total number of rule occurrences; 0 for no limit
+    count: int = 0
+    # Last allowed occurrence start (timestamp, inclusive)
+    until: Optional[int] = None
+
+
+def overlaps(start: int, duration: int, window_start: int, window_end: int) -> bool:
+    """Whether an occurrence overlaps [window_start, window_end).
+
+    Zero-length occurrences count when they start inside the window.
+    """
+    return start < window_end and (start + duration > window_start or start >= window_start)
+
+
+def _fixed_starts(start: int, duration: int, rule: RecurrenceRule, window_start: int, window_end: int) -> Iterator[int]:
+    period = FIXED_PERIODS[rule.freq] * max(1, rule.interval)
+    # Index range of the occurrences that can overlap the window: from the
+    # first one still reaching into it to the last one starting before its
+    # end (and not after UNTIL)
+    first = max(0, -((start + duration - window_start) // period))
+    last_start = window_end - 1 if rule.until is None else min(window_end - 1, rule.until)
+    stop = (last_start - start) // period + 1
+    if rule.count:
+        stop = min(stop, rule.count)
+    return (occurrence for occurrence in range(start + first * period, start + max(first, stop) * period, period)
+            if overlaps(occurrence, duration, window_start, window_end))
+
+
+def _wall_day_starts(start: int, duration: int, rule: RecurrenceRule, window_start: int, window_end: int,
+                     zone: Optional[tzinfo]) -> Iterator[int]:
+    days = (7 if rule.freq == WEEKLY else 1) * max(1, rule.interval)
+    first = timestamp_to_wall(start, zone)
+
+    # Jump to a day shortly before the window (by whole days, so the
+    # offset changes in between don't matter)
+    days_before = (timestamp_to_wall(window_start, zone) - first).days - duration // 86400 - 1
+    index = max(0, days_before // days)
+    while not rule.count or index < rule.count:
+        occurrence = wall_to_timestamp(first + timedelta(days=index * days), zone)
+        if occurrence >= window_end or (rule.until is not None and occurrence > rule.until):
+            return
+        if overlaps(occurrence, duration, window_start, window_end):
+            yield occurrence
+        index += 1
+
+
+def _month_starts(start: int, duration: int, rule: RecurrenceRule, window_start: int, window_end: int,
+                  zone: Optional[tzinfo]) -> Iterator[int]:
+    first = timestamp_to_wall(start, zone)
+    step = (12 if rule.freq == YEARLY else 1) * max(1, rule.interval)
+
+    def month_at(index: int) -> tuple[int, int]:
+        months = first.month - 1 + index * step
+        return first.year + months // 12, months % 12 + 1
+
+    def is_valid(index: int) -> bool:
+        year, month = month_at(index)
+        return first.day <= monthrange(year, month)[1]
+
+    # Start a little before the window's month so long occurrences that
+    # began earlier are still found
+    window_first = timestamp_to_wall(window_start, zone)
+    months_before = (window_first.year - first.year) * 12 + window_first.month - first.month
+    months_before -= duration // (28 * 86400) + 1
+    index = max(0, months_before // step)
+
+    # COUNT numbers valid occurrences only, so count the skipped ones
+    # before the jump (none unless the rule starts after the 28th)
+    seen = index if first.day <= 28 else sum(1 for i in range(index) if is_valid(i))
+
+    window_last = timestamp_to_wall(window_end, zone)
+    while not rule.count or seen < rule.count:
+        year, month = month_at(index)
+        if (year, month) > (window_last.year, window_last.month):
+            return
+        index += 1
+        if first.day > monthrange(year, month)[1]:
+            continue
+        occurrence = wall_to_timestamp(first.replace(year=year, month=month), zone)
+        if occurrence >= window_end or (rule.until is not None and occurrence > rule.until):
+            return
+        seen += 1
+        if overlaps(occurrence, duration, window_start, window_end):
+            yield occurrence
+
+
+def rule_starts(start: int, duration: int, rule: Optional[RecurrenceRule], window_start: int, window_end: int,
+                zone: Optional[tzinfo] = None) -> Iterator[int]:
+    """Sorted starts of a rule's occurrences that overlap the window.
+
+    zone is DTSTART's zone (None for local time, DATEs and floating
+    times); DAILY and longer rules repeat its wall-clock time. Without a
+    rule (or with an unknown frequency) only DTSTART occurs.
+    """
+    if rule is not None and rule.freq in (DAILY, WEEKLY) and not is_fixed_offset(zone, start, window_end):
+        return _wall_day_starts(start, duration, rule, window_start, window_end, zone)
+    if rule is not None and rule.freq in FIXED_PERIODS:
+        return _fixed_starts(start, duration, rule, window_start, window_end)
+    if rule is not None and rule.freq in (MONTHLY, YEARLY):
+        return _month_starts(start, duration, rule, window_start, window_end, zone)
+    return iter([start] if overlaps(start, duration, window_start, window_end) else [])
+
+
+def expand_occurrences(start: int, end: int, rule: Optional[RecurrenceRule], window_start: int, window_end: int,
+                       rdates: Iterable[int] = (), exdates: Iterable[int] = (),
+                       zone: Optional[tzinfo] = None) -> list[tuple[int, int]]:
+    """(start, end) of every occurrence overlapping [window_start, window_end), sorted.
+
+    rule may be None for an event that only has RDATEs; DTSTART is always
+    the first occurrence and zone its zone (see rule_starts()). Occurrences
+    whose start is in exdates are dropped, and an RDATE that repeats a rule
+    occurrence is listed once.
+    """
+    duration = max(0, end - start)
+    excluded = set(exdates)
+    extra = sorted(rdate for rdate in set(rdates) if overlaps(rdate, duration, window_start, window_end))
+
+    occurrences = []
+    previous = None
+    for occurrence in heapq.merge(rule_starts(start, duration, rule, window_start, window_end, zone), extra):
+        if occurrence == previous or occurrence in excluded:
+            continue
+        previous = occurrence
+        occurrences.append((occurrence, occurrence + duration))
+        if len(occurrences) >= MAX_OCCURRENCES:
+            break
+    return occurrences
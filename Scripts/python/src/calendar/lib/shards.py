@@ -0,0 +1,154 @@
+"""
+Per-month on-disk cache of normalized calendar events.
+
+Moving between months in the calendar panel queries a new range each
+time. Normalized events are therefore kept as one JSON shard per calendar
+and month, holding every occurrence that overlaps the month, so a range
+made of cached months is answered without asking the calendar backend.
+
+Shards are signed with the calendar's revision (the EDS "revision"
+backend property, or the calendar file's mtime for local calendars): any
+edit to a calendar invalidates all of its shards, as does a new
+SHARD_CACHE_VERSION.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+from .paths import noctalia_cache_dir
+from .recurrence import overlaps
+
+# Bump when the normalized event format changes
+SHARD_CACHE_VERSION = 2
+
+# (year, month)
+Month = tuple[int, int]
+
+
+def default_cache_dir() -> Path:
+    """Shard cache directory (follows the shell's cacheDir setting)."""
+    return noctalia_cache_dir() / "calendar-shards"
+
+
+def month_of(timestamp: int) -> Month:
+    dt = datetime.fromtimestamp(timestamp)
+    return dt.year, dt.month
+
+
+def add_months(month: Month, count: int) -> Month:
+    months = month[0] * 12 + month[1] - 1 + count
+    return months // 12, months % 12 + 1
+
+
+def month_bounds(month: Month) -> tuple[int, int]:
+    """[start, end) timestamps of a month in local time."""
+    year, number = month
+    next_year, next_number = add_months(month, 1)
+    return int(datetime(year, number, 1).timestamp()), int(datetime(next_year, next_number, 1).timestamp())
+
+
+def months_overlapping(start: int, end: int) -> list[Month]:
+    """Months that share time with [start, end)."""
+    months = []
+    month = month_of(start)
+    last = month_of(max(start, end - 1))
+    while month <= last:
+        months.append(month)
+        month = add_months(month, 1)
+    return months
+
+
+def months_inside(start: int, end: int) -> list[Month]:
+    """Months lying entirely within [start, end)."""
+    return [month for month in months_overlapping(start, end)
+            if start <= month_bounds(month)[0] and month_bounds(month)[1] <= end]
+
+
+def _event_overlaps(event: dict, start: int, end: int) -> bool:
+    return overlaps(event["start"], max(0, event["end"] - event["start"]), start, end)
+
+
+class ShardCache:
+    """Normalized events per calendar and month, signed by calendar revision."""
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.cache_dir = cache_dir or default_cache_dir()
+
+    def _shard_path(self, calendar_uid: str, month: Month) -> Path:
+        digest = hashlib.sha1(calendar_uid.encode()).hexdigest()[:16]
+        return self.cache_dir / digest / f"{month[0]:04d}-{month[1]:02d}.json"
+
+    def get(self, calendar_uid: str, month: Month, revision: Optional[str]) -> Optional[list[dict]]:
+        """Events overlapping a month, or None if the shard is missing or stale."""
+        if revision is None:
+            return None
+        try:
+            with open(self._shard_path(calendar_uid, month), "r") as f:
+                shard = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if (not isinstance(shard, dict) or shard.get("version") != SHARD_CACHE_VERSION
+                or shard.get("revision") != revision):
+            return None
+        events = shard.get("events")
+        return events if isinstance(events, list) else None
+
+    def put(self, calendar_uid: str, month: Month, revision: Optional[str], events: list[dict]):
+        """Store the given events that overlap a month.
+
+        `events` must contain every occurrence of the calendar in the month.
+        Written via a temp file and rename; write failures are ignored.
+        """
+        if revision is None:
+            return
+        start, end = month_bounds(month)
+        shard = {
+            "version": SHARD_CACHE_VERSION,
+            "calendar": calendar_uid,
+            "revision": revision,
+            "events": [event for event in events if _event_overlaps(event, start, end)],
+        }
+        shard_path = self._shard_path(calendar_uid, month)
+        tmp_path = shard_path.with_name(f".{shard_path.name}.{os.getpid()}.tmp")
+        try:
+            shard_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(shard, f, separators=(",", ":"))
+            os.replace(tmp_path, shard_path)
+        except OSError:
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+
+    def put_range(self, calendar_uid: str, revision: Optional[str], events: list[dict], start: int, end: int):
+        """Store shards for the months a fetch of [start, end) covered completely."""
+        for month in months_inside(start, end):
+            self.put(calendar_uid, month, revision, events)
+
+    def missing(self, calendar_uid: str, revision: Optional[str], months: list[Month]) -> list[Month]:
+        """Months without a current shard."""
+        return [month for month in months if self.get(calendar_uid, month, revision) is None]
+
+    def get_range(self, calendar_uid: str, revision: Optional[str], start: int, end: int) -> Optional[list[dict]]:
+        """Events overlapping [start, end) from shards, or None unless every month is cached.
+
+        An occurrence spanning several months is stored in each of their
+        shards; it is taken from the first month of the range it overlaps.
+        """
+        events = []
+        for index, month in enumerate(months_overlapping(start, end)):
+            shard = self.get(calendar_uid, month, revision)
+            if shard is None:
+                return None
+            month_start = month_bounds(month)[0]
+            events.extend(
+                event for event in shard
+                if (index == 0 or event["start"] >= month_start) and _event_overlaps(event, start, end)
+            )
+        events.sort(key=lambda event: event["start"])
+        return events
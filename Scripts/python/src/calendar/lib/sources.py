@@ -0,0 +1,66 @@
+"""
+Calendar source listing, cached between registry change notifications.
+
+Listing calendars needs an EDataServer.SourceRegistry: the typelibs are
+loaded and the registry service is asked for every source. A one-shot
+probe pays for that once; the long-running events daemon keeps its
+registry and only re-reads the list when the registry signals a change
+to a calendar source.
+
+The registry and its sources are passed in by the caller, so this module
+does not import gi itself.
+"""
+
+from typing import Callable, Optional
+
+# EDataServer.SOURCE_EXTENSION_CALENDAR
+CALENDAR_EXTENSION = "Calendar"
+
+# ESourceRegistry signals that can change the list of enabled calendars
+REGISTRY_SIGNALS = ("source-added", "source-removed", "source-enabled", "source-disabled", "source-changed")
+
+
+def calendar_info(source) -> dict:
+    """A calendar as listed to the shell."""
+    return {
+        'uid': source.get_uid(),
+        'name': source.get_display_name(),
+        'enabled': True
+    }
+
+
+class SourceList:
+    """Enabled calendar sources of a registry, re-read only after it reports a change.
+
+    on_change is called with the new calendar_info() list whenever a
+    notification actually changed it (a calendar was added, removed,
+    enabled, disabled or renamed).
+    """
+
+    def __init__(self, registry, on_change: Optional[Callable[[list[dict]], None]] = None):
+        self.registry = registry
+        self.on_change = on_change
+        self._sources = None
+        for signal in REGISTRY_SIGNALS:
+            registry.connect(signal, self._on_registry_changed)
+
+    def sources(self) -> list:
+        if self._sources is None:
+            self._sources = [
+                source for source in self.registry.list_sources(CALENDAR_EXTENSION)
+                if source.get_enabled()
+            ]
+        return self._sources
+
+    def calendars(self) -> list[dict]:
+        return [calendar_info(source) for source in self.sources()]
+
+    def _on_registry_changed(self, _registry, source):
+        # Mail accounts, address books etc. share the registry
+        if not source.has_extension(CALENDAR_EXTENSION):
+            return
+        previous = self.calendars()
+        self._sources = None
+        calendars = self.calendars()
+        if calendars != previous and self.on_change is not None:
+            self.on_change(calendars)
@@ -0,0 +1,87 @@
+"""
+Time zone resolution and wall-clock conversion for event normalization.
+
+Every DATE-TIME property names its zone by TZID. On calendars with
+thousands of recurring events, resolving that name and building an aware
+datetime for each property dominated normalization, so:
+- TZIDs are resolved once per name
+- a zone whose UTC offset is the same all year (UTC, most of Asia and
+  Africa, any zone outside its DST years) converts wall-clock times with
+  plain arithmetic
+- zones with DST go through zoneinfo, so times on either side of a
+  transition get their own offset
+
+A zone of None means the system's local time, as for DATE values and
+floating times.
+"""
+
+import calendar
+from datetime import datetime, timezone, tzinfo
+from functools import lru_cache
+from typing import Optional
+from zoneinfo import ZoneInfo
+
+# Evolution and some exporters prefix IANA names with this
+TZID_PREFIX = "/freeassociation.sourceforge.net/"
+
+
+@lru_cache(maxsize=None)
+def zone_for_tzid(tzid: str) -> Optional[tzinfo]:
+    """ZoneInfo for a TZID (IANA name, optionally Evolution-prefixed), or None."""
+    name = tzid.strip()
+    if name.startswith(TZID_PREFIX):
+        name = name[len(TZID_PREFIX):]
+    try:
+        return ZoneInfo(name.lstrip("/"))
+    except (KeyError, ValueError, OSError):  # ZoneInfoNotFoundError is a KeyError
+        return None
+
+
+def _utc_offset(zone: Optional[tzinfo], wall: datetime) -> int:
+    if zone is None:
+        return int(wall.astimezone().utcoffset().total_seconds())
+    return int(zone.utcoffset(wall).total_seconds())
+
+
+@lru_cache(maxsize=4096)
+def year_offset(zone: Optional[tzinfo], year: int) -> Optional[int]:
+    """The zone's UTC offset in seconds if it does not change during a year, else None.
+
+    Sampled twice a month, which catches every DST period in the tz database.
+    """
+    if zone is timezone.utc:
+        return 0
+    try:
+        offsets = {_utc_offset(zone, datetime(year, month, day)) for month in range(1, 13) for day in (1, 15)}
+        offsets.add(_utc_offset(zone, datetime(year, 12, 31, 23, 59, 59)))
+    except (OverflowError, ValueError, OSError):
+        return None
+    return offsets.pop() if len(offsets) == 1 else None
+
+
+def is_fixed_offset(zone: Optional[tzinfo], start: int, end: int) -> bool:
+    """Whether the zone keeps one UTC offset from timestamp start to end."""
+    first = datetime.fromtimestamp(start, timezone.utc).year - 1
+    last = datetime.fromtimestamp(max(start, end), timezone.utc).year + 1
+    offsets = {year_offset(zone, year) for year in range(first, last + 1)}
+    return len(offsets) == 1 and None not in offsets
+
+
+def wall_to_timestamp(wall: datetime, zone: Optional[tzinfo]) -> int:
+    """Unix time of a naive wall-clock time in a zone.
+
+    A time skipped by a DST change uses the offset from before the change
+    (02:30 on a spring-forward night is 03:30 DST), as RFC 5545 asks; a
+    repeated time is its first occurrence.
+    """
+    offset = year_offset(zone, wall.year)
+    if offset is not None:
+        return calendar.timegm(wall.timetuple()) - offset
+    if zone is None:
+        return int(wall.timestamp())
+    return int(wall.replace(tzinfo=zone).timestamp())
+
+
+def timestamp_to_wall(timestamp: int, zone: Optional[tzinfo]) -> datetime:
+    """Naive wall-clock time of a Unix time in a zone."""
+    return datetime.fromtimestamp(timestamp, zone).replace(tzinfo=None)
@@ -0,0 +1,249 @@
+"""
+vdir calendars: directories of .ics files (one event series per file), as
+synced by vdirsyncer and read by khal.
+
+Parsing every file on each refresh does not scale to calendars with
+thousands of events, so the parsed events are kept in a persistent index
+keyed by file path and (mtime, size). A refresh only stats the files and
+re-parses the ones that changed; occurrences are expanded from the index
+at query time with the same recurrence engine as the EDS backend.
+"""
+
+import json
+import os
+from dataclasses import dataclass
+from datetime import timedelta
+from pathlib import Path
+from typing import Iterable, Optional
+
+from .ics import Component, Property, parse_components, parse_date_time, parse_date_time_list, parse_duration, rrule_parts
+from .paths import noctalia_cache_dir, xdg_data_home
+from .timezones import zone_for_tzid
+from .recurrence import (
+    SECONDLY, MINUTELY, HOURLY, DAILY, WEEKLY, MONTHLY, YEARLY, RecurrenceRule, expand_occurrences
+)
+
+# Bump when the indexed event format changes
+INDEX_VERSION = 2
+
+FREQUENCIES = {
+    "SECONDLY": SECONDLY,
+    "MINUTELY": MINUTELY,
+    "HOURLY": HOURLY,
+    "DAILY": DAILY,
+    "WEEKLY": WEEKLY,
+    "MONTHLY": MONTHLY,
+    "YEARLY": YEARLY,
+}
+
+
+def default_roots() -> list[Path]:
+    """Directories searched for vdir calendars when none are given."""
+    return [Path.home() / ".calendars", xdg_data_home() / "vdirsyncer"]
+
+
+def default_index_path() -> Path:
+    return noctalia_cache_dir() / "calendar-vdir-index.json"
+
+
+def find_calendars(roots: Iterable[Path]) -> list[Path]:
+    """Directories below the roots that directly contain .ics files (hidden ones skipped)."""
+    calendars = []
+    for root in roots:
+        for directory, dirs, files in os.walk(root):
+            dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+            if any(name.endswith(".ics") and not name.startswith('.') for name in files):
+                calendars.append(Path(directory))
+    return sorted(set(calendars))
+
+
+def calendar_name(directory: Path) -> str:
+    """vdirsyncer's displayname metadata file, else the directory name."""
+    try:
+        name = (directory / "displayname").read_text(encoding="utf-8").strip()
+    except (OSError, UnicodeDecodeError):
+        name = ""
+    return name or directory.name
+
+
+def _rule(value: str) -> Optional[list]:
+    """RRULE as [freq, interval, count, until] (JSON-friendly RecurrenceRule fields)."""
+    parts = rrule_parts(value)
+    freq = FREQUENCIES.get(parts.get("FREQ", "").upper())
+    if freq is None:
+        return None
+    until = None
+    if "UNTIL" in parts:
+        until_dt, is_date = parse_date_time(Property("UNTIL", parts["UNTIL"]))
+        # A DATE bound includes the whole day
+        until = int((until_dt + timedelta(days=1)).timestamp()) - 1 if is_date else int(until_dt.timestamp())
+    return [freq, max(1, int(parts.get("INTERVAL") or 1)), max(0, int(parts.get("COUNT") or 0)), until]
+
+
+def _event(vevent: Component) -> Optional[dict]:
+    """Indexed form of a VEVENT, or None if its dates can't be read."""
+    dtstart = vevent.get("DTSTART")
+    if dtstart is None:
+        return None
+    try:
+        start_dt, is_date = parse_date_time(dtstart)
+        dtend = vevent.get("DTEND")
+        duration = vevent.get("DURATION")
+        if dtend is not None:
+            end_dt = parse_date_time(dtend)[0]
+        elif duration is not None:
+            end_dt = start_dt + parse_duration(duration.value)
+        else:
+            # Same defaults as calendar-events.py: a day, or an hour
+            end_dt = start_dt + (timedelta(days=1) if is_date else timedelta(hours=1))
+
+        recurrence_id = vevent.get("RECURRENCE-ID")
+        rrule = vevent.get("RRULE")
+        # Recurrences repeat DTSTART's wall-clock time in its zone
+        zone = start_dt.tzinfo
+        return {
+            "uid": vevent.text("UID"),
+            "rid": int(parse_date_time(recurrence_id)[0].timestamp()) if recurrence_id else None,
+            "summary": vevent.text("SUMMARY"),
+            "location": vevent.text("LOCATION"),
+            "description": vevent.text("DESCRIPTION"),
+            "start": int(start_dt.timestamp()),
+            "end": int(end_dt.timestamp()),
+            "tzid": getattr(zone, "key", "UTC") if zone is not None else None,
+            "rule": _rule(rrule.value) if rrule else None,
+            "rdates": [int(dt.timestamp()) for prop in vevent.get_all("RDATE") for dt, _ in parse_date_time_list(prop)],
+            "exdates": [int(dt.timestamp()) for prop in vevent.get_all("EXDATE") for dt, _ in parse_date_time_list(prop)],
+        }
+    except (ValueError, OverflowError):
+        return None
+
+
+def parse_events(text: str) -> list[dict]:
+    """Indexed events of every readable VEVENT in an .ics file."""
+    events = []
+    for root in parse_components(text):
+        for vevent in ([root] if root.name == "VEVENT" else root.walk("VEVENT")):
+            event = _event(vevent)
+            if event is not None:
+                events.append(event)
+    return events
+
+
+@dataclass
+class RefreshStats:
+    """Counts from an index refresh."""
+    files: int = 0
+    parsed: int = 0
+    removed: int = 0
+
+
+class VdirIndex:
+    """Parsed events per .ics file, reused while the file's mtime and size are unchanged."""
+
+    def __init__(self, index_path: Optional[Path] = None):
+        self.index_path = index_path or default_index_path()
+        # .ics path -> {"mtime_ns", "size", "calendar" (directory), "events"}
+        self.files: dict[str, dict] = {}
+        # Calendar directory -> display name
+        self.calendars: dict[str, str] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, "r") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return
+        if isinstance(index, dict) and index.get("version") == INDEX_VERSION:
+            self.files = index.get("files") or {}
+
+    def save(self):
+        """Write the index if a refresh changed it (temp file and rename; failures ignored)."""
+        if not self._dirty:
+            return
+        tmp_path = self.index_path.with_name(f".{self.index_path.name}.{os.getpid()}.tmp")
+        try:
+            self.index_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump({"version": INDEX_VERSION, "files": self.files}, f, separators=(",", ":"))
+            os.replace(tmp_path, self.index_path)
+            self._dirty = False
+        except OSError:
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
+
+    def refresh(self, calendars: list[Path]) -> RefreshStats:
+        """Bring the index in line with the .ics files of the given calendars."""
+        stats = RefreshStats()
+        self.calendars = {str(directory): calendar_name(directory) for directory in calendars}
+        seen = set()
+        for directory in calendars:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                if not entry.name.endswith(".ics") or entry.name.startswith('.'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                seen.add(entry.path)
+                stats.files += 1
+                cached = self.files.get(entry.path)
+                if cached and cached["mtime_ns"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+                    continue
+                try:
+                    with open(entry.path, "r", encoding="utf-8", errors="replace") as f:
+                        events = parse_events(f.read())
+                except OSError:
+                    continue
+                self.files[entry.path] = {
+                    "mtime_ns": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    "calendar": str(directory),
+                    "events": events,
+                }
+                stats.parsed += 1
+                self._dirty = True
+
+        for path in [path for path in self.files if path not in seen]:
+            del self.files[path]
+            stats.removed += 1
+            self._dirty = True
+        return stats
+
+    def occurrences(self, start: int, end: int) -> list[dict]:
+        """Events overlapping [start, end), shaped like calendar-events.py output."""
+        events = []
+        for entry in self.files.values():
+            directory = entry["calendar"]
+            name = self.calendars.get(directory) or Path(directory).name
+            # Detached instances (RECURRENCE-ID) replace their series' occurrence
+            overridden: dict[str, list[int]] = {}
+            for event in entry["events"]:
+                if event["rid"] is not None:
+                    overridden.setdefault(event["uid"], []).append(event["rid"])
+
+            for event in entry["events"]:
+                rule = RecurrenceRule(*event["rule"]) if event["rule"] and event["rid"] is None else None
+                exdates = event["exdates"] + (overridden.get(event["uid"], []) if event["rid"] is None else [])
+                key = f"{directory}/{event['uid']}/{event['rid'] or ''}"
+                zone = zone_for_tzid(event["tzid"]) if event["tzid"] else None
+                for occ_start, occ_end in expand_occurrences(event["start"], event["end"], rule, start, end,
+                                                             event["rdates"], exdates, zone):
+                    events.append({
+                        'calendar': name,
+                        'summary': event["summary"],
+                        'start': occ_start,
+                        'end': occ_end,
+                        'location': event["location"],
+                        'description': event["description"],
+                        'key': key,
+                    })
+        events.sort(key=lambda x: x['start'])
+        return events
@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+import argparse
+import json
+from pathlib import Path
+
+from lib.vdir import VdirIndex, calendar_name, default_roots, find_calendars
+
+def list_calendars(calendars):
+    print(json.dumps([
+        {'uid': str(directory), 'name': calendar_name(directory), 'enabled': True}
+        for directory in calendars
+    ]))
+
+def print_events(calendars, index_path, start, end):
+    # Only files changed since the last run are parsed again
+    index = VdirIndex(index_path)
+    index.refresh(calendars)
+    index.save()
+    print(json.dumps(index.occurrences(start, end), indent=4))
+
+def main():
+    parser = argparse.ArgumentParser(description="Print events of vdir calendars (directories of .ics files) as JSON")
+    parser.add_argument("start", type=int, nargs="?", help="Range start (Unix time)")
+    parser.add_argument("end", type=int, nargs="?", help="Range end (Unix time)")
+    parser.add_argument("--dir", type=Path, action="append", dest="roots",
+                        help="Search this directory for calendars (repeatable; default ~/.calendars and "
+                             "$XDG_DATA_HOME/vdirsyncer)")
+    parser.add_argument("--index", type=Path, help="Index file (default in the shell's cache directory)")
+    parser.add_argument("--list", action="store_true", help="List calendars instead of events")
+    args = parser.parse_args()
+
+    calendars = find_calendars(args.roots or default_roots())
+    if args.list:
+        list_calendars(calendars)
+        return
+    if args.start is None or args.end is None:
+        parser.error("start and end are required unless --list is given")
+    print_events(calendars, args.index, args.start, args.end)
+
+if __name__ == '__main__':
+    main()
@@ -5,57 +5,93 @@ This package provides:
 - HCT color space implementation (CAM16, Hct, TonalPalette)
 - Material Design 3 scheme generation
 - Color utilities (RGB, HSL conversions)
-- Image reading and palette extraction
+- Image reading and palette extraction (with a persistent result cache)
 - Template rendering (Matugen compatible)
+- Deduplicated template hook execution
+- Watch mode for re-rendering edited templates
+
+Exports are loaded lazily: importing the package is cheap, and each
+submodule is imported the first time one of its names is used.
 """
 
-from .color import Color, rgb_to_hsl, hsl_to_rgb, adjust_surface
-from .hct import Hct, Cam16, TonalPalette, TemperatureCache, fix_if_disliked
-from .material import MaterialScheme, SchemeContent, harmonize_color
-from .contrast import ensure_contrast, contrast_ratio, is_dark
-from .image import read_image, ImageReadError
-from .palette import extract_palette
-from .quantizer import extract_source_color, source_color_to_rgb
-from .theme import generate_theme
-from .renderer import TemplateRenderer
-from .scheme import expand_predefined_scheme
-from .terminal import TerminalColors, TerminalGenerator
-
-__all__ = [
+# Public name -> submodule. Submodules are imported on first attribute access
+# (PEP 562) so entry points only pay for what they use: the predefined-scheme
+# path never loads the quantizers, HCT solver or template renderer.
+_EXPORTS = {
     # Color
-    "Color",
-    "rgb_to_hsl",
-    "hsl_to_rgb",
-    "adjust_surface",
+    "Color": "color",
+    "rgb_to_hsl": "color",
+    "hsl_to_rgb": "color",
+    "adjust_surface": "color",
     # HCT
-    "Hct",
-    "Cam16",
-    "TonalPalette",
-    "TemperatureCache",
-    "fix_if_disliked",
+    "Hct": "hct",
+    "Cam16": "hct",
+    "TonalPalette": "hct",
+    "TemperatureCache": "hct",
+    "fix_if_disliked": "hct",
     # Material
-    "MaterialScheme",
-    "SchemeContent",
-    "harmonize_color",
+    "MaterialScheme": "material",
+    "SchemeContent": "material",
+    "harmonize_color": "material",
     # Contrast
-    "ensure_contrast",
-    "contrast_ratio",
-    "is_dark",
+    "ensure_contrast": "contrast",
+    "contrast_ratio": "contrast",
+    "is_dark": "contrast",
     # Image
-    "read_image",
-    "ImageReadError",
+    "read_image": "image",
+    "ImageReadError": "image",
+    "max_pixels_for_memory": "image",
     # Palette
-    "extract_palette",
-    # Quantizer (Wu + Score algorithm matching matugen)
-    "extract_source_color",
-    "source_color_to_rgb",
+    "extract_palette": "palette",
+    # Quantizer
+    "extract_source_color": "quantizer",
+    "source_color_to_rgb": "quantizer",
+    # Extraction
+    "extraction_method": "extraction",
+    "extract_image_palettes": "extraction",
+    "extract_image_palette_progressive": "extraction",
+    "extract_themes": "extraction",
+    "prewarm_directory": "extraction",
+    # Cache
+    "ExtractionCache": "cache",
+    # Atomic file writes
+    "AtomicFile": "atomicfile",
+    "write_text_atomic": "atomicfile",
     # Theme
-    "generate_theme",
+    "generate_theme": "theme",
     # Renderer
-    "TemplateRenderer",
+    "TemplateRenderer": "renderer",
+    # Hooks
+    "HookRunner": "hooks",
+    "HookResult": "hooks",
+    # Watch
+    "FileWatcher": "watch",
+    "watch_templates": "watch",
+    # Memory profiling
+    "MemoryProfiler": "memprofile",
     # Scheme
-    "expand_predefined_scheme",
+    "expand_predefined_scheme": "scheme",
     # Terminal
-    "TerminalColors",
-    "TerminalGenerator",
-]
+    "TerminalColors": "terminal",
+    "TerminalGenerator": "terminal",
+}
+
+
+def __getattr__(name: str):
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    # __import__ rather than importlib.import_module: same result, but it goes
+    # through the C import path, which `python -X importtime` instruments
+    module = __import__(f"{__name__}.{module_name}", globals(), None, [name])
+    value = getattr(module, name)
+    # Cache on the package so later lookups skip __getattr__
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
+
+
+__all__ = list(_EXPORTS)
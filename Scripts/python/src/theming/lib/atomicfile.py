@@ -0,0 +1,59 @@
+"""
+Atomic replacement of generated files.
+
+Output is written to a temporary file next to the target and renamed into
+place, so readers (terminals, watchers, the shell) never see a partially
+written file and a failed write leaves the existing file untouched.
+"""
+
+import os
+from pathlib import Path
+
+
+class AtomicFile:
+    """A text file that replaces its target only when committed.
+
+    Symlinked targets (e.g. from dotfile managers) are written through like
+    write_text would, and a replaced file keeps its permissions.
+    """
+
+    def __init__(self, path: Path):
+        self.target = path.resolve() if path.is_symlink() else path
+        self.target.parent.mkdir(parents=True, exist_ok=True)
+        self.tmp_path = self.target.with_name(f".{self.target.name}.{os.getpid()}.tmp")
+        # Created like a regular file (mode 0666 minus umask)
+        fd = os.open(self.tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+        self.file = open(fd, "w")
+
+    def write(self, text: str):
+        self.file.write(text)
+
+    def commit(self):
+        """Rename the written file over the target."""
+        self.file.close()
+        try:
+            os.chmod(self.tmp_path, self.target.stat().st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.replace(self.tmp_path, self.target)
+        self.tmp_path = None
+
+    def discard(self):
+        """Drop the temporary file unless it was committed (safe to call twice)."""
+        self.file.close()
+        if self.tmp_path is not None:
+            try:
+                self.tmp_path.unlink()
+            except OSError:
+                pass
+            self.tmp_path = None
+
+
+def write_text_atomic(path: Path, text: str):
+    """Replace a file's contents with text atomically. Raises OSError on failure."""
+    output = AtomicFile(path)
+    try:
+        output.write(text)
+        output.commit()
+    finally:
+        output.discard()
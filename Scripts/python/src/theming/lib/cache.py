@@ -0,0 +1,115 @@
+"""
+Persistent cache of wallpaper extraction results.
+
+Decoding and quantizing a wallpaper dominates theme generation, yet the
+result only depends on the image file and the extraction method. Entries
+are stored as one small JSON file per image under the Noctalia cache dir
+and are keyed by the image's resolved path; a changed size or mtime (or a
+new EXTRACTION_CACHE_VERSION) invalidates them. Palettes decoded under a
+pixel bound (--memory-cap) are stored apart from full-resolution ones.
+"""
+
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Optional
+
+from .color import Color
+
+# Bump when extraction output changes so stale palettes are not reused
+EXTRACTION_CACHE_VERSION = 1
+
+
+def default_cache_dir() -> Path:
+    """Extraction cache directory (follows the shell's cacheDir setting)."""
+    base = os.environ.get("NOCTALIA_CACHE_DIR")
+    if not base:
+        xdg_cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+        base = os.path.join(xdg_cache, "noctalia")
+    return Path(base) / "theming-extraction"
+
+
+class ExtractionCache:
+    """Extraction results (palettes per method) keyed by image file."""
+
+    def __init__(self, cache_dir: Optional[Path] = None):
+        self.cache_dir = cache_dir or default_cache_dir()
+
+    def _entry_path(self, image_path: Path) -> Path:
+        digest = hashlib.sha1(str(image_path.resolve()).encode()).hexdigest()
+        return self.cache_dir / f"{digest}.json"
+
+    @staticmethod
+    def _key(method: str, max_pixels: Optional[int]) -> str:
+        """Palette key: the method, plus the decode bound when one applied."""
+        return method if max_pixels is None else f"{method}@{max_pixels}px"
+
+    @staticmethod
+    def _signature(image_path: Path) -> Optional[dict]:
+        try:
+            stat = image_path.stat()
+        except OSError:
+            return None
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "version": EXTRACTION_CACHE_VERSION}
+
+    def _load(self, image_path: Path) -> dict[str, list[str]]:
+        """Cached palettes (hex) for an image, or {} if missing or stale."""
+        signature = self._signature(image_path)
+        if signature is None:
+            return {}
+        try:
+            with open(self._entry_path(image_path), "r") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(entry, dict) or entry.get("signature") != signature:
+            return {}
+        palettes = entry.get("palettes")
+        return palettes if isinstance(palettes, dict) else {}
+
+    def get(self, image_path: Path, method: str, max_pixels: Optional[int] = None) -> Optional[list[Color]]:
+        """Cached palette for an image, extraction method and decode bound."""
+        palette = self._load(image_path).get(self._key(method, max_pixels))
+        if not palette:
+            return None
+        try:
+            return [Color.from_hex(value) for value in palette]
+        except (TypeError, ValueError):
+            return None
+
+    def missing(self, image_path: Path, methods: list[str], max_pixels: Optional[int] = None) -> list[str]:
+        """Methods without a current cache entry for an image and decode bound."""
+        cached = self._load(image_path)
+        return [method for method in methods if not cached.get(self._key(method, max_pixels))]
+
+    def put(self, image_path: Path, palettes: dict[str, list[Color]], max_pixels: Optional[int] = None):
+        """Store palettes for an image, merged with its other cached methods.
+
+        max_pixels is the decode bound the palettes were extracted under.
+
+        Written via a temp file and rename so concurrent readers and
+        writers (CLI runs, prewarm workers) never see a partial entry.
+        Cache write failures are ignored.
+        """
+        signature = self._signature(image_path)
+        if signature is None:
+            return
+
+        merged = self._load(image_path)
+        for method, palette in palettes.items():
+            merged[self._key(method, max_pixels)] = [color.to_hex() for color in palette]
+
+        entry = {"path": str(image_path.resolve()), "signature": signature, "palettes": merged}
+        entry_path = self._entry_path(image_path)
+        tmp_path = entry_path.with_name(f".{entry_path.name}.{os.getpid()}.tmp")
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            with open(tmp_path, "w") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, entry_path)
+        except OSError:
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
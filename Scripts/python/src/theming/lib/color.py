@@ -6,7 +6,6 @@ RGB, HSL, and Lab color spaces.
 """
 
 import math
-from dataclasses import dataclass
 from typing import TYPE_CHECKING
 
 # Type aliases
@@ -18,12 +17,28 @@ if TYPE_CHECKING:
     from .hct import Hct
 
 
-@dataclass
 class Color:
-    """Represents a color with RGB values (0-255)."""
-    r: int
-    g: int
-    b: int
+    """Represents a color with RGB values (0-255).
+
+    A plain class rather than a dataclass: importing dataclasses (and the
+    inspect module it loads) was a third of template-processor's startup.
+    Filters may set an extra alpha attribute (see set_alpha in the renderer).
+    """
+
+    def __init__(self, r: int, g: int, b: int):
+        self.r = r
+        self.g = g
+        self.b = b
+
+    def __repr__(self) -> str:
+        return f"Color(r={self.r!r}, g={self.g!r}, b={self.b!r})"
+
+    def __eq__(self, other) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return (self.r, self.g, self.b) == (other.r, other.g, other.b)
+
+    __hash__ = None
 
     @classmethod
     def from_rgb(cls, rgb: RGB) -> 'Color':
@@ -312,6 +327,109 @@ def lab_distance(lab1: LAB, lab2: LAB) -> float:
     return math.sqrt(dL * dL + da * da + db * db)
 
 
+class LabColorIndex:
+    """
+    Nearest-color index over a list of named colors.
+
+    Candidate colors are converted to Lab once and stored in a k-d tree, so
+    each query is O(log n) instead of re-parsing and re-converting every
+    candidate. Results match a linear scan with Euclidean Lab distance,
+    including ties (the earliest entry wins).
+    """
+
+    # Indexes keyed by content hash of the candidate list (small, bounded)
+    _cache: dict[str, 'LabColorIndex'] = {}
+    _CACHE_SIZE = 32
+
+    def __init__(self, colors: list[dict[str, str]]):
+        self._names: list[str] = []
+        self._labs: list[LAB] = []
+
+        for entry in colors:
+            try:
+                name = entry["name"]
+                color = Color.from_hex(entry["color"])
+            except (KeyError, ValueError, TypeError):
+                # Skip invalid entries
+                continue
+            self._names.append(name)
+            self._labs.append(rgb_to_lab(color.r, color.g, color.b))
+
+        self._root = self._build(list(range(len(self._labs))), 0)
+
+    @classmethod
+    def for_colors(cls, colors: list[dict[str, str]]) -> 'LabColorIndex':
+        """Get a (cached) index for a candidate list."""
+        import hashlib
+        import json
+
+        digest = hashlib.sha1(
+            json.dumps(colors, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+        index = cls._cache.get(digest)
+        if index is None:
+            if len(cls._cache) >= cls._CACHE_SIZE:
+                cls._cache.pop(next(iter(cls._cache)))
+            index = cls(colors)
+            cls._cache[digest] = index
+        return index
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+    def _build(self, indices: list[int], depth: int):
+        """Build a k-d tree node: (entry index, axis, left, right)."""
+        if not indices:
+            return None
+        axis = depth % 3
+        indices.sort(key=lambda i: (self._labs[i][axis], i))
+        mid = len(indices) // 2
+        return (
+            indices[mid],
+            axis,
+            self._build(indices[:mid], depth + 1),
+            self._build(indices[mid + 1:], depth + 1),
+        )
+
+    def nearest(self, target: LAB) -> str:
+        """Name of the closest candidate to a Lab color ('' if empty)."""
+        if self._root is None:
+            return ""
+
+        labs = self._labs
+        # Best match as (distance, entry index); lower index breaks ties
+        best = [float('inf'), -1]
+        best_sq = [float('inf')]
+
+        def search(node):
+            if node is None:
+                return
+            index, axis, left, right = node
+
+            dist = lab_distance(target, labs[index])
+            if dist < best[0] or (dist == best[0] and index < best[1]):
+                best[0] = dist
+                best[1] = index
+                best_sq[0] = dist * dist
+
+            diff = target[axis] - labs[index][axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            search(near)
+            # Only visit the far side if it can hold an equal or closer point
+            # (small slack keeps exact ties reachable despite rounding)
+            if diff * diff <= best_sq[0] * (1.0 + 1e-9):
+                search(far)
+
+        search(self._root)
+        return self._names[best[1]]
+
+    def nearest_hex(self, hex_color: str) -> str:
+        """Name of the closest candidate to a hex color."""
+        target = Color.from_hex(hex_color)
+        return self.nearest(rgb_to_lab(target.r, target.g, target.b))
+
+
 def find_closest_color(
     compare_to: str,
     colors: list[dict[str, str]]
@@ -320,6 +438,7 @@ def find_closest_color(
     Find the closest named color from a list (matugen-compatible).
 
     Uses Lab color space Euclidean distance for perceptual color matching.
+    Candidate lists are indexed once (see LabColorIndex) and reused.
 
     Args:
         compare_to: Hex color to compare (e.g., "#ff5500")
@@ -331,23 +450,4 @@ def find_closest_color(
     if not colors:
         return ""
 
-    # Parse target color
-    target = Color.from_hex(compare_to)
-    target_lab = rgb_to_lab(target.r, target.g, target.b)
-
-    closest_name = ""
-    closest_dist = float('inf')
-
-    for entry in colors:
-        try:
-            entry_color = Color.from_hex(entry["color"])
-            entry_lab = rgb_to_lab(entry_color.r, entry_color.g, entry_color.b)
-            dist = lab_distance(target_lab, entry_lab)
-            if dist < closest_dist:
-                closest_dist = dist
-                closest_name = entry["name"]
-        except (KeyError, ValueError):
-            # Skip invalid entries
-            continue
-
-    return closest_name
+    return LabColorIndex.for_colors(colors).nearest_hex(compare_to)
@@ -0,0 +1,278 @@
+"""
+Wallpaper color extraction shared by the CLI entry points.
+
+Maps scheme types to the extraction method they need. All M3 schemes use the
+same Wu + Score source color, so they share one method (and one cache entry):
+- m3: Wu quantizer + Score on a Triangle-filtered image (matches matugen)
+- vibrant, faithful, dysfunctional, muted: k-means on a Box-filtered image
+
+Progressive extraction runs the same method on a subsampled copy of the
+decoded pixels first, so a usable theme is available long before the full
+pass finishes.
+"""
+
+import math
+import os
+import shutil
+import subprocess
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterator, Optional
+
+from .color import Color
+from .image import read_image, ImageReadError
+from .memprofile import stage
+
+# k-means scoring per non-M3 scheme type
+KMEANS_SCORING = {
+    # Chroma scoring for vibrant, blended colors
+    "vibrant": "chroma",
+    # Picks dominant color by area coverage (what you see in the image)
+    "faithful": "count",
+    # Picks 2nd most dominant color family
+    "dysfunctional": "dysfunctional",
+    # Accepts low/zero chroma colors (monochrome/monotonal wallpapers)
+    "muted": "muted",
+}
+
+# Wallpaper file types considered by directory walks
+IMAGE_SUFFIXES = {".png", ".jpg", ".jpeg", ".webp", ".bmp", ".gif"}
+
+# Progressive extraction: the coarse pass keeps every 4th pixel in both
+# directions (112x112 -> 28x28)
+COARSE_STRIDE = 4
+
+
+def extraction_method(scheme_type: str) -> str:
+    """Extraction method used for a scheme type ("m3" or the k-means scheme)."""
+    return scheme_type if scheme_type in KMEANS_SCORING else "m3"
+
+
+def resize_filter_for(method: str) -> str:
+    """ImageMagick resize filter for an extraction method.
+
+    M3 schemes use Triangle (matches matugen), others use Box (sharper
+    downscale preserves distinct color regions for k-means).
+    """
+    return "Triangle" if method == "m3" else "Box"
+
+
+def palette_from_pixels(pixels: list, method: str) -> list[Color]:
+    """Extract the palette for an extraction method from decoded pixels."""
+    if method == "m3":
+        from .quantizer import extract_source_color, source_color_to_rgb
+
+        # Wu quantizer + Score algorithm (matches matugen)
+        source_argb = extract_source_color(pixels)
+        r, g, b = source_color_to_rgb(source_argb)
+        return [Color(r, g, b)]
+
+    from .palette import extract_palette
+
+    return extract_palette(pixels, k=5, scoring=KMEANS_SCORING[method])
+
+
+def extract_image_palettes(image_path: Path, methods: list[str], max_pixels: Optional[int] = None) -> dict[str, list[Color]]:
+    """Extract palettes for several methods, decoding once per resize filter.
+
+    max_pixels bounds the native decode fallback (see read_image).
+
+    Raises:
+        ImageReadError: If the image cannot be decoded
+    """
+    palettes = {}
+    pixels_by_filter: dict[str, list] = {}
+    for method in methods:
+        resize_filter = resize_filter_for(method)
+        if resize_filter not in pixels_by_filter:
+            with stage("decode"):
+                pixels_by_filter[resize_filter] = read_image(image_path, resize_filter, max_pixels)
+        palettes[method] = palette_from_pixels(pixels_by_filter[resize_filter], method)
+    return palettes
+
+
+def coarse_pixels(pixels: list, stride: int = COARSE_STRIDE) -> list:
+    """Deterministic subsample of decoded pixels for the coarse pass.
+
+    Square inputs (the 112x112 ImageMagick downscale) are sampled on a
+    stride x stride grid; anything else (native full-size PNG decode) keeps
+    every stride^2-th pixel.
+    """
+    side = math.isqrt(len(pixels))
+    if side * side == len(pixels):
+        return [pixels[y * side + x] for y in range(0, side, stride) for x in range(0, side, stride)]
+    return pixels[::stride * stride]
+
+
+def extract_image_palette_progressive(image_path: Path, method: str, max_pixels: Optional[int] = None) -> Iterator[tuple[str, list[Color]]]:
+    """Yield ("coarse", palette) from subsampled pixels, then ("refined", palette).
+
+    The image is decoded once and both passes are deterministic, so the same
+    image always produces the same pair of palettes.
+
+    Raises:
+        ImageReadError: If the image cannot be decoded
+    """
+    with stage("decode"):
+        pixels = read_image(image_path, resize_filter_for(method), max_pixels)
+    yield "coarse", palette_from_pixels(coarse_pixels(pixels), method)
+    yield "refined", palette_from_pixels(pixels, method)
+
+
+# --- Multi-image batches ---
+
+def _pool_context():
+    """Fork-based multiprocessing context where available.
+
+    Forked workers inherit the parent's already imported (warm) modules
+    instead of re-importing the library in every process.
+    """
+    import multiprocessing
+
+    if "fork" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("fork")
+    return None
+
+
+def _theme_for_image(image_path: str, scheme_type: str, modes: list[str], cache_dir: Optional[str],
+                     max_pixels: Optional[int] = None) -> dict:
+    """Extract (cache-aware) and generate one image's theme; errors become {"error": ...}."""
+    from .cache import ExtractionCache
+    from .theme import generate_theme
+
+    path = Path(image_path)
+    method = extraction_method(scheme_type)
+    cache = ExtractionCache(Path(cache_dir)) if cache_dir else None
+
+    palette = cache.get(path, method, max_pixels) if cache else None
+    if palette is None:
+        if not path.is_file():
+            return {"error": f"Image not found: {image_path}"}
+        try:
+            palette = extract_image_palettes(path, [method], max_pixels)[method]
+        except ImageReadError as e:
+            return {"error": f"Error reading image: {e}"}
+        except Exception as e:
+            return {"error": f"Unexpected error reading image: {e}"}
+        if palette and cache:
+            cache.put(path, {method: palette}, max_pixels)
+
+    if not palette:
+        return {"error": "Could not extract colors from image"}
+
+    return {mode: generate_theme(palette, mode, scheme_type) for mode in modes}
+
+
+def extract_themes(image_paths: list[Path], scheme_type: str, modes: list[str], cache=None, jobs: int = 1,
+                   max_pixels: Optional[int] = None) -> dict[str, dict]:
+    """Generate a theme per image (e.g. one wallpaper per monitor) in one process tree.
+
+    Returns {image path: {mode: colors}}, or {image path: {"error": message}}
+    for images that failed. Images are spread over up to `jobs` workers.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    from . import palette, quantizer, theme  # noqa: F401 - warm modules for forked workers
+
+    cache_dir = str(cache.cache_dir) if cache else None
+    keys = [str(path) for path in image_paths]
+
+    workers = min(max(1, jobs), len(keys))
+    if workers <= 1:
+        return {key: _theme_for_image(key, scheme_type, modes, cache_dir, max_pixels) for key in keys}
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context()) as pool:
+        futures = [pool.submit(_theme_for_image, key, scheme_type, modes, cache_dir, max_pixels) for key in keys]
+        return {key: future.result() for key, future in zip(keys, futures)}
+
+
+# --- Directory pre-warming ---
+
+@dataclass
+class PrewarmStats:
+    """Counts from a prewarm run."""
+    images: int = 0
+    cached: int = 0
+    extracted: int = 0
+    failed: int = 0
+
+
+def find_images(directory: Path) -> list[Path]:
+    """All wallpaper images below a directory (hidden entries skipped), sorted."""
+    images = []
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        for name in files:
+            if not name.startswith('.') and Path(name).suffix.lower() in IMAGE_SUFFIXES:
+                images.append(Path(root) / name)
+    return sorted(images)
+
+
+def _lower_priority():
+    """Pool initializer: run workers at idle CPU and I/O priority."""
+    try:
+        os.nice(10)
+    except OSError:
+        pass
+    # Best-effort idle I/O class (no Python API; util-linux ionice sets it)
+    if shutil.which("ionice"):
+        subprocess.run(
+            ["ionice", "-c", "3", "-p", str(os.getpid())],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=False
+        )
+
+
+def _prewarm_image(image_path: str, methods: list[str], cache_dir: str, max_pixels: Optional[int] = None) -> Optional[str]:
+    """Pool worker: extract and cache one image. Returns an error message on failure."""
+    from .cache import ExtractionCache
+
+    try:
+        palettes = extract_image_palettes(Path(image_path), methods, max_pixels)
+    except ImageReadError as e:
+        return str(e)
+    except Exception as e:
+        return f"Unexpected error: {e}"
+    ExtractionCache(Path(cache_dir)).put(Path(image_path), palettes, max_pixels)
+    return None
+
+
+def prewarm_directory(directory: Path, methods: list[str], cache, jobs: int = 1, verbose: bool = False,
+                      max_pixels: Optional[int] = None) -> PrewarmStats:
+    """Fill the extraction cache for every image below a directory.
+
+    Images whose cache entry is current for all methods are skipped. The
+    rest are extracted in a pool of `jobs` low-priority worker processes.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    stats = PrewarmStats()
+    pending = []
+    for image_path in find_images(directory):
+        stats.images += 1
+        missing = cache.missing(image_path, methods, max_pixels)
+        if missing:
+            pending.append((image_path, missing))
+        else:
+            stats.cached += 1
+
+    if not pending:
+        return stats
+
+    with ProcessPoolExecutor(max_workers=max(1, jobs), mp_context=_pool_context(), initializer=_lower_priority) as pool:
+        futures = {
+            pool.submit(_prewarm_image, str(image_path), missing, str(cache.cache_dir), max_pixels): image_path
+            for image_path, missing in pending
+        }
+        for future in as_completed(futures):
+            image_path = futures[future]
+            error = future.result()
+            if error:
+                stats.failed += 1
+                print(f"Prewarm: skipping {image_path}: {error}", file=sys.stderr)
+            else:
+                stats.extracted += 1
+                if verbose:
+                    print(f"Prewarm: cached {image_path}", file=sys.stderr)
+
+    return stats
@@ -0,0 +1,190 @@
+"""
+Hook execution for template configs.
+
+Templates in a TOML config can define pre_hook/post_hook shell commands.
+Several templates frequently share the same hook (e.g. every GTK output
+triggers the same refresh), so hooks are collected and deduplicated by
+their rendered command string before they are run.
+
+Supports:
+- Deduplication: a command runs at most once per HookRunner
+- Batching: deferred hooks run in a single shell invocation
+- Dry run: hooks are listed instead of executed
+- Trace: per-hook timing and exit status on stderr
+"""
+
+import os
+import shlex
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+
+# Descriptor the batch shell reports hook statuses on (one digit, so any
+# POSIX sh can close it for the hooks)
+_STATUS_FD = 9
+
+
+@dataclass
+class HookResult:
+    """Outcome of a single hook command."""
+    command: str
+    sources: list[str]
+    returncode: Optional[int]
+    duration: float
+
+
+@dataclass
+class _PendingHook:
+    kind: str
+    command: str
+    sources: list[str] = field(default_factory=list)
+
+
+class HookRunner:
+    """
+    Collects template hooks and runs each distinct command once.
+
+    Pre-hooks run immediately (they may prepare files other templates rely
+    on), post-hooks are deferred until flush() so that every output file is
+    written before applications are asked to reload.
+    """
+
+    def __init__(self, batch: bool = False, dry_run: bool = False, trace: bool = False):
+        self.batch = batch
+        self.dry_run = dry_run
+        self.trace = trace
+        self.results: list[HookResult] = []
+        self._seen: dict[tuple[str, str], _PendingHook] = {}
+        self._pending: list[_PendingHook] = []
+
+    def _log_trace(self, message: str):
+        if self.trace:
+            print(f"Hook trace: {message}", file=sys.stderr)
+
+    def _register(self, kind: str, command: str, source: str) -> Optional[_PendingHook]:
+        """Record a hook; returns None if the same command was already seen as this kind of hook."""
+        command = command.strip()
+        if not command:
+            return None
+
+        # A pre_hook and a post_hook with the same text run at different times
+        existing = self._seen.get((kind, command))
+        if existing is not None:
+            existing.sources.append(source)
+            self._log_trace(f"{kind} for '{source}' deduplicated (same as '{existing.sources[0]}')")
+            return None
+
+        hook = _PendingHook(kind, command, [source])
+        self._seen[(kind, command)] = hook
+        return hook
+
+    def run_pre_hook(self, command: str, source: str):
+        """Run a pre-hook now, unless the same command already ran."""
+        hook = self._register("pre_hook", command, source)
+        if hook is None:
+            return
+        if self.dry_run:
+            self._print_dry_run(hook)
+            return
+        self._run_single(hook)
+
+    def add_post_hook(self, command: str, source: str):
+        """Queue a post-hook for flush()."""
+        hook = self._register("post_hook", command, source)
+        if hook is not None:
+            self._pending.append(hook)
+
+    def flush(self) -> list[HookResult]:
+        """Run all queued post-hooks and return their results."""
+        pending, self._pending = self._pending, []
+        if not pending:
+            return []
+
+        if self.dry_run:
+            for hook in pending:
+                self._print_dry_run(hook)
+            return []
+
+        if self.batch and len(pending) > 1:
+            return self._run_batch(pending)
+        return [self._run_single(hook) for hook in pending]
+
+    def reset(self):
+        """Forget seen commands so the next run (e.g. a --watch re-render) executes them again."""
+        self._seen.clear()
+        self._pending = []
+
+    def _print_dry_run(self, hook: _PendingHook):
+        print(f"{hook.kind} [{', '.join(hook.sources)}]: {hook.command}")
+
+    def _record(self, hook: _PendingHook, returncode: Optional[int], duration: float) -> HookResult:
+        result = HookResult(hook.command, hook.sources, returncode, duration)
+        self.results.append(result)
+        status = "failed to start" if returncode is None else f"exit {returncode}"
+        self._log_trace(f"{hook.kind} [{', '.join(hook.sources)}] {status} in {duration * 1000:.1f} ms: {hook.command}")
+        return result
+
+    def _run_single(self, hook: _PendingHook) -> HookResult:
+        """Run one hook in its own shell."""
+        start = time.monotonic()
+        try:
+            completed = subprocess.run(hook.command, shell=True, check=False)
+            returncode = completed.returncode
+        except Exception as e:
+            print(f"Error running {hook.kind} for {hook.sources[0]}: {e}", file=sys.stderr)
+            returncode = None
+        return self._record(hook, returncode, time.monotonic() - start)
+
+    def _run_batch(self, hooks: list[_PendingHook]) -> list[HookResult]:
+        """Run several hooks in one shell.
+
+        Each hook is eval'ed in a subshell, so `cd`/`exit` or a syntax
+        error in one command cannot affect the others. After each hook the
+        outer shell writes "<index> <status>" to a status pipe; reading it as
+        lines arrive gives per-hook timing. The hooks themselves run with the
+        pipe closed, so one that leaves a background process running does
+        not hold the pipe (and flush()) open.
+        """
+        read_fd, write_fd = os.pipe()
+        if write_fd == _STATUS_FD:
+            # Mapping a descriptor onto itself would keep it close-on-exec
+            write_fd, old_fd = os.dup(write_fd), write_fd
+            os.close(old_fd)
+        script_lines = []
+        for index, hook in enumerate(hooks):
+            script_lines.append(f"( eval {shlex.quote(hook.command)} ) {_STATUS_FD}>&-")
+            script_lines.append(f"echo {index} $? >&{_STATUS_FD}")
+        script = "\n".join(script_lines) + "\n"
+
+        start = time.monotonic()
+        try:
+            pid = os.posix_spawnp("sh", ["sh", "-c", script], os.environ,
+                                  file_actions=[(os.POSIX_SPAWN_DUP2, write_fd, _STATUS_FD)])
+        except Exception as e:
+            os.close(read_fd)
+            os.close(write_fd)
+            print(f"Error running batched hooks: {e}", file=sys.stderr)
+            return [self._record(hook, None, 0.0) for hook in hooks]
+        os.close(write_fd)
+
+        statuses: dict[int, tuple[int, float]] = {}
+        last = start
+        with os.fdopen(read_fd) as status_pipe:
+            for line in status_pipe:
+                parts = line.split()
+                if len(parts) != 2:
+                    continue
+                now = time.monotonic()
+                statuses[int(parts[0])] = (int(parts[1]), now - last)
+                last = now
+        os.waitpid(pid, 0)
+        self._log_trace(f"{len(hooks)} post_hook(s) batched into one shell in {(time.monotonic() - start) * 1000:.1f} ms")
+
+        results = []
+        for index, hook in enumerate(hooks):
+            returncode, duration = statuses.get(index, (None, 0.0))
+            results.append(self._record(hook, returncode, duration))
+        return results
@@ -5,92 +5,166 @@ This module provides functions for extracting RGB pixels from image files
 without external dependencies (except ImageMagick for fallback).
 """
 
+import math
 import struct
 import zlib
 from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
 
 # Type alias
 RGB = tuple[int, int, int]
 
+# Approximate memory per decoded pixel: a list slot plus an (r, g, b) tuple,
+# with headroom for the scanline buffers
+DECODED_PIXEL_BYTES = 80
+
+# Compressed PNG data is read and inflated in pieces of this size
+PNG_READ_SIZE = 64 * 1024
+
 
 class ImageReadError(Exception):
     """Raised when image cannot be read or parsed."""
     pass
 
 
-def read_png(path: Path) -> list[RGB]:
+def read_png(path: Path, max_pixels: Optional[int] = None) -> list[RGB]:
     """
     Parse a PNG file and extract RGB pixels.
 
     Supports 8-bit RGB and RGBA color types (most common for wallpapers).
-    Uses zlib for IDAT decompression and handles PNG filters.
+    Uses zlib for IDAT decompression and handles PNG filters. Chunks and
+    scanlines are processed incrementally, so only the pixel list grows
+    with the image size.
+
+    If max_pixels is given and the image has more pixels, it is
+    box-downscaled by an integer factor while decoding and at most
+    max_pixels pixels are returned (bounded memory for huge wallpapers).
     """
     with open(path, 'rb') as f:
-        data = f.read()
+        # Verify PNG signature
+        if f.read(8) != b'\x89PNG\r\n\x1a\n':
+            raise ImageReadError("Invalid PNG signature")
+
+        chunks = _png_chunks(f)
+        width = 0
+        height = 0
+        color_type = 0
+        for chunk_type, chunk_data in chunks:
+            if chunk_type == b'IHDR':
+                width = struct.unpack('>I', chunk_data[0:4])[0]
+                height = struct.unpack('>I', chunk_data[4:8])[0]
+                bit_depth = chunk_data[8]
+                color_type = chunk_data[9]
+
+                if bit_depth != 8:
+                    raise ImageReadError(f"Unsupported bit depth: {bit_depth}")
+                if color_type not in (2, 6):  # RGB or RGBA
+                    raise ImageReadError(f"Unsupported color type: {color_type}")
+                break
 
-    # Verify PNG signature
-    if data[:8] != b'\x89PNG\r\n\x1a\n':
-        raise ImageReadError("Invalid PNG signature")
+        if width == 0:
+            raise ImageReadError("Missing image data")
 
-    pos = 8
-    width = 0
-    height = 0
-    bit_depth = 0
-    color_type = 0
-    idat_chunks: list[bytes] = []
-
-    while pos < len(data):
-        # Read chunk length and type
-        chunk_len = struct.unpack('>I', data[pos:pos+4])[0]
-        chunk_type = data[pos+4:pos+8]
-        chunk_data = data[pos+8:pos+8+chunk_len]
-        pos += 12 + chunk_len  # length + type + data + crc
-
-        if chunk_type == b'IHDR':
-            width = struct.unpack('>I', chunk_data[0:4])[0]
-            height = struct.unpack('>I', chunk_data[4:8])[0]
-            bit_depth = chunk_data[8]
-            color_type = chunk_data[9]
-
-            if bit_depth != 8:
-                raise ImageReadError(f"Unsupported bit depth: {bit_depth}")
-            if color_type not in (2, 6):  # RGB or RGBA
-                raise ImageReadError(f"Unsupported color type: {color_type}")
-
-        elif chunk_type == b'IDAT':
-            idat_chunks.append(chunk_data)
-
-        elif chunk_type == b'IEND':
-            break
+        idat_chunks = (chunk_data for chunk_type, chunk_data in chunks if chunk_type == b'IDAT')
+
+        # Calculate bytes per pixel
+        bpp = 3 if color_type == 2 else 4  # RGB or RGBA
+        rows = _png_scanlines(idat_chunks, width, height, bpp)
+
+        if max_pixels and width * height > max_pixels:
+            pixels = _downscale_rows(rows, width, height, bpp, max_pixels)
+        else:
+            pixels = []
+            for unfiltered in rows:
+                # Extract RGB values (skip alpha if present)
+                for x in range(width):
+                    idx = x * bpp
+                    pixels.append((unfiltered[idx], unfiltered[idx+1], unfiltered[idx+2]))
 
-    if not idat_chunks or width == 0:
+    if not pixels:
         raise ImageReadError("Missing image data")
 
-    # Decompress all IDAT chunks
-    compressed = b''.join(idat_chunks)
-    raw_data = zlib.decompress(compressed)
+    return pixels
 
-    # Calculate bytes per pixel and row
-    bpp = 3 if color_type == 2 else 4  # RGB or RGBA
-    stride = width * bpp + 1  # +1 for filter byte
 
-    pixels: list[RGB] = []
-    prev_row: list[int] = [0] * (width * bpp)
+def _png_chunks(f: BinaryIO) -> Iterator[tuple[bytes, bytes]]:
+    """Yield (type, data) for each PNG chunk, stopping after IEND.
 
-    for y in range(height):
-        row_start = y * stride
-        filter_type = raw_data[row_start]
-        row_data = list(raw_data[row_start + 1:row_start + stride])
+    IDAT data is yielded in pieces of at most PNG_READ_SIZE bytes, so an
+    image stored as one large IDAT chunk is never read into memory whole.
+    """
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        chunk_len, chunk_type = struct.unpack('>I4s', header)
+        if chunk_type == b'IDAT':
+            remaining = chunk_len
+            while remaining > 0:
+                piece = f.read(min(remaining, PNG_READ_SIZE))
+                if not piece:
+                    return
+                remaining -= len(piece)
+                yield chunk_type, piece
+        else:
+            yield chunk_type, f.read(chunk_len)
+        f.read(4)  # crc
+        if chunk_type == b'IEND':
+            return
 
-        # Apply PNG filter reconstruction
-        unfiltered = _png_unfilter(row_data, prev_row, bpp, filter_type)
-        prev_row = unfiltered
 
-        # Extract RGB values (skip alpha if present)
-        for x in range(width):
-            idx = x * bpp
-            r, g, b = unfiltered[idx], unfiltered[idx+1], unfiltered[idx+2]
-            pixels.append((r, g, b))
+def _png_scanlines(idat_chunks: Iterator[bytes], width: int, height: int, bpp: int) -> Iterator[list[int]]:
+    """Decompress IDAT data and yield unfiltered scanlines one at a time."""
+    stride = width * bpp + 1  # +1 for filter byte
+    decompressor = zlib.decompressobj()
+    buffer = bytearray()
+    prev_row: list[int] = [0] * (width * bpp)
+    y = 0
+
+    for chunk in idat_chunks:
+        data = chunk
+        while data and y < height:
+            # Bound the decompressed buffer to a few scanlines
+            buffer += decompressor.decompress(data, stride * 16)
+            data = decompressor.unconsumed_tail
+
+            offset = 0
+            while len(buffer) - offset >= stride and y < height:
+                filter_type = buffer[offset]
+                row_data = list(buffer[offset + 1:offset + stride])
+                offset += stride
+
+                # Apply PNG filter reconstruction
+                prev_row = _png_unfilter(row_data, prev_row, bpp, filter_type)
+                y += 1
+                yield prev_row
+            del buffer[:offset]
+
+
+def _downscale_rows(rows: Iterator[list[int]], width: int, height: int, bpp: int, max_pixels: int) -> list[RGB]:
+    """Box-downscale scanlines by the smallest integer factor that fits max_pixels."""
+    factor = max(1, math.isqrt(width * height // max_pixels))
+    while -(-width // factor) * -(-height // factor) > max_pixels:
+        factor += 1
+    out_width = -(-width // factor)
+
+    pixels: list[RGB] = []
+    sums = [0] * (out_width * 3)
+    block_rows = 0
+    for y, row in enumerate(rows):
+        for c in range(3):
+            channel = row[c::bpp]
+            for ox in range(out_width):
+                sums[ox * 3 + c] += sum(channel[ox * factor:(ox + 1) * factor])
+        block_rows += 1
+
+        if block_rows == factor or y == height - 1:
+            for ox in range(out_width):
+                count = block_rows * (min(width, (ox + 1) * factor) - ox * factor)
+                r, g, b = sums[ox * 3:ox * 3 + 3]
+                pixels.append(((r + count // 2) // count, (g + count // 2) // count, (b + count // 2) // count))
+            sums = [0] * (out_width * 3)
+            block_rows = 0
 
     return pixels
 
@@ -342,7 +416,12 @@ def _parse_ppm(data: bytes) -> list[RGB]:
     return pixels
 
 
-def read_image(path: Path, resize_filter: str = "Triangle") -> list[RGB]:
+def max_pixels_for_memory(limit_bytes: int) -> int:
+    """Largest decoded pixel count whose pixel list fits in limit_bytes."""
+    return max(1, limit_bytes // DECODED_PIXEL_BYTES)
+
+
+def read_image(path: Path, resize_filter: str = "Triangle", max_pixels: Optional[int] = None) -> list[RGB]:
     """
     Read an image file and return its pixels as RGB tuples.
 
@@ -353,6 +432,9 @@ def read_image(path: Path, resize_filter: str = "Triangle") -> list[RGB]:
         path: Path to the image file.
         resize_filter: ImageMagick resize filter. "Triangle" for M3 schemes
                        (matches matugen), "Box" for k-means schemes.
+        max_pixels: Cap on decoded pixels for the native fallback, which
+                    otherwise returns the image at full resolution
+                    (ImageMagick output is always 112x112).
     """
     suffix = path.suffix.lower()
 
@@ -362,5 +444,5 @@ def read_image(path: Path, resize_filter: str = "Triangle") -> list[RGB]:
     except ImageReadError:
         # Fall back to native parsing for PNG
         if suffix == '.png':
-            return read_png(path)
+            return read_png(path, max_pixels)
         raise
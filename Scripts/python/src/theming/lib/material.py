@@ -134,6 +134,16 @@ class _BaseScheme:
         self.source = source_color
         self.error_palette = TonalPalette(25.0, 84.0)  # Material red
 
+    @classmethod
+    def primary_palette_for(cls, source_color: Hct) -> TonalPalette:
+        """Build only the primary palette this scheme derives from a source.
+
+        Cheaper than constructing the scheme when nothing else is needed
+        (e.g. custom colors), since it skips the other palettes. Defaults
+        to the source's own hue and chroma; schemes override it.
+        """
+        return TonalPalette(source_color.hue, source_color.chroma)
+
     @classmethod
     def from_rgb(cls, r: int, g: int, b: int) -> '_BaseScheme':
         """Create scheme from RGB color."""
@@ -255,11 +265,15 @@ class SchemeTonalSpot(_BaseScheme):
     - Neutrals: low chroma (tinted with source hue)
     """
 
+    @classmethod
+    def primary_palette_for(cls, source_color: Hct) -> TonalPalette:
+        return TonalPalette(source_color.hue, 48.0)
+
     def __init__(self, source_color: Hct):
         super().__init__(source_color)
 
         # Primary: source hue with fixed chroma 48
-        self.primary_palette = TonalPalette(source_color.hue, 48.0)
+        self.primary_palette = self.primary_palette_for(source_color)
 
         # Secondary: source hue with lower chroma 16
         self.secondary_palette = TonalPalette(source_color.hue, 16.0)
@@ -286,6 +300,10 @@ class SchemeFruitSalad(_BaseScheme):
     - Neutrals: tinted (chroma 10-16)
     """
 
+    @classmethod
+    def primary_palette_for(cls, source_color: Hct) -> TonalPalette:
+        return TonalPalette((source_color.hue - 50.0) % 360.0, 48.0)
+
     def __init__(self, source_color: Hct):
         super().__init__(source_color)
 
@@ -293,7 +311,7 @@ class SchemeFruitSalad(_BaseScheme):
         rotated_hue = (source_color.hue - 50.0) % 360.0
 
         # Primary: rotated hue with chroma 48
-        self.primary_palette = TonalPalette(rotated_hue, 48.0)
+        self.primary_palette = self.primary_palette_for(source_color)
 
         # Secondary: rotated hue with chroma 36
         self.secondary_palette = TonalPalette(rotated_hue, 36.0)
@@ -319,11 +337,15 @@ class SchemeRainbow(_BaseScheme):
     - Neutrals: pure grayscale (chroma 0)
     """
 
+    @classmethod
+    def primary_palette_for(cls, source_color: Hct) -> TonalPalette:
+        return TonalPalette(source_color.hue, 48.0)
+
     def __init__(self, source_color: Hct):
         super().__init__(source_color)
 
         # Primary: source hue with fixed chroma 48
-        self.primary_palette = TonalPalette(source_color.hue, 48.0)
+        self.primary_palette = self.primary_palette_for(source_color)
 
         # Secondary: source hue with lower chroma 16
         self.secondary_palette = TonalPalette(source_color.hue, 16.0)
@@ -351,11 +373,15 @@ class SchemeContent(_BaseScheme):
     - Neutrals: low chroma (chroma / 8, tinted with source hue)
     """
 
+    @classmethod
+    def primary_palette_for(cls, source_color: Hct) -> TonalPalette:
+        return TonalPalette(source_color.hue, source_color.chroma)
+
     def __init__(self, source_color: Hct):
         super().__init__(source_color)
 
         # Primary: preserve source color's hue and chroma (full preservation)
-        self.primary_palette = TonalPalette(source_color.hue, source_color.chroma)
+        self.primary_palette = self.primary_palette_for(source_color)
 
         # Secondary: same hue, reduced chroma
         # Formula from matugen: max(chroma - 32, chroma * 0.5)
@@ -397,12 +423,16 @@ class SchemeMonochrome(_BaseScheme):
     - Error: hue 25°, chroma 84 (vibrant red)
     """
 
+    @classmethod
+    def primary_palette_for(cls, source_color: Hct) -> TonalPalette:
+        return TonalPalette(source_color.hue, 0.0)
+
     def __init__(self, source_color: Hct):
         super().__init__(source_color)
 
         # All palettes use chroma=0 (grayscale)
         # Source hue is preserved but irrelevant at chroma 0
-        self.primary_palette = TonalPalette(source_color.hue, 0.0)
+        self.primary_palette = self.primary_palette_for(source_color)
         self.secondary_palette = TonalPalette(source_color.hue, 0.0)
         self.tertiary_palette = TonalPalette(source_color.hue, 0.0)
         self.neutral_palette = TonalPalette(source_color.hue, 0.0)
@@ -0,0 +1,172 @@
+"""
+Memory profiling for the theming pipeline (--memprofile).
+
+Pipeline code marks its stages with `stage(name)`, which costs nothing
+unless a MemoryProfiler is active. While profiling, tracemalloc records
+for every stage:
+- peak: the highest traced memory while the stage ran
+- growth: how far that peak rose above the memory in use at stage start
+- retained: memory still held by the stage's results when it ended
+- the source lines whose allocations grew the most during the stage
+
+Stages may nest (e.g. the Wu histogram inside the quantizer); a nested
+stage's peak also counts toward its parent. A stage entered several times
+reports its largest peak and its total time.
+"""
+
+import sys
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Iterator, Optional, TextIO
+
+# tracemalloc (and the pickle module it pulls in) is only imported once a
+# profiler starts: stage() runs on every extraction and must stay free
+
+# Pipeline stages in report order; unknown names are listed after these
+STAGE_ORDER = ("decode", "histogram", "quantizer", "kmeans", "score", "theme", "render")
+
+
+@dataclass
+class StageStats:
+    """Memory and time measured for one pipeline stage."""
+    name: str
+    peak: int = 0
+    growth: int = 0
+    retained: int = 0
+    seconds: float = 0.0
+    calls: int = 0
+    # (file, line) -> bytes allocated by that line and still alive at stage end
+    lines: dict[tuple[str, int], int] = field(default_factory=dict)
+
+
+@dataclass
+class _Frame:
+    name: str
+    start_memory: int
+    peak: int
+    snapshot: Any
+    start_time: float
+
+
+# Profiler that stage() reports to, set by MemoryProfiler.start()
+_active: Optional["MemoryProfiler"] = None
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Mark a pipeline stage for the active profiler (no-op otherwise)."""
+    profiler = _active
+    if profiler is None:
+        yield
+        return
+    with profiler.stage(name):
+        yield
+
+
+def _format_size(size: int) -> str:
+    if abs(size) >= 1024 * 1024:
+        return f"{size / (1024 * 1024):.1f} MiB"
+    return f"{size / 1024:.1f} KiB"
+
+
+class MemoryProfiler:
+    """Per-stage tracemalloc measurements for one run."""
+
+    def __init__(self, top: int = 10):
+        self.top = top
+        self.stages: dict[str, StageStats] = {}
+        self.overall_peak = 0
+        self._stack: list[_Frame] = []
+
+    def start(self):
+        global _active
+        import tracemalloc
+
+        tracemalloc.start()
+        _active = self
+
+    def stop(self):
+        global _active
+        import tracemalloc
+
+        if tracemalloc.is_tracing():
+            self.overall_peak = max(self.overall_peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+        _active = None
+
+    @staticmethod
+    def _snapshot():
+        import tracemalloc
+
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap*>"),
+            tracemalloc.Filter(False, "<unknown>"),
+        ))
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Measure the enclosed code as stage `name`."""
+        import tracemalloc
+
+        if self._stack:
+            # The parent's peak so far must survive reset_peak()
+            parent = self._stack[-1]
+            parent.peak = max(parent.peak, tracemalloc.get_traced_memory()[1])
+
+        snapshot = self._snapshot()
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        frame = _Frame(name, current, current, snapshot, time.perf_counter())
+        self._stack.append(frame)
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - frame.start_time
+            current, peak = tracemalloc.get_traced_memory()
+            peak = max(peak, frame.peak)
+            self._stack.pop()
+
+            stats = self.stages.setdefault(name, StageStats(name))
+            stats.calls += 1
+            stats.seconds += seconds
+            if peak >= stats.peak:
+                stats.peak = peak
+                stats.growth = peak - frame.start_memory
+                stats.retained = current - frame.start_memory
+            for diff in self._snapshot().compare_to(frame.snapshot, "lineno"):
+                if diff.size_diff > 0:
+                    where = diff.traceback[0]
+                    key = (where.filename, where.lineno)
+                    stats.lines[key] = max(stats.lines.get(key, 0), diff.size_diff)
+            frame.snapshot = None
+            self.overall_peak = max(self.overall_peak, peak)
+
+            if self._stack:
+                parent = self._stack[-1]
+                parent.peak = max(parent.peak, peak)
+            tracemalloc.reset_peak()
+
+    def report(self, file: TextIO = sys.stderr):
+        """Print the per-stage table and the top allocating lines."""
+        order = {name: index for index, name in enumerate(STAGE_ORDER)}
+        stages = sorted(self.stages.values(), key=lambda s: (order.get(s.name, len(order)), s.name))
+
+        print("Memory profile (tracemalloc):", file=file)
+        print(f"  {'stage':10} {'peak':>11} {'growth':>11} {'retained':>11} {'time':>10}", file=file)
+        for stats in stages:
+            print(f"  {stats.name:10} {_format_size(stats.peak):>11} {_format_size(stats.growth):>11} "
+                  f"{_format_size(stats.retained):>11} {stats.seconds * 1000:>7.1f} ms", file=file)
+        print(f"  overall peak: {_format_size(self.overall_peak)}", file=file)
+
+        lines = []
+        for stats in stages:
+            for (filename, lineno), size in stats.lines.items():
+                lines.append((size, stats.name, filename, lineno))
+        lines.sort(key=lambda item: -item[0])
+        if lines:
+            print("Top allocating lines (still held at stage end):", file=file)
+            for size, name, filename, lineno in lines[:self.top]:
+                print(f"  {_format_size(size):>11}  [{name}] {filename}:{lineno}", file=file)
@@ -9,6 +9,7 @@ import math
 
 from .color import Color, rgb_to_hsl, hsl_to_rgb, hue_distance, rgb_to_lab, lab_to_rgb, lab_distance
 from .hct import Cam16, Hct
+from .memprofile import stage
 
 # Type aliases
 RGB = tuple[int, int, int]
@@ -564,7 +565,8 @@ def extract_palette(
         List of Color objects, sorted by score
     """
     # Downsample for performance
-    sampled = downsample_pixels(pixels, factor=4)
+    with stage("histogram"):
+        sampled = downsample_pixels(pixels, factor=4)
     total_sampled = len(sampled)
 
     # For population scoring, we need many clusters then score/filter them
@@ -607,33 +609,35 @@ def extract_palette(
             filtered = sampled
 
     # Cluster - returns (centroid_rgb, representative_rgb, count) tuples
-    clusters = kmeans_cluster(filtered, k=cluster_count)
-
-    # Score colors based on method
-    # - chroma: centroid colors (averaged, smoother - vibrant mode)
-    # - count: representative pixels by area dominance (faithful mode)
-    # - muted: like count but accepts low/zero chroma (monochrome wallpapers)
-    # - population: representative colors with Material scoring (M3 schemes)
-    if scoring == "chroma":
-        # Use centroid colors for vibrant mode (smoother, blended)
-        colors_for_scoring = [(c[0], c[2]) for c in clusters]
-        scored = _score_colors_chroma(colors_for_scoring)
-    elif scoring == "count":
-        # Use representative colors with count scoring (faithful mode)
-        colors_for_scoring = [(c[1], c[2]) for c in clusters]
-        scored = _score_colors_count(colors_for_scoring)
-    elif scoring == "dysfunctional":
-        # Use representative colors with dysfunctional scoring (2nd dominant family)
-        colors_for_scoring = [(c[1], c[2]) for c in clusters]
-        scored = _score_colors_dysfunctional(colors_for_scoring)
-    elif scoring == "muted":
-        # Use representative colors with muted scoring (no chroma filter)
-        colors_for_scoring = [(c[1], c[2]) for c in clusters]
-        scored = _score_colors_muted(colors_for_scoring)
-    else:
-        # Use representative colors for M3 schemes
-        colors_for_scoring = [(c[1], c[2]) for c in clusters]
-        scored = _score_colors_population(colors_for_scoring, total_sampled)
+    with stage("kmeans"):
+        clusters = kmeans_cluster(filtered, k=cluster_count)
+
+    with stage("score"):
+        # Score colors based on method
+        # - chroma: centroid colors (averaged, smoother - vibrant mode)
+        # - count: representative pixels by area dominance (faithful mode)
+        # - muted: like count but accepts low/zero chroma (monochrome wallpapers)
+        # - population: representative colors with Material scoring (M3 schemes)
+        if scoring == "chroma":
+            # Use centroid colors for vibrant mode (smoother, blended)
+            colors_for_scoring = [(c[0], c[2]) for c in clusters]
+            scored = _score_colors_chroma(colors_for_scoring)
+        elif scoring == "count":
+            # Use representative colors with count scoring (faithful mode)
+            colors_for_scoring = [(c[1], c[2]) for c in clusters]
+            scored = _score_colors_count(colors_for_scoring)
+        elif scoring == "dysfunctional":
+            # Use representative colors with dysfunctional scoring (2nd dominant family)
+            colors_for_scoring = [(c[1], c[2]) for c in clusters]
+            scored = _score_colors_dysfunctional(colors_for_scoring)
+        elif scoring == "muted":
+            # Use representative colors with muted scoring (no chroma filter)
+            colors_for_scoring = [(c[1], c[2]) for c in clusters]
+            scored = _score_colors_muted(colors_for_scoring)
+        else:
+            # Use representative colors for M3 schemes
+            colors_for_scoring = [(c[1], c[2]) for c in clusters]
+            scored = _score_colors_population(colors_for_scoring, total_sampled)
 
     # Extract colors
     final_colors = [c[0] for c in scored]
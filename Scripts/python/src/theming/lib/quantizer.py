@@ -9,6 +9,7 @@ Together they match the QuantizerCelebi pipeline used by matugen/material-color-
 from typing import Dict, List, Tuple
 
 from .color import rgb_to_lab, lab_to_rgb
+from .memprofile import stage
 
 # Constants matching material-color-utilities
 INDEX_BITS = 5
@@ -77,8 +78,9 @@ class QuantizerWu:
         Returns:
             List of colors in ARGB format
         """
-        self._construct_histogram(pixels)
-        self._compute_moments()
+        with stage("histogram"):
+            self._construct_histogram(pixels)
+            self._compute_moments()
         result_count = self._create_boxes(max_colors)
         return self._create_result(result_count)
 
@@ -406,7 +408,8 @@ def quantize_wu(pixels: List[Tuple[int, int, int]], max_colors: int = 128) -> Di
         Dictionary mapping ARGB colors to pixel counts
     """
     # Convert RGB tuples to ARGB integers
-    argb_pixels = [_argb_from_rgb(r, g, b) for r, g, b in pixels]
+    with stage("histogram"):
+        argb_pixels = [_argb_from_rgb(r, g, b) for r, g, b in pixels]
 
     # Run Wu quantizer
     quantizer = QuantizerWu()
@@ -784,28 +787,31 @@ def extract_source_color(
         return fallback_color
 
     # Quantize using Wu + WSMeans (QuantizerCelebi pipeline like matugen)
-    wu_result = quantize_wu(pixels, max_colors=128)
+    with stage("quantizer"):
+        wu_result = quantize_wu(pixels, max_colors=128)
     starting_clusters = list(wu_result.keys())
-    color_to_count = quantize_wsmeans(pixels, 128, starting_clusters)
-
-    # Filter out low-chroma colors before scoring (like matugen)
-    filtered = {}
-    for argb, count in color_to_count.items():
-        r = (argb >> 16) & 0xFF
-        g = (argb >> 8) & 0xFF
-        b = argb & 0xFF
-        try:
-            cam = Cam16.from_rgb(r, g, b)
-            if cam.chroma >= 5.0:
-                filtered[argb] = count
-        except (ValueError, ZeroDivisionError):
-            continue
+    with stage("kmeans"):
+        color_to_count = quantize_wsmeans(pixels, 128, starting_clusters)
+
+    with stage("score"):
+        # Filter out low-chroma colors before scoring (like matugen)
+        filtered = {}
+        for argb, count in color_to_count.items():
+            r = (argb >> 16) & 0xFF
+            g = (argb >> 8) & 0xFF
+            b = argb & 0xFF
+            try:
+                cam = Cam16.from_rgb(r, g, b)
+                if cam.chroma >= 5.0:
+                    filtered[argb] = count
+            except (ValueError, ZeroDivisionError):
+                continue
 
-    if not filtered:
-        filtered = color_to_count
+        if not filtered:
+            filtered = color_to_count
 
-    # Score and rank colors
-    ranked = score_colors(filtered, desired=4, fallback_color=fallback_color)
+        # Score and rank colors
+        ranked = score_colors(filtered, desired=4, fallback_color=fallback_color)
 
     return ranked[0] if ranked else fallback_color
 
@@ -9,6 +9,9 @@ Supports:
 - For loops: <* for name, value in colors *> ... <* endfor *>
 - If/else: <* if {{ expr }} *> ... <* else *> ... <* endif *>
 - Loop variables: loop.index, loop.first, loop.last
+- Palettes: <* for tone in palettes.primary *> (M3 tones) or
+  palettes.primary.full (tones 0-100), exposing tone.<mode>.<format>
+  and tone.tone
 - Color filters: grayscale, invert, set_alpha, set_lightness, set_hue,
   set_saturation, set_red, set_green, set_blue, lighten, darken,
   saturate, desaturate, auto_lightness, blend, harmonize, to_color
@@ -22,15 +25,18 @@ import re
 import sys
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Optional, Union
+from typing import Any, Iterator, Optional
 
 try:
     import tomllib
 except ImportError:
     tomllib = None
 
+from .atomicfile import AtomicFile
 from .color import Color, find_closest_color
 from .hct import Hct
+from .hooks import HookRunner
+from .scanner import EXPR, TEXT, Token, scan_template, split_pipes
 
 
 # --- Node Types for the template AST ---
@@ -39,11 +45,19 @@ from .hct import Hct
 class TextNode:
     text: str
 
+@dataclass
+class ExprNode:
+    expr: str
+    base: str
+    filters: list[str]
+    line: int = 0
+
 @dataclass
 class ForNode:
     variables: list[str]
     iterable: str
     body: list
+    line: int = 0
 
 @dataclass
 class IfNode:
@@ -51,6 +65,7 @@ class IfNode:
     negated: bool
     then_body: list
     else_body: list = field(default_factory=list)
+    line: int = 0
 
 
 # --- Variable Scope Stack ---
@@ -137,36 +152,87 @@ class TemplateRenderer:
     # Filters that take a hex color argument (+ optional numeric)
     COLOR_ARG_FILTERS = {"blend", "harmonize"}
 
-    # Regex for block delimiters: <* ... *>
-    _BLOCK_RE = re.compile(r'<\*\s*(.*?)\s*\*>', re.DOTALL)
-
-    # Regex for expression tags: {{ ... }}
-    _EXPR_RE = re.compile(r"\{\{\s*([^}\n]+?)\s*\}\}")
-
-    def __init__(self, theme_data: dict[str, dict[str, str]], verbose: bool = True, default_mode: str = "dark", image_path: Optional[str] = None, scheme_type: str = "content"):
+    def __init__(self, theme_data: dict[str, dict[str, str]], verbose: bool = True, default_mode: str = "dark", image_path: Optional[str] = None, scheme_type: str = "content", hooks: Optional[HookRunner] = None, trace: bool = False, source_color: Optional[str] = None):
         self.theme_data = theme_data
         self.closest_color = ""
         self.verbose = verbose
         self.default_mode = default_mode
         self.image_path = image_path
         self.scheme_type = scheme_type
+        # Hex of the extracted source color; lets palettes.* use the real scheme palettes
+        self.source_color = source_color
         self._current_file: Optional[str] = None
+        self._current_line = 0
         self._error_count = 0
         self._colors_map: Optional[dict[str, dict[str, str]]] = None
+        self._scheme = None
+        self._tonal_palettes: dict[str, Any] = {}
+        self._palette_entries: dict[str, list[dict[str, Any]]] = {}
+        self.hooks = hooks or HookRunner()
+        self.trace = trace
+        # Memo of scope-independent expressions for the current theme, shared
+        # by every template rendered through this instance
+        self._expr_memo: dict[str, str] = {}
+        self._expr_memo_hits = 0
+        self._expr_memo_misses = 0
+        # Memo of blend/harmonize results keyed by (value, filter, argument)
+        self._color_arg_memo: dict[tuple[str, str, str], str] = {}
+
+    def _location_prefix(self) -> str:
+        """Format '[file:line] ' for messages about the current template."""
+        if not self._current_file:
+            return ""
+        if self._current_line:
+            return f"[{self._current_file}:{self._current_line}] "
+        return f"[{self._current_file}] "
 
     def _log_error(self, message: str, line_hint: str = ""):
         """Log an error to stderr."""
         self._error_count += 1
-        prefix = f"[{self._current_file}] " if self._current_file else ""
+        prefix = self._location_prefix()
         hint = f" near '{line_hint}'" if line_hint else ""
         print(f"Template error: {prefix}{message}{hint}", file=sys.stderr)
 
     def _log_warning(self, message: str):
         """Log a warning to stderr."""
         if self.verbose:
-            prefix = f"[{self._current_file}] " if self._current_file else ""
+            prefix = self._location_prefix()
             print(f"Template warning: {prefix}{message}", file=sys.stderr)
 
+    def _log_trace(self, message: str):
+        """Log a trace message to stderr (--trace)."""
+        if self.trace:
+            print(f"Template trace: {message}", file=sys.stderr)
+
+    # --- Expression Memo ---
+
+    def _invalidate_memo(self):
+        """Drop memoized results after theme_data changes."""
+        self._expr_memo.clear()
+        self._color_arg_memo.clear()
+        self._colors_map = None
+        self._tonal_palettes.clear()
+        self._palette_entries.clear()
+
+    @property
+    def memo_stats(self) -> dict[str, Any]:
+        """Hit/miss counters for the expression memo."""
+        lookups = self._expr_memo_hits + self._expr_memo_misses
+        return {
+            "entries": len(self._expr_memo),
+            "hits": self._expr_memo_hits,
+            "misses": self._expr_memo_misses,
+            "hit_rate": self._expr_memo_hits / lookups if lookups else 0.0,
+        }
+
+    def log_stats(self):
+        """Report memo statistics via the trace output."""
+        stats = self.memo_stats
+        self._log_trace(
+            f"expression memo: {stats['hits']} hits, {stats['misses']} misses "
+            f"({stats['hit_rate']:.1%} hit rate, {stats['entries']} entries)"
+        )
+
     # --- Colors Map ---
 
     def _build_colors_map(self) -> dict[str, dict[str, str]]:
@@ -194,115 +260,116 @@ class TemplateRenderer:
 
     # --- Palette Support ---
 
-    def _get_palette_entries(self, palette_name: str) -> list[dict[str, str]]:
-        """Get tonal palette entries for iteration."""
-        from .hct import Hct, TonalPalette
+    # Tones exposed by `palettes.<name>`; `palettes.<name>.full` yields 0-100
+    PALETTE_TONES = (0, 5, 10, 15, 20, 25, 30, 35, 40, 50, 60, 70, 80, 90, 95, 98, 99, 100)
+    PALETTE_TONES_FULL = tuple(range(101))
+
+    # Palette name -> (scheme attribute, theme color used when no scheme is available)
+    _PALETTE_SOURCES = {
+        "primary": ("primary_palette", "primary"),
+        "secondary": ("secondary_palette", "secondary"),
+        "tertiary": ("tertiary_palette", "tertiary"),
+        "error": ("error_palette", "error"),
+        "neutral": ("neutral_palette", "surface"),
+        "neutral_variant": ("neutral_variant_palette", "surface_variant"),
+    }
 
-        TONES = [0, 5, 10, 15, 20, 25, 30, 35, 40, 50, 60, 70, 80, 90, 95, 98, 99, 100]
+    def _get_scheme(self):
+        """Lazily build the M3 scheme the theme was generated from, if known."""
+        if self._scheme is None and self.source_color:
+            from .theme import SCHEME_CLASSES
+
+            scheme_class = SCHEME_CLASSES.get(self.scheme_type)
+            if scheme_class is not None:
+                self._scheme = scheme_class.from_hex(self.source_color)
+        return self._scheme
+
+    def _get_tonal_palette(self, palette_name: str):
+        """Get (and cache) the TonalPalette backing `palettes.<name>`."""
+        if palette_name in self._tonal_palettes:
+            return self._tonal_palettes[palette_name]
+
+        from .hct import TonalPalette
+
+        scheme_attr, color_name = self._PALETTE_SOURCES[palette_name]
+        scheme = self._get_scheme()
+        if scheme is not None:
+            # Real source palette: keeps the scheme's hue/chroma instead of
+            # re-deriving them from a tone-mapped (possibly gamut-clipped) hex
+            palette = getattr(scheme, scheme_attr)
+        else:
+            # Predefined and non-M3 themes only have rendered colors
+            mode_data = self.theme_data.get(self.default_mode, {})
+            hex_color = mode_data.get(color_name)
+            if hex_color:
+                color = Color.from_hex(hex_color)
+                palette = TonalPalette.from_rgb(color.r, color.g, color.b)
+            else:
+                palette = None
 
-        palette_color_map = {
-            "primary": "primary",
-            "secondary": "secondary",
-            "tertiary": "tertiary",
-            "error": "error",
-            "neutral": "surface",
-            "neutral_variant": "surface_variant",
-        }
+        self._tonal_palettes[palette_name] = palette
+        return palette
 
-        color_name = palette_color_map.get(palette_name)
-        if not color_name:
+    def _get_palette_entries(self, palette_name: str) -> list[dict[str, Any]]:
+        """Get tonal palette entries for iteration.
+
+        Accepts `primary` (standard M3 tones) or `primary.full` (every tone
+        0-100). Entries are cached, so nested/repeated loops are free.
+        """
+        cached = self._palette_entries.get(palette_name)
+        if cached is not None:
+            return cached
+
+        base_name, _, variant = palette_name.partition('.')
+        if base_name not in self._PALETTE_SOURCES or variant not in ("", "full"):
             self._log_warning(f"Unknown palette: {palette_name}")
             return []
 
-        mode_data = self.theme_data.get(self.default_mode, {})
-        hex_color = mode_data.get(color_name)
-        if not hex_color:
+        palette = self._get_tonal_palette(base_name)
+        if palette is None:
             return []
 
-        color = Color.from_hex(hex_color)
-        palette = TonalPalette.from_rgb(color.r, color.g, color.b)
-
+        tones = self.PALETTE_TONES_FULL if variant == "full" else self.PALETTE_TONES
         entries = []
-        for tone in TONES:
+        for tone in tones:
             tone_hex = palette.get_hex(tone)
             # Each entry is a color modes dict (same hex for all modes in palette context)
-            entries.append({"default": tone_hex, "dark": tone_hex, "light": tone_hex})
+            entries.append({"default": tone_hex, "dark": tone_hex, "light": tone_hex, "tone": tone})
 
+        self._palette_entries[palette_name] = entries
         return entries
 
     # --- Block Parser ---
 
     def _parse_template(self, text: str) -> list:
         """Parse template text into a tree of nodes."""
-        tokens = self._tokenize(text)
+        tokens = scan_template(text)
         nodes, _ = self._parse_nodes(tokens, 0)
         return nodes
 
-    def _tokenize(self, text: str) -> list[Union[str, tuple[str, str]]]:
-        """Split text into raw text strings and ('block', content) tuples.
-
-        Standalone block tags (only content on their line) consume the entire
-        line including the trailing newline, matching matugen's behavior.
-        """
-        tokens = []
-        last_end = 0
-
-        for match in self._BLOCK_RE.finditer(text):
-            start = match.start()
-            end = match.end()
-
-            # Check if this block tag is standalone on its line:
-            # preceded only by whitespace (after newline or start), followed by optional whitespace + newline
-            line_start = text.rfind('\n', last_end, start)
-            line_start = line_start + 1 if line_start != -1 else (last_end if last_end <= start else 0)
-            before_on_line = text[line_start:start]
-
-            if before_on_line.strip() == '':
-                # Check what follows the block tag
-                after_end = end
-                while after_end < len(text) and text[after_end] in (' ', '\t'):
-                    after_end += 1
-                if after_end < len(text) and text[after_end] == '\n':
-                    # Standalone: consume leading whitespace and trailing newline
-                    start = line_start
-                    end = after_end + 1
-                elif after_end == len(text):
-                    # At end of file, still standalone
-                    start = line_start
-                    end = after_end
-
-            # Text before the block
-            if start > last_end:
-                tokens.append(text[last_end:start])
-            # The block command
-            tokens.append(("block", match.group(1).strip()))
-            last_end = end
-
-        # Remaining text after last block
-        if last_end < len(text):
-            tokens.append(text[last_end:])
-
-        return tokens
-
-    def _parse_nodes(self, tokens: list, pos: int, stop_keywords: Optional[set[str]] = None) -> tuple[list, int]:
+    def _parse_nodes(self, tokens: list[Token], pos: int, stop_keywords: Optional[set[str]] = None) -> tuple[list, int]:
         """Parse tokens into nodes, stopping at specified keywords.
 
-        Returns (nodes, position_after_stop_keyword).
+        Returns (nodes, position_of_stop_keyword).
         """
         nodes = []
         stop_keywords = stop_keywords or set()
 
         while pos < len(tokens):
-            token = tokens[pos]
+            kind, value, parts, line, _ = tokens[pos]
 
-            if isinstance(token, str):
-                # Raw text
-                if token:
-                    nodes.append(TextNode(token))
+            if kind == TEXT:
+                nodes.append(TextNode(value))
+                pos += 1
+            elif kind == EXPR:
+                # "{{ }}" has no parts and renders as nothing
+                if parts:
+                    filters = [p.strip() for p in parts[1:]] if len(parts) > 1 else []
+                    nodes.append(ExprNode(value, parts[0].strip(), filters, line))
                 pos += 1
             else:
                 # Block command
-                _, cmd = token
+                cmd = value
 
                 # Check if this is a stop keyword
                 if any(cmd.startswith(kw) for kw in stop_keywords):
@@ -316,21 +383,23 @@ class TemplateRenderer:
                     nodes.append(node)
                 else:
                     # Unknown block command - treat as text
+                    self._current_line = line
                     self._log_warning(f"Unknown block command: {cmd}")
                     pos += 1
 
         return nodes, pos
 
-    def _parse_for(self, tokens: list, pos: int) -> tuple[ForNode, int]:
+    def _parse_for(self, tokens: list[Token], pos: int) -> tuple[ForNode, int]:
         """Parse a for loop block starting at pos."""
-        _, cmd = tokens[pos]
+        _, cmd, _, line, _ = tokens[pos]
         pos += 1
 
         # Parse: for var1, var2 in iterable
         for_match = re.match(r'for\s+(.+?)\s+in\s+(.+)$', cmd)
         if not for_match:
+            self._current_line = line
             self._log_error(f"Invalid for syntax: {cmd}")
-            return ForNode([], "", []), pos
+            return ForNode([], "", [], line), pos
 
         vars_str, iterable = for_match.groups()
         variables = [v.strip() for v in vars_str.split(',')]
@@ -342,12 +411,15 @@ class TemplateRenderer:
         # Skip past 'endfor'
         if pos < len(tokens):
             pos += 1
+        else:
+            self._current_line = line
+            self._log_warning("Missing endfor for block opened here")
 
-        return ForNode(variables, iterable, body), pos
+        return ForNode(variables, iterable, body, line), pos
 
-    def _parse_if(self, tokens: list, pos: int) -> tuple[IfNode, int]:
+    def _parse_if(self, tokens: list[Token], pos: int) -> tuple[IfNode, int]:
         """Parse an if/else/endif block starting at pos."""
-        _, cmd = tokens[pos]
+        _, cmd, _, line, _ = tokens[pos]
         pos += 1
 
         # Parse: if [not] {{ expr }}
@@ -370,8 +442,7 @@ class TemplateRenderer:
 
         else_body = []
         if pos < len(tokens):
-            _, stop_cmd = tokens[pos]
-            if stop_cmd.strip() == "else":
+            if tokens[pos][1] == "else":
                 pos += 1
                 # Parse else body until endif
                 else_body, pos = self._parse_nodes(tokens, pos, stop_keywords={"endif"})
@@ -379,30 +450,38 @@ class TemplateRenderer:
         # Skip past 'endif'
         if pos < len(tokens):
             pos += 1
+        else:
+            self._current_line = line
+            self._log_warning("Missing endif for block opened here")
 
-        return IfNode(condition_expr, negated, then_body, else_body), pos
+        return IfNode(condition_expr, negated, then_body, else_body, line), pos
 
     # --- Node Evaluation ---
 
     def _evaluate_nodes(self, nodes: list, scope: VariableScope) -> str:
         """Evaluate a list of nodes with the given variable scope."""
-        parts = []
+        return ''.join(self._iter_nodes(nodes, scope))
+
+    def _iter_nodes(self, nodes: list, scope: VariableScope) -> Iterator[str]:
+        """Evaluate a list of nodes, yielding output chunks in order."""
         for node in nodes:
             if isinstance(node, TextNode):
-                parts.append(self._resolve_text(node.text, scope))
+                yield node.text
+            elif isinstance(node, ExprNode):
+                self._current_line = node.line
+                yield str(self._resolve_parts(node.base, node.filters, node.expr, scope))
             elif isinstance(node, ForNode):
-                parts.append(self._evaluate_for(node, scope))
+                yield from self._iter_for(node, scope)
             elif isinstance(node, IfNode):
-                parts.append(self._evaluate_if(node, scope))
-        return ''.join(parts)
+                yield from self._iter_if(node, scope)
 
-    def _evaluate_for(self, node: ForNode, scope: VariableScope) -> str:
+    def _iter_for(self, node: ForNode, scope: VariableScope) -> Iterator[str]:
         """Evaluate a for loop node."""
+        self._current_line = node.line
         iterable = self._resolve_iterable(node.iterable, scope)
         if not iterable:
-            return ""
+            return
 
-        results = []
         total = len(iterable)
 
         for index, item in enumerate(iterable):
@@ -426,13 +505,12 @@ class TemplateRenderer:
                 if node.variables:
                     scope.set(node.variables[0], item)
 
-            results.append(self._evaluate_nodes(node.body, scope))
+            yield from self._iter_nodes(node.body, scope)
             scope.pop()
 
-        return ''.join(results)
-
-    def _evaluate_if(self, node: IfNode, scope: VariableScope) -> str:
+    def _iter_if(self, node: IfNode, scope: VariableScope) -> Iterator[str]:
         """Evaluate an if/else node."""
+        self._current_line = node.line
         condition_value = self._resolve_expression(node.condition_expr, scope)
         is_truthy = self._is_truthy(condition_value)
 
@@ -440,9 +518,9 @@ class TemplateRenderer:
             is_truthy = not is_truthy
 
         if is_truthy:
-            return self._evaluate_nodes(node.then_body, scope)
+            yield from self._iter_nodes(node.then_body, scope)
         else:
-            return self._evaluate_nodes(node.else_body, scope)
+            yield from self._iter_nodes(node.else_body, scope)
 
     def _is_truthy(self, value: Any) -> bool:
         """Determine if a value is truthy."""
@@ -490,25 +568,18 @@ class TemplateRenderer:
 
     # --- Expression Resolution ---
 
-    def _resolve_text(self, text: str, scope: VariableScope) -> str:
-        """Resolve all {{ expr }} tags in a text segment."""
-        def replace(match):
-            expr = match.group(1).strip()
-            return str(self._resolve_expression(expr, scope))
-
-        return self._EXPR_RE.sub(replace, text)
-
     def _resolve_expression(self, expr: str, scope: VariableScope) -> Any:
         """Resolve an expression, checking scope variables first, then colors."""
         # Split by pipe for filters
-        parts = self._split_pipes(expr)
+        parts = split_pipes(expr)
 
         if not parts:
             return ""
 
-        base = parts[0].strip()
-        filters = [p.strip() for p in parts[1:]]
+        return self._resolve_parts(parts[0].strip(), [p.strip() for p in parts[1:]], expr, scope)
 
+    def _resolve_parts(self, base: str, filters: list[str], expr: str, scope: VariableScope) -> Any:
+        """Resolve a pre-split expression (base and filters)."""
         # Try scope resolution first
         resolved = self._resolve_from_scope(base, scope)
         if resolved is not None:
@@ -524,40 +595,26 @@ class TemplateRenderer:
                 result_str = self._apply_string_or_color_filter(result_str, filter_str, expr)
             return result_str
 
-        # Fall back to colors.name.mode.format parsing
+        # Fall back to colors.name.mode.format parsing. These only depend on
+        # the theme, so results are memoized by the normalized expression.
         if base.startswith('colors.'):
-            return self._process_color_expression(base, filters, expr)
+            key = '|'.join([base] + filters)
+            cached = self._expr_memo.get(key)
+            if cached is not None:
+                self._expr_memo_hits += 1
+                return cached
+            self._expr_memo_misses += 1
+
+            errors_before = self._error_count
+            result = self._process_color_expression(base, filters, expr)
+            # Never memoize failures: each occurrence must report its error
+            if self._error_count == errors_before:
+                self._expr_memo[key] = result
+            return result
 
         # Unknown expression - return as-is
         return f"{{{{{expr}}}}}"
 
-    def _split_pipes(self, expr: str) -> list[str]:
-        """Split expression by pipe, respecting quoted strings."""
-        parts = []
-        current = []
-        in_quotes = False
-        quote_char = None
-
-        for char in expr:
-            if char in ('"', "'") and not in_quotes:
-                in_quotes = True
-                quote_char = char
-                current.append(char)
-            elif char == quote_char and in_quotes:
-                in_quotes = False
-                quote_char = None
-                current.append(char)
-            elif char == '|' and not in_quotes:
-                parts.append(''.join(current))
-                current = []
-            else:
-                current.append(char)
-
-        if current:
-            parts.append(''.join(current))
-
-        return parts
-
     def _resolve_from_scope(self, base: str, scope: VariableScope) -> Optional[Any]:
         """Resolve a dotted path from scope variables."""
         if not scope.is_active:
@@ -757,6 +814,20 @@ class TemplateRenderer:
             self._log_error(f"Filter '{name}' requires a color argument", raw_expr)
             return value
 
+        # HCT round-trips are the expensive part; loop bodies repeat them per item
+        memo_key = (value.lower(), name, arg)
+        cached = self._color_arg_memo.get(memo_key)
+        if cached is not None:
+            return cached
+
+        errors_before = self._error_count
+        result = self._compute_color_arg_filter(value, name, arg, raw_expr)
+        if self._error_count == errors_before:
+            self._color_arg_memo[memo_key] = result
+        return result
+
+    def _compute_color_arg_filter(self, value: str, name: str, arg: str, raw_expr: str) -> str:
+        """Compute blend or harmonize in HCT space (uncached)."""
         # Parse arguments: "#hexcolor", amount (for blend) or just "#hexcolor" (for harmonize)
         # Support both quoted and unquoted hex
         hex_match = re.match(r'["\']?(#[0-9a-fA-F]{6})["\']?\s*(?:,\s*(.+))?', arg)
@@ -942,6 +1013,7 @@ class TemplateRenderer:
     def render(self, template_text: str) -> str:
         """Render a template string, processing blocks and expressions."""
         self._error_count = 0
+        self._current_line = 0
 
         # Parse template into node tree
         nodes = self._parse_template(template_text)
@@ -961,22 +1033,102 @@ class TemplateRenderer:
 
         return result
 
+    # Output is post-processed and written in blocks of about this many characters
+    STREAM_CHUNK_SIZE = 64 * 1024
+
+    def render_stream(self, template_text: str) -> Iterator[str]:
+        """Render a template string, yielding post-processed output blocks.
+
+        Produces the same text as render() without holding the whole output
+        in memory; error counts are final once the iterator is exhausted.
+        """
+        self._error_count = 0
+        self._current_line = 0
+
+        nodes = self._parse_template(template_text)
+        chunks = self._coalesce(self._iter_nodes(nodes, VariableScope()))
+        if self.closest_color:
+            chunks = self._substitute_closest_color_stream(chunks)
+        yield from self._unescape_stream(chunks)
+
+        if self._error_count > 0:
+            print(f"Template rendering completed with {self._error_count} error(s)", file=sys.stderr)
+
+    def _coalesce(self, chunks: Iterator[str]) -> Iterator[str]:
+        """Join small evaluator chunks into blocks of STREAM_CHUNK_SIZE."""
+        pending = []
+        size = 0
+        for chunk in chunks:
+            pending.append(chunk)
+            size += len(chunk)
+            if size >= self.STREAM_CHUNK_SIZE:
+                yield ''.join(pending)
+                pending = []
+                size = 0
+        if pending:
+            yield ''.join(pending)
+
+    def _substitute_closest_color_stream(self, blocks: Iterator[str]) -> Iterator[str]:
+        """Substitute {{closest_color}} across block boundaries.
+
+        A tag can only straddle a boundary if it starts at the last '{{'
+        with no '}}' after it (or at a trailing '{'), so that tail is carried
+        into the next block.
+        """
+        carry = ""
+        for block in blocks:
+            text = carry + block
+            cut = len(text)
+            open_pos = text.rfind('{{')
+            if open_pos != -1 and text.find('}}', open_pos) == -1:
+                cut = open_pos
+            elif text.endswith('{'):
+                cut = len(text) - 1
+            carry = text[cut:]
+            if cut:
+                yield self._substitute_closest_color(text[:cut])
+        if carry:
+            yield self._substitute_closest_color(carry)
+
+    def _unescape_stream(self, blocks: Iterator[str]) -> Iterator[str]:
+        """Apply the '\\\\' -> '\\' escape across block boundaries.
+
+        Pairs are matched left to right, so a trailing run of backslashes is
+        carried until its end is known.
+        """
+        carry = ""
+        for block in blocks:
+            text = carry + block
+            cut = len(text.rstrip('\\'))
+            carry = text[cut:]
+            if cut:
+                yield text[:cut].replace('\\\\', '\\')
+        if carry:
+            yield carry.replace('\\\\', '\\')
+
     def render_file(self, input_path: Path, output_path: Path) -> bool:
         """Render a template file to an output path.
 
+        Output is streamed into a temporary file next to the target and
+        renamed into place, so readers never see a partially written file
+        and a template with errors leaves the existing output untouched.
+
         Returns True if successful, False if skipped due to errors.
         """
         self._current_file = str(input_path)
         success = False
+        output = None
         try:
             template_text = input_path.read_text()
-            rendered_text = self.render(template_text)
+
+            output = AtomicFile(output_path)
+            for block in self.render_stream(template_text):
+                output.write(block)
 
             if self._error_count > 0:
                 print(f"Skipping {output_path}: template has {self._error_count} error(s)", file=sys.stderr)
             else:
-                output_path.parent.mkdir(parents=True, exist_ok=True)
-                output_path.write_text(rendered_text)
+                output.commit()
                 success = True
         except FileNotFoundError:
             self._log_error(f"Template file not found: {input_path}")
@@ -985,6 +1137,8 @@ class TemplateRenderer:
         except Exception as e:
             self._log_error(f"Unexpected error: {e}")
         finally:
+            if output is not None:
+                output.discard()
             self._current_file = None
         return success
 
@@ -1006,6 +1160,13 @@ class TemplateRenderer:
         },
     }
 
+    # Every tone any custom color token needs, solved once per palette
+    _CUSTOM_COLOR_TONE_SET = tuple(sorted({t for tones in _CUSTOM_COLOR_TONES.values() for t in tones.values()}))
+
+    # Solved tones per (hex, blend, source, scheme type), shared by all renderers
+    # in the process so repeated configs (or re-renders) skip the HCT solves
+    _custom_color_cache: dict[tuple[str, bool, Optional[str], str], dict[int, str]] = {}
+
     def _apply_custom_colors(self, custom_colors: dict[str, Any]):
         """Generate and merge custom color tokens into theme_data.
 
@@ -1015,20 +1176,13 @@ class TemplateRenderer:
         - Uses the same scheme type as the main theme for palette generation
         - Tokens: {name}_source, {name}_value, {name}, on_{name},
           {name}_container, on_{name}_container
+
+        Only the scheme's primary palette is built (not the full scheme),
+        and colors that map to the same palette share its tone solves.
         """
-        from .hct import Hct, TonalPalette
-        from .material import (
-            SchemeTonalSpot, SchemeFruitSalad, SchemeRainbow,
-            SchemeContent, SchemeMonochrome
-        )
+        from .material import SchemeContent
+        from .theme import SCHEME_CLASSES
 
-        SCHEME_CLASSES = {
-            "tonal-spot": SchemeTonalSpot,
-            "content": SchemeContent,
-            "fruit-salad": SchemeFruitSalad,
-            "rainbow": SchemeRainbow,
-            "monochrome": SchemeMonochrome,
-        }
         scheme_class = SCHEME_CLASSES.get(self.scheme_type, SchemeContent)
 
         # Get source color for harmonization (primary from default mode)
@@ -1036,6 +1190,11 @@ class TemplateRenderer:
         mode_data = self.theme_data.get(self.default_mode, {})
         source_hex = mode_data.get("primary") or mode_data.get("source_color")
 
+        # Palettes built during this call, by the (hue, chroma) of their source
+        # color: colors that harmonize to the same source share one palette
+        # and its already-solved tones
+        palettes: dict[tuple[float, float], Any] = {}
+
         for name, config in custom_colors.items():
             # Parse config: either a string "#hex" or {color: "#hex", blend: bool}
             if isinstance(config, str):
@@ -1054,35 +1213,17 @@ class TemplateRenderer:
                 continue
 
             original_color = Color.from_hex(color_hex)
-
-            # Optionally harmonize toward source color
-            if blend and source_hex:
-                src = Color.from_hex(color_hex)
-                target = Color.from_hex(source_hex)
-                src_hct = Hct.from_rgb(src.r, src.g, src.b)
-                target_hct = Hct.from_rgb(target.r, target.g, target.b)
-
-                # M3 harmonize: rotate hue toward target by min(diff * 0.5, 15°)
-                diff = target_hct.hue - src_hct.hue
-                if diff > 180.0:
-                    diff -= 360.0
-                elif diff < -180.0:
-                    diff += 360.0
-                max_rotation = 15.0
-                rotation = min(abs(diff) * 0.5, max_rotation)
-                if diff < 0:
-                    rotation = -rotation
-                new_hue = (src_hct.hue + rotation) % 360.0
-                harmonized_hct = Hct(new_hue, src_hct.chroma, src_hct.tone)
-                r, g, b = harmonized_hct.to_rgb()
-                palette_color = Color(r, g, b)
-            else:
-                palette_color = original_color
-
-            # Generate palette using the scheme class (matches matugen behavior)
-            palette_hct = Hct.from_rgb(palette_color.r, palette_color.g, palette_color.b)
-            scheme = scheme_class(palette_hct)
-            palette = scheme.primary_palette
+            harmonize_to = source_hex.lower() if blend and source_hex else None
+
+            cache_key = (color_hex.lower(), bool(blend), harmonize_to, self.scheme_type)
+            palette_tones = self._custom_color_cache.get(cache_key)
+            if palette_tones is None:
+                source = self._custom_color_source(original_color, harmonize_to)
+                palette = palettes.get((source.hue, source.chroma))
+                if palette is None:
+                    palette = palettes[(source.hue, source.chroma)] = scheme_class.primary_palette_for(source)
+                palette_tones = {t: palette.get_hex(t) for t in self._CUSTOM_COLOR_TONE_SET}
+                self._custom_color_cache[cache_key] = palette_tones
 
             # Generate tokens for each mode
             for mode in self.theme_data:
@@ -1095,36 +1236,106 @@ class TemplateRenderer:
                 self.theme_data[mode][f"{name}_value"] = original_color.to_hex()
 
                 # Primary role tokens from the tonal palette
-                self.theme_data[mode][name] = palette.get_hex(tones["color"])
-                self.theme_data[mode][f"on_{name}"] = palette.get_hex(tones["on_color"])
-                self.theme_data[mode][f"{name}_container"] = palette.get_hex(tones["color_container"])
-                self.theme_data[mode][f"on_{name}_container"] = palette.get_hex(tones["on_color_container"])
+                self.theme_data[mode][name] = palette_tones[tones["color"]]
+                self.theme_data[mode][f"on_{name}"] = palette_tones[tones["on_color"]]
+                self.theme_data[mode][f"{name}_container"] = palette_tones[tones["color_container"]]
+                self.theme_data[mode][f"on_{name}_container"] = palette_tones[tones["on_color_container"]]
 
-        # Invalidate colors map cache so new colors appear in iterations
-        self._colors_map = None
+        # Invalidate cached colors map and memoized expressions so new colors apply
+        self._invalidate_memo()
+
+    @staticmethod
+    def _custom_color_source(color: Color, harmonize_to: Optional[str]) -> Hct:
+        """HCT a custom color's palette is built from, optionally harmonized."""
+        src_hct = Hct.from_rgb(color.r, color.g, color.b)
+        if not harmonize_to:
+            return src_hct
+
+        target = Color.from_hex(harmonize_to)
+        target_hct = Hct.from_rgb(target.r, target.g, target.b)
+
+        # M3 harmonize: rotate hue toward target by min(diff * 0.5, 15°)
+        diff = target_hct.hue - src_hct.hue
+        if diff > 180.0:
+            diff -= 360.0
+        elif diff < -180.0:
+            diff += 360.0
+        max_rotation = 15.0
+        rotation = min(abs(diff) * 0.5, max_rotation)
+        if diff < 0:
+            rotation = -rotation
+        new_hue = (src_hct.hue + rotation) % 360.0
+        harmonized_hct = Hct(new_hue, src_hct.chroma, src_hct.tone)
+        r, g, b = harmonized_hct.to_rgb()
+        return Hct.from_rgb(r, g, b)
 
     def _substitute_closest_color(self, text: str) -> str:
         """Substitute {{closest_color}} in text."""
         return re.sub(r"\{\{\s*closest_color\s*\}\}", self.closest_color, text)
 
+    def _render_hook(self, hook: str) -> str:
+        """Render a hook command string (closest_color and color tags)."""
+        if self.closest_color:
+            hook = self._substitute_closest_color(hook)
+        return self.render(hook)
+
     def process_config_file(self, config_path: Path):
         """Process Matugen TOML configuration file."""
+        self.process_config_files([config_path])
+
+    def process_config_files(self, config_paths: list[Path]):
+        """Process several Matugen TOML configuration files in one pass.
+
+        All configs share this renderer (and its memoized colors). Custom
+        colors only apply to the config that defines them, and post-hooks
+        from every config are deduplicated and run once all files are written.
+        """
         if not tomllib:
             print("Error: tomllib module not available (requires Python 3.11+)", file=sys.stderr)
             return
 
+        for config_path in config_paths:
+            self._process_config(config_path)
+
+        self.hooks.flush()
+
+    def load_config(self, config_path: Path) -> Optional[dict]:
+        """Parse a Matugen TOML config; errors are reported and return None."""
         try:
             with open(config_path, "rb") as f:
-                data = tomllib.load(f)
+                return tomllib.load(f)
+        except FileNotFoundError:
+            print(f"Error: Config file not found: {config_path}", file=sys.stderr)
+        except Exception as e:
+            print(f"Error processing config file {config_path}: {e}", file=sys.stderr)
+        return None
+
+    def _process_config(self, config_path: Path):
+        """Render the templates of one config file and queue its hooks."""
+        data = self.load_config(config_path)
+        if data is not None:
+            self.render_config(config_path, data)
 
+    def render_config(self, config_path: Path, data: dict, names: Optional[set[str]] = None):
+        """Render a parsed config's templates (or only `names`) and queue their hooks.
+
+        Post-hooks are not run here; call hooks.flush() once all configs
+        are rendered.
+        """
+        saved_theme_data = None
+        try:
             # Apply custom colors before rendering templates
             config_section = data.get("config", {})
             custom_colors = config_section.get("custom_colors")
             if custom_colors:
+                saved_theme_data = {mode: dict(colors) for mode, colors in self.theme_data.items()}
                 self._apply_custom_colors(custom_colors)
 
             templates = data.get("templates", {})
             for name, template in templates.items():
+                if names is not None and name not in names:
+                    continue
+
                 input_path = template.get("input_path")
                 output_path = template.get("output_path")
 
@@ -1144,31 +1355,20 @@ class TemplateRenderer:
 
                 self.render_file(Path(input_path).expanduser(), Path(output_path).expanduser())
 
-                # Execute pre_hook if specified
+                # Execute pre_hook if specified (identical commands run once per run)
                 pre_hook = template.get("pre_hook")
                 if pre_hook:
-                    import subprocess
-                    if self.closest_color:
-                        pre_hook = self._substitute_closest_color(pre_hook)
-                    pre_hook = self.render(pre_hook)
-                    try:
-                        subprocess.run(pre_hook, shell=True, check=False)
-                    except Exception as e:
-                        print(f"Error running pre_hook for {name}: {e}", file=sys.stderr)
-
-                # Execute post_hook if specified
+                    self.hooks.run_pre_hook(self._render_hook(pre_hook), name)
+
+                # Queue post_hook; queued hooks are deduplicated and run after all templates
                 post_hook = template.get("post_hook")
                 if post_hook:
-                    import subprocess
-                    if self.closest_color:
-                        post_hook = self._substitute_closest_color(post_hook)
-                    post_hook = self.render(post_hook)
-                    try:
-                        subprocess.run(post_hook, shell=True, check=False)
-                    except Exception as e:
-                        print(f"Error running post_hook for {name}: {e}", file=sys.stderr)
+                    self.hooks.add_post_hook(self._render_hook(post_hook), name)
 
-        except FileNotFoundError:
-            print(f"Error: Config file not found: {config_path}", file=sys.stderr)
         except Exception as e:
             print(f"Error processing config file {config_path}: {e}", file=sys.stderr)
+        finally:
+            # Custom colors are scoped to the config that declared them
+            if saved_theme_data is not None:
+                self.theme_data.update(saved_theme_data)
+                self._invalidate_memo()
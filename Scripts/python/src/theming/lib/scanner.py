@@ -0,0 +1,239 @@
+"""
+Single-pass scanner for Matugen-style templates.
+
+Turns template text into a flat token stream in one left-to-right pass:
+- TEXT: literal text
+- EXPR: a {{ ... }} tag, split on pipes (quotes respected) as it is scanned
+- BLOCK: a <* ... *> command
+
+Tokens are plain tuples laid out as Token (kind, value, parts, line,
+column); EXPR/BLOCK tokens carry the 1-based line and column of their
+opening delimiter, so parse/render errors can point at the template source.
+
+Matching rules mirror the previous regex-based tokenizer exactly:
+- Blocks take precedence over expressions; an expression never spans a block
+- An expression ends at the first '}' (which must start '}}') and cannot
+  contain a newline except in the whitespace around it. The next '}' and
+  newline are looked up once and shared by all '{{' before them, so stray
+  '{{' in brace-heavy text (JSON, CSS) cost constant time each
+- A block tag alone on its line consumes the whole line including the
+  trailing newline (matugen behavior)
+"""
+
+from typing import NamedTuple
+
+
+TEXT = "text"
+EXPR = "expr"
+BLOCK = "block"
+
+
+class Token(NamedTuple):
+    """Token layout (the scanner emits plain tuples in this order)."""
+    kind: str
+    # TEXT: the literal text; EXPR: stripped expression; BLOCK: stripped command
+    value: str
+    # EXPR only: pipe-separated parts (base first, then filters), unstripped
+    parts: list[str]
+    line: int
+    column: int
+
+
+def _split_range(text: str, start: int, end: int) -> list[str]:
+    """Split text[start:end] by '|', ignoring pipes inside quoted strings.
+
+    An unclosed quote runs to the end; a trailing empty segment is dropped
+    (e.g. "a |" -> ["a "]).
+    """
+    if text.find('"', start, end) == -1 and text.find("'", start, end) == -1:
+        parts = text[start:end].split('|')
+        if not parts[-1]:
+            parts.pop()
+        return parts
+
+    parts = []
+    segment = start
+    pos = start
+    while True:
+        pipe = text.find('|', pos, end)
+        bound = pipe if pipe != -1 else end
+        double = text.find('"', pos, bound)
+        single = text.find("'", pos, bound)
+        quote = min(double, single) if double != -1 and single != -1 else max(double, single)
+        if quote != -1:
+            # Skip the quoted string; its pipes do not split
+            quote_end = text.find(text[quote], quote + 1, end)
+            if quote_end == -1:
+                break
+            pos = quote_end + 1
+            continue
+        if pipe == -1:
+            break
+        parts.append(text[segment:pipe])
+        segment = pos = pipe + 1
+
+    if segment < end:
+        parts.append(text[segment:end])
+    return parts
+
+
+def split_pipes(expr: str) -> list[str]:
+    """Split an expression by '|', ignoring pipes inside quoted strings."""
+    return _split_range(expr, 0, len(expr))
+
+
+def scan_template(text: str) -> list[Token]:
+    """Scan template text into a flat list of tokens."""
+    tokens: list[Token] = []
+    length = len(text)
+
+    # Line tracking: offsets only move forward, so count newlines incrementally
+    line = 1
+    line_start = 0
+    counted = 0
+
+    # Any '<*' before this offset has a matching '*>' and is therefore a block
+    last_block_close = text.rfind('*>')
+
+    pos = 0           # scan position
+    text_start = 0    # start of pending literal text
+    block_end = 0     # end of the previous block (standalone-line boundary)
+
+    next_block = text.find('<*')
+    next_expr = text.find('{{')
+    # Next '}' and newline at or after the current expression body (-1: none left)
+    next_brace = text.find('}')
+    next_newline = text.find('\n')
+    # End of the whitespace run after next_newline, once computed
+    newline_skipped = -1
+    after_newline = -1
+
+    while True:
+        if next_block != -1 and next_block + 2 > last_block_close:
+            next_block = -1  # remaining '<*' are never closed: plain text
+
+        if next_block == -1 and next_expr == -1:
+            break
+
+        if next_block != -1 and (next_expr == -1 or next_block <= next_expr):
+            # --- Block: <* command *> ---
+            start = next_block
+            close = text.find('*>', start + 2)
+            end = close + 2
+            command = text[start + 2:close].strip()
+
+            newlines = text.count('\n', counted, start)
+            if newlines:
+                line += newlines
+                line_start = text.rfind('\n', counted, start) + 1
+            counted = start
+            column = start - line_start + 1
+
+            # Standalone if only whitespace precedes it on its line (since the
+            # previous block) and only spaces/tabs + newline/EOF follow it
+            standalone_start = text.rfind('\n', block_end, start)
+            standalone_start = standalone_start + 1 if standalone_start != -1 else block_end
+            if text[standalone_start:start].strip() == '':
+                after = end
+                while after < length and text[after] in ' \t':
+                    after += 1
+                if after < length and text[after] == '\n':
+                    start = standalone_start
+                    end = after + 1
+                elif after == length:
+                    start = standalone_start
+                    end = after
+
+            if start > text_start:
+                tokens.append((TEXT, text[text_start:start], (), 0, 0))
+            tokens.append((BLOCK, command, (), line, column))
+
+            pos = text_start = block_end = end
+            next_block = text.find('<*', pos)
+            if next_expr != -1 and next_expr < pos:
+                next_expr = text.find('{{', pos)
+            continue
+
+        # --- Expression candidate: {{ ... }} ---
+        start = next_expr
+        if next_brace != -1 and next_brace < start + 2:
+            next_brace = text.find('}', start + 2)
+        if next_brace == -1:
+            # No '}' left, so no later '{{' can close either
+            next_expr = -1
+            continue
+        if next_newline != -1 and next_newline < start + 2:
+            next_newline = text.find('\n', start + 2)
+
+        if next_newline == -1 or next_brace < next_newline:
+            # Usual case: no newline before the '}'
+            close = next_brace
+            body = start + 2
+            # "{{ }}" matches (as an empty expression), "{{}}" does not
+            matched = close > body and text.startswith('}}', close)
+        else:
+            # The whitespace before the body may span lines
+            body = start + 2
+            while body < length and text[body].isspace():
+                body += 1
+            if next_newline != -1 and next_newline < body:
+                next_newline = text.find('\n', body)
+
+            close = -1
+            if next_brace == body:
+                # Only whitespace inside: "{{ \n}}" matches, "{{\n}}" does not
+                if text[start + 2:body].strip('\n') != '':
+                    close = body
+            elif next_newline == -1 or next_brace < next_newline:
+                close = next_brace
+            else:
+                # The body ends at the newline; only whitespace may follow before '}}'
+                if newline_skipped != next_newline:
+                    after_newline = next_newline
+                    while after_newline < length and text[after_newline].isspace():
+                        after_newline += 1
+                    newline_skipped = next_newline
+                close = after_newline
+                if close == length or text[close] != '}':
+                    close = -1
+            matched = close != -1 and text.startswith('}}', close)
+
+        # A block starting inside the tag wins over the expression
+        if matched and next_block != -1 and next_block < close:
+            matched = False
+
+        if not matched:
+            # Regex semantics: retry from the next character
+            next_expr = text.find('{{', start + 1)
+            continue
+
+        expr = text[body:close].strip()
+        if '"' in expr or "'" in expr:
+            # Pipes inside quoted strings do not split; expr[0] is the first
+            # non-whitespace character at or after body
+            body = text.find(expr[0], body)
+            parts = _split_range(text, body, body + len(expr))
+        else:
+            parts = expr.split('|')
+            if not parts[-1]:
+                parts.pop()
+
+        newlines = text.count('\n', counted, start)
+        if newlines:
+            line += newlines
+            line_start = text.rfind('\n', counted, start) + 1
+        counted = start
+
+        if start > text_start:
+            tokens.append((TEXT, text[text_start:start], (), 0, 0))
+        tokens.append((EXPR, expr, parts, line, start - line_start + 1))
+
+        pos = text_start = close + 2
+        next_expr = text.find('{{', pos)
+        if next_block != -1 and next_block < pos:
+            next_block = text.find('<*', pos)
+
+    if text_start < length:
+        tokens.append((TEXT, text[text_start:], (), 0, 0))
+
+    return tokens
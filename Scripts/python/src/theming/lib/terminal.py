@@ -1,13 +1,17 @@
 """
 Terminal theme generation for multiple terminal emulators.
 
-Generates native theme files from a unified terminal color schema.
+Generates native theme files from a unified terminal color schema, either
+a predefined scheme's terminal section or one derived from a generated theme.
 Supports: foot, ghostty, kitty, alacritty, wezterm
 """
 
 from __future__ import annotations
 
-from dataclasses import dataclass
+from typing import NamedTuple
+
+from .color import Color
+from .contrast import ensure_contrast
 
 
 def darken_hex(color: str, percent: float) -> str:
@@ -25,8 +29,44 @@ def darken_hex(color: str, percent: float) -> str:
     return f"#{r:02x}{g:02x}{b:02x}"
 
 
-@dataclass
-class TerminalColors:
+# Color name to index mapping for ANSI colors
+COLOR_ORDER = ["black", "red", "green", "yellow", "blue", "magenta", "cyan", "white"]
+
+# Fixed ANSI mapping for themes generated from a wallpaper (theme token names),
+# as in the Assets/Templates/terminal foot and ghostty templates
+THEME_ANSI_NORMAL = {
+    "black": "surface_variant",
+    "red": "error",
+    "green": "primary",
+    "yellow": "secondary",
+    "blue": "tertiary",
+    "magenta": "primary_fixed_dim",
+    "cyan": "secondary_fixed_dim",
+    "white": "on_surface",
+}
+THEME_ANSI_BRIGHT = {
+    "black": "on_surface_variant",
+    "red": "error",
+    "green": "primary",
+    "yellow": "secondary",
+    "blue": "tertiary",
+    "magenta": "primary_fixed_dim",
+    "cyan": "secondary_fixed_dim",
+    "white": "on_surface",
+}
+
+# Minimum contrast against the terminal background (black is a surface tone
+# and is exempt); text-like colors get the WCAG AA ratio
+ANSI_MIN_CONTRAST = 3.0
+TEXT_MIN_CONTRAST = 4.5
+
+
+def _contrasted(color: str, background: str, min_ratio: float) -> str:
+    """Adjust a hex color until it reaches min_ratio against background."""
+    return ensure_contrast(Color.from_hex(color), Color.from_hex(background), min_ratio).to_hex()
+
+
+class TerminalColors(NamedTuple):
     """Terminal color scheme data."""
 
     # Base colors (from JSON)
@@ -105,9 +145,48 @@ class TerminalColors:
             inactive_border=m_secondary
         )
 
+    @classmethod
+    def from_theme(cls, theme: dict[str, str]) -> "TerminalColors":
+        """Derive terminal colors from a generated theme (one mode).
+
+        Uses the fixed THEME_ANSI_* mapping, so every emulator gets the same
+        palette, and raises ANSI/text colors that are too close to the
+        background to a readable contrast.
+
+        Args:
+            theme: Theme colors by token name (surface, on_surface, primary, ...)
+        """
+        background = theme["surface"]
+
+        def ansi(mapping: dict[str, str]) -> dict[str, str]:
+            colors = {}
+            for name, token in mapping.items():
+                color = theme[token]
+                if name != "black":
+                    color = _contrasted(color, background, ANSI_MIN_CONTRAST)
+                colors[name] = color
+            return colors
+
+        selection_bg = theme["tertiary"]
+        data = {
+            "foreground": _contrasted(theme["on_surface"], background, TEXT_MIN_CONTRAST),
+            "background": background,
+            "cursor": theme["on_surface"],
+            "cursorText": background,
+            "selectionFg": _contrasted(theme["on_tertiary"], selection_bg, TEXT_MIN_CONTRAST),
+            "selectionBg": selection_bg,
+            "normal": ansi(THEME_ANSI_NORMAL),
+            "bright": ansi(THEME_ANSI_BRIGHT),
+        }
+        scheme = {
+            "mPrimary": theme["primary"],
+            "mOnPrimary": theme["on_primary"],
+            "mSecondary": theme["secondary"],
+            "mSurfaceVariant": theme["surface_variant"],
+        }
+        return cls.from_dict(data, scheme)
+
 
-# Color name to index mapping for ANSI colors
-COLOR_ORDER = ["black", "red", "green", "yellow", "blue", "magenta", "cyan", "white"]
 
 
 class TerminalGenerator:
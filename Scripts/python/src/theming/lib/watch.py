@@ -0,0 +1,293 @@
+"""
+Watch mode: re-render templates when their sources change.
+
+Theme authors iterate on a template or a user-templates.toml; regenerating
+the whole theme for every save is slow. In watch mode the processor keeps
+the computed theme (and the renderer's memoized colors) in memory and only
+re-renders the templates whose input file or config entry changed.
+
+File changes are detected with inotify (through ctypes, no extra
+dependencies) on the directories containing the watched files, so
+editors that save by writing a new file and renaming it over the old
+one are seen too. Where inotify is unavailable, files are polled.
+Bursts of events (an editor writing a swap file, a backup and then the
+file itself) are debounced into a single re-render.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Iterable, Optional
+
+# inotify(7) constants
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+
+# Directory events that can mean "a watched file now has new content"
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MOVED_FROM | IN_CREATE | IN_DELETE | IN_ATTRIB
+# struct inotify_event header: wd, mask, cookie, len (name follows)
+_EVENT_HEADER = struct.Struct("iIII")
+
+# Quiet period that ends a burst of events
+DEBOUNCE_SECONDS = 0.15
+# Polling fallback interval
+POLL_INTERVAL = 0.5
+
+
+def _file_key(path: Path) -> str:
+    """Absolute (not symlink-resolved) path string used as a watch key."""
+    return os.path.abspath(os.path.expanduser(str(path)))
+
+
+def _load_inotify():
+    """libc with inotify_init1/inotify_add_watch, or None (non-Linux, old libc)."""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1.argtypes = [ctypes.c_int]
+        libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+
+class FileWatcher:
+    """Reports debounced changes to a set of files.
+
+    Uses inotify on the files' directories (and on the directories of
+    their symlink targets); falls back to polling file signatures.
+    """
+
+    def __init__(self, paths: Iterable[Path], debounce: float = DEBOUNCE_SECONDS, poll_interval: float = POLL_INTERVAL):
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._keys: set[str] = set()
+        # Watched path (as seen in events) -> watch key
+        self._aliases: dict[str, str] = {}
+        self._dir_watches: dict[int, str] = {}
+        self._watched_dirs: set[str] = set()
+        self._signatures: dict[str, Optional[tuple]] = {}
+
+        self._fd = -1
+        self._libc = _load_inotify()
+        if self._libc is not None:
+            fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd >= 0:
+                self._fd = fd
+            else:
+                self._libc = None
+        self.set_paths(paths)
+
+    @property
+    def backend(self) -> str:
+        """"inotify" or "poll"."""
+        return "inotify" if self._fd >= 0 else "poll"
+
+    def set_paths(self, paths: Iterable[Path]):
+        """Replace the watched files (new directories are added to inotify)."""
+        self._keys = {_file_key(path) for path in paths}
+        self._aliases = {}
+        for key in self._keys:
+            self._aliases[key] = key
+            self._aliases[os.path.realpath(key)] = key
+        if self._fd >= 0:
+            for alias in list(self._aliases):
+                self._add_dir_watch(os.path.dirname(alias))
+        # Poll signatures are kept for files still watched so no change is lost
+        self._signatures = {
+            key: self._signatures[key] if key in self._signatures else self._signature(key)
+            for key in self._keys
+        }
+
+    def _add_dir_watch(self, directory: str):
+        if directory in self._watched_dirs:
+            return
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), _WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            print(f"Watch warning: cannot watch {directory}: {os.strerror(err)}", file=sys.stderr)
+            return
+        self._dir_watches[wd] = directory
+        self._watched_dirs.add(directory)
+
+    @staticmethod
+    def _signature(key: str) -> Optional[tuple]:
+        try:
+            stat = os.stat(key)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def wait(self) -> set[str]:
+        """Block until watched files change; return their keys after the burst settles."""
+        if self._fd >= 0:
+            return self._wait_inotify()
+        return self._wait_poll()
+
+    # --- inotify ---
+
+    def _read_events(self) -> set[str]:
+        """Drain pending inotify events into the set of changed watch keys."""
+        changed = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset + _EVENT_HEADER.size <= len(data):
+                wd, mask, _cookie, name_len = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = data[offset:offset + name_len].rstrip(b"\0")
+                offset += name_len
+                if mask & IN_Q_OVERFLOW:
+                    # Events were dropped: treat every file as changed
+                    changed.update(self._keys)
+                    continue
+                directory = self._dir_watches.get(wd)
+                if directory is None or not name:
+                    continue
+                key = self._aliases.get(os.path.join(directory, os.fsdecode(name)))
+                if key is not None:
+                    changed.add(key)
+
+    def _wait_inotify(self) -> set[str]:
+        changed: set[str] = set()
+        while not changed:
+            select.select([self._fd], [], [])
+            changed |= self._read_events()
+        # Debounce: keep collecting until no event arrives for `debounce` seconds
+        while select.select([self._fd], [], [], self.debounce)[0]:
+            changed |= self._read_events()
+        return changed
+
+    # --- Polling fallback ---
+
+    def _poll_changes(self) -> set[str]:
+        changed = set()
+        for key in self._keys:
+            signature = self._signature(key)
+            if signature != self._signatures.get(key):
+                self._signatures[key] = signature
+                changed.add(key)
+        return changed
+
+    def _wait_poll(self) -> set[str]:
+        changed: set[str] = set()
+        while not changed:
+            time.sleep(self.poll_interval)
+            changed |= self._poll_changes()
+        while True:
+            time.sleep(self.debounce)
+            more = self._poll_changes()
+            if not more:
+                return changed
+            changed |= more
+
+
+def _changed_templates(old: Optional[dict], new: dict) -> set[str]:
+    """Names of templates in a re-read config that need rendering.
+
+    Everything renders when the [config] section (custom colors) changed;
+    otherwise only added or edited template entries.
+    """
+    new_templates = new.get("templates", {})
+    if old is None or old.get("config", {}) != new.get("config", {}):
+        return set(new_templates)
+    old_templates = old.get("templates", {})
+    return {name for name, template in new_templates.items() if old_templates.get(name) != template}
+
+
+def watch_templates(renderer, config_paths: list[Path], render_specs: list[tuple[Path, Path]],
+                    debounce: float = DEBOUNCE_SECONDS) -> int:
+    """Re-render changed templates until interrupted (--watch).
+
+    Watches the given TOML configs, the input_path of each of their
+    templates and the inputs of -r specs. A changed template file is
+    rendered again with the theme already held by `renderer`; a changed
+    config re-renders only its new or edited entries. Post-hooks run after
+    each batch of changes.
+    """
+    configs: dict[str, tuple[Path, Optional[dict]]] = {}
+    for config_path in config_paths:
+        configs[_file_key(config_path)] = (config_path, renderer.load_config(config_path))
+
+    def template_index() -> dict[str, list[tuple[str, str]]]:
+        """Template input key -> [(config key, template name)]."""
+        index: dict[str, list[tuple[str, str]]] = {}
+        for config_key, (_, data) in configs.items():
+            for name, template in (data or {}).get("templates", {}).items():
+                input_path = template.get("input_path")
+                if input_path:
+                    index.setdefault(_file_key(Path(input_path)), []).append((config_key, name))
+        return index
+
+    renders: dict[str, list[Path]] = {}
+    for input_path, output_path in render_specs:
+        renders.setdefault(_file_key(input_path), []).append(output_path)
+
+    templates = template_index()
+    watcher = FileWatcher([*configs, *templates, *renders], debounce=debounce)
+    print(f"Watch: {len(templates) + len(renders)} template file(s), {len(configs)} config(s) "
+          f"via {watcher.backend}; Ctrl+C to stop", file=sys.stderr)
+
+    try:
+        while True:
+            changed = watcher.wait()
+            start = time.monotonic()
+            # Hooks deduplicate per run; every batch of changes is a new run
+            renderer.hooks.reset()
+
+            # Config key -> template names to render
+            pending: dict[str, set[str]] = {}
+            for key in changed:
+                if key in configs:
+                    config_path, old = configs[key]
+                    new = renderer.load_config(config_path)
+                    if new is None:
+                        continue
+                    configs[key] = (config_path, new)
+                    pending.setdefault(key, set()).update(_changed_templates(old, new))
+            for key in changed:
+                for config_key, name in templates.get(key, ()):
+                    pending.setdefault(config_key, set()).add(name)
+
+            count = 0
+            for config_key, names in pending.items():
+                if names:
+                    config_path, data = configs[config_key]
+                    renderer.render_config(config_path, data, names)
+                    count += len(names)
+            for key in changed:
+                for output_path in renders.get(key, ()):
+                    renderer.render_file(Path(key), output_path)
+                    count += 1
+
+            renderer.hooks.flush()
+
+            templates = template_index()
+            watcher.set_paths([*configs, *templates, *renders])
+            print(f"Watch: re-rendered {count} template(s) in {(time.monotonic() - start) * 1000:.1f} ms",
+                  file=sys.stderr)
+    except KeyboardInterrupt:
+        return 0
+    finally:
+        watcher.close()
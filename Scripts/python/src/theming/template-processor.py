@@ -25,8 +25,21 @@ Options:
     --both           Generate both themes (default)
     -o, --output     Write JSON output to file (stdout if omitted)
     -r, --render     Render a template (input_path:output_path)
-    -c, --config     Path to TOML configuration file with template definitions
+    -c, --config     Path to TOML configuration file with template definitions (repeatable)
     --mode           Theme mode: dark or light
+    --batch-hooks    Run deduplicated post-hooks in a single shell
+    --dry-run-hooks  List hooks instead of running them
+    --trace          Print hook timing/exit status and renderer statistics to stderr
+    --no-cache       Bypass the persistent extraction cache
+    --prewarm DIR    Cache extraction results for all images below DIR (low priority pool)
+    --batch IMAGE..  Generate one theme per image, as a single JSON object keyed by path
+    -j, --jobs       Worker processes for --prewarm and --batch
+    --progressive    Print a coarse theme first, then the refined one if it differs (JSON lines)
+    --watch          Keep running and re-render templates whose input file or config entry changes
+    --memprofile     Report peak memory per pipeline stage and the top allocating lines
+    --memory-cap MB  Bound in-process image decoding (downscales huge PNGs while decoding)
+    --terminal-output  JSON map of terminal IDs to output paths; colors come from the
+                     scheme's terminal section (--scheme) or the generated theme
 
 Input:
     Can be an image file (PNG/JPG) or a JSON color palette file.
@@ -37,6 +50,12 @@ Example:
     python3 template-processor.py ~/wallpaper.jpg --dark -o theme.json
     python3 template-processor.py ~/wallpaper.png -r template.txt:output.txt
     python3 template-processor.py ~/wallpaper.png -c config.toml --mode dark
+    python3 template-processor.py ~/wallpaper.png -c config.toml -c user.toml
+    python3 template-processor.py --prewarm ~/Pictures/Wallpapers --scheme-type content
+    python3 template-processor.py --batch left.png right.png --dark -o themes.json
+    python3 template-processor.py ~/wallpaper.png --progressive
+    python3 template-processor.py ~/wallpaper.png -c user-templates.toml --watch
+    python3 template-processor.py ~/huge.png --memprofile --memory-cap 64
 
 Author: Noctalia Team
 License: MIT
@@ -46,16 +65,12 @@ from __future__ import annotations
 
 import argparse
 import json
+import os
 import sys
 from pathlib import Path
 
-# Import from lib package
-from lib import (
-    read_image, ImageReadError, extract_palette, generate_theme,
-    TemplateRenderer, expand_predefined_scheme,
-    extract_source_color, source_color_to_rgb, Color,
-    TerminalColors, TerminalGenerator
-)
+# lib exports load lazily; each path below imports only what it needs so the
+# frequent predefined-scheme switch skips the extraction/rendering modules
 
 
 def parse_args() -> argparse.Namespace:
@@ -71,6 +86,12 @@ Examples:
   python3 template-processor.py wallpaper.jpg --dark -o theme.json                 # output to file
   python3 template-processor.py wallpaper.png -r template.txt:output.txt           # render template
   python3 template-processor.py wallpaper.png -c config.toml --mode dark           # render config, dark only
+  python3 template-processor.py wallpaper.png -c config.toml -c user.toml          # render several configs
+  python3 template-processor.py --prewarm ~/Pictures/Wallpapers                    # cache extraction results
+  python3 template-processor.py --batch left.png right.png                         # theme per image, one JSON
+  python3 template-processor.py wallpaper.png --progressive                        # coarse theme, then refined
+  python3 template-processor.py wallpaper.png -c user.toml --watch                 # re-render on template edits
+  python3 template-processor.py huge.png --memprofile --memory-cap 64              # memory per stage, bounded decode
         """
     )
 
@@ -123,7 +144,8 @@ Examples:
     parser.add_argument(
         '--config', '-c',
         type=Path,
-        help='Path to TOML configuration file with template definitions'
+        action='append',
+        help='Path to TOML configuration file with template definitions (repeatable; all configs share one extracted theme)'
     )
     parser.add_argument(
         '--mode',
@@ -147,18 +169,195 @@ Examples:
     parser.add_argument(
         '--terminal-output',
         type=str,
-        help='JSON mapping of terminal IDs to output paths: {"foot": "/path/to/output", ...}'
+        help='JSON mapping of terminal IDs to output paths: {"foot": "/path/to/output", ...} '
+             '(from the --scheme terminal section, or derived from the generated theme)'
+    )
+
+    parser.add_argument(
+        '--batch-hooks',
+        action='store_true',
+        help='Run deduplicated post-hooks in a single shell invocation'
+    )
+
+    parser.add_argument(
+        '--dry-run-hooks',
+        action='store_true',
+        help='List deduplicated hooks instead of running them'
+    )
+
+    parser.add_argument(
+        '--trace',
+        action='store_true',
+        help='Print hook timing/exit status and renderer statistics to stderr'
+    )
+
+    parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Do not read or write the persistent extraction cache'
+    )
+
+    parser.add_argument(
+        '--prewarm',
+        type=Path,
+        metavar='DIR',
+        help='Cache extraction results for every image below DIR (for --scheme-type), then exit'
+    )
+
+    parser.add_argument(
+        '--batch',
+        type=Path,
+        nargs='+',
+        metavar='IMAGE',
+        help='Generate a theme per image (e.g. per-monitor wallpapers) as one JSON object keyed by path'
+    )
+
+    parser.add_argument(
+        '--jobs', '-j',
+        type=int,
+        default=max(1, (os.cpu_count() or 2) // 2),
+        help='Worker processes for --prewarm and --batch (default: half the CPUs)'
+    )
+
+    parser.add_argument(
+        '--progressive',
+        action='store_true',
+        help='Print JSON lines to stdout: a theme from a subsampled image first, then the refined '
+             'theme only if the extracted colors changed (-o, templates and terminals use the final theme)'
+    )
+
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='After rendering, watch -r/--config templates and configs and re-render what changes '
+             '(inotify, or polling where unavailable) until interrupted'
+    )
+
+    parser.add_argument(
+        '--memprofile',
+        action='store_true',
+        help='Trace allocations and report peak memory per stage (decode, histogram, quantizer, kmeans, '
+             'score, theme, render) plus the top allocating lines to stderr; implies --no-cache'
+    )
+
+    parser.add_argument(
+        '--memory-cap',
+        type=int,
+        metavar='MB',
+        help='Memory budget for decoded pixels: larger images are downscaled while decoding '
+             '(native PNG fallback) instead of being held at full resolution'
     )
 
     return parser.parse_args()
 
 
+def write_terminal_themes(terminal_colors, terminal_outputs: dict[str, str]):
+    """Write one theme file per terminal ID, all from the same colors."""
+    from lib import TerminalGenerator, write_text_atomic
+
+    generator = TerminalGenerator(terminal_colors)
+
+    for terminal_id, output_path in terminal_outputs.items():
+        try:
+            content = generator.generate(terminal_id)
+            # Terminals watching their theme file must never load a half-written one
+            write_text_atomic(Path(output_path).expanduser(), content)
+        except ValueError as e:
+            print(f"Error generating {terminal_id}: {e}", file=sys.stderr)
+        except IOError as e:
+            print(f"Error writing {output_path}: {e}", file=sys.stderr)
+
+
+def print_progress(stage: str, result: dict, source_color: str | None):
+    """Print one --progressive JSON line and flush it so readers see it immediately."""
+    line = {"stage": stage, "source_color": source_color, "theme": result}
+    print(json.dumps(line), flush=True)
+
+
+def prewarm(args: argparse.Namespace) -> int:
+    """Fill the extraction cache for a wallpaper directory (--prewarm)."""
+    from lib import ExtractionCache, extraction_method, prewarm_directory
+
+    if not args.prewarm.is_dir():
+        print(f"Error: Not a directory: {args.prewarm}", file=sys.stderr)
+        return 1
+
+    method = extraction_method(args.scheme_type)
+    stats = prewarm_directory(args.prewarm, [method], ExtractionCache(), jobs=args.jobs, verbose=args.trace,
+                              max_pixels=max_pixels(args))
+    print(f"Prewarm: {stats.images} image(s), {stats.cached} already cached, "
+          f"{stats.extracted} extracted, {stats.failed} failed", file=sys.stderr)
+    return 0
+
+
+def batch(args: argparse.Namespace, modes: list[str]) -> int:
+    """Generate themes for several images in one run (--batch)."""
+    from lib import ExtractionCache, extract_themes
+
+    cache = None if args.no_cache else ExtractionCache()
+    themes = extract_themes(args.batch, args.scheme_type, modes, cache=cache, jobs=args.jobs, max_pixels=max_pixels(args))
+
+    failed = 0
+    for image, theme in themes.items():
+        if "error" in theme:
+            failed += 1
+            print(f"Error: {image}: {theme['error']}", file=sys.stderr)
+
+    json_output = json.dumps(themes, indent=2)
+    if args.output:
+        try:
+            args.output.write_text(json_output)
+            print(f"Themes written to: {args.output}", file=sys.stderr)
+        except IOError as e:
+            print(f"Error writing output: {e}", file=sys.stderr)
+            return 1
+    else:
+        print(json_output)
+
+    return 1 if failed else 0
+
+
+def max_pixels(args: argparse.Namespace) -> int | None:
+    """Decoded pixel bound for --memory-cap (None if unbounded)."""
+    if not args.memory_cap:
+        return None
+
+    from lib import max_pixels_for_memory
+
+    return max_pixels_for_memory(args.memory_cap * 1024 * 1024)
+
+
 def main() -> int:
     """Main entry point."""
     args = parse_args()
 
+    if not args.memprofile:
+        return run(args)
+
+    # Profile this process; a cache hit would skip the stages worth measuring
+    from lib import MemoryProfiler
+
+    args.no_cache = True
+    profiler = MemoryProfiler()
+    profiler.start()
+    try:
+        return run(args)
+    finally:
+        profiler.stop()
+        profiler.report()
+
+
+def run(args: argparse.Namespace) -> int:
+    """Extract or load the theme, then write outputs and render templates."""
+    if args.prewarm:
+        return prewarm(args)
+
     # Initialize result dictionary
     result: dict[str, dict[str, str]] = {}
+    # Extracted source color (image path only), used for palettes.* in templates
+    source_color: str | None = None
+    # Palette of the last --progressive line, so an unchanged refined result is not repeated
+    progress_palette: list[str] | None = None
 
     # Determine mode from arguments
     if args.mode == 'dark':
@@ -172,12 +371,21 @@ def main() -> int:
     else:
         modes = ["dark", "light"]
 
+    if args.batch:
+        return batch(args, modes)
+
+    if args.watch and not (args.render or args.config):
+        print("Error: --watch requires --render or --config", file=sys.stderr)
+        return 1
+
     # Path 1: Predefined scheme (--scheme flag)
     if args.scheme:
         if not args.scheme.exists():
             print(f"Error: Scheme file not found: {args.scheme}", file=sys.stderr)
             return 1
 
+        from lib import expand_predefined_scheme
+
         try:
             with open(args.scheme, 'r') as f:
                 scheme_data = json.load(f)
@@ -251,58 +459,56 @@ def main() -> int:
                 print(f"Error: Not a file: {args.image}", file=sys.stderr)
                 return 1
 
+            from lib import (
+                ExtractionCache, ImageReadError, extract_image_palette_progressive, extract_image_palettes,
+                extraction_method, generate_theme
+            )
+            from lib.memprofile import stage
+
             # Determine scheme type
             scheme_type = args.scheme_type
 
-            # M3 schemes use Triangle filter (matches matugen), others use Box
-            # (sharper downscale preserves distinct color regions for k-means)
-            m3_schemes = {"tonal-spot", "content", "fruit-salad", "rainbow", "monochrome"}
-            resize_filter = "Triangle" if scheme_type in m3_schemes else "Box"
-
-            try:
-                pixels = read_image(args.image, resize_filter)
-            except ImageReadError as e:
-                print(f"Error reading image: {e}", file=sys.stderr)
-                return 1
-            except Exception as e:
-                print(f"Unexpected error reading image: {e}", file=sys.stderr)
-                return 1
-
-            # Extract palette based on scheme type:
-            # - M3 schemes (tonal-spot, fruit-salad, rainbow, content): Use Wu quantizer + Score
+            # Extract palette based on scheme type (see lib/extraction.py):
+            # - M3 schemes (tonal-spot, fruit-salad, rainbow, content, monochrome): Wu quantizer + Score
             #   This matches matugen's color extraction exactly
-            # - vibrant: Use k-means clustering for colorful/blended colors
-            # - faithful: Use Wu quantizer for primary (dominant by area), k-means for accents
-            # - dysfunctional: Like faithful but picks 2nd most dominant color family
-            # - muted: Like count but without chroma filtering (for monochrome wallpapers)
-            if scheme_type == "vibrant":
-                # K-means with chroma scoring for vibrant, blended colors
-                palette = extract_palette(pixels, k=5, scoring="chroma")
-            elif scheme_type == "faithful":
-                # K-means with count scoring - picks dominant color by area coverage
-                # This ensures primary reflects what you actually see in the image
-                palette = extract_palette(pixels, k=5, scoring="count")
-            elif scheme_type == "dysfunctional":
-                # K-means with dysfunctional scoring - picks 2nd most dominant color family
-                # For when the dominant color is not what you want as primary
-                palette = extract_palette(pixels, k=5, scoring="dysfunctional")
-            elif scheme_type == "muted":
-                # K-means with muted scoring - accepts low/zero chroma colors
-                # For monochrome/monotonal wallpapers where dominant color has low saturation
-                palette = extract_palette(pixels, k=5, scoring="muted")
-            else:
-                # Wu quantizer + Score algorithm (matches matugen)
-                source_argb = extract_source_color(pixels)
-                r, g, b = source_color_to_rgb(source_argb)
-                palette = [Color(r, g, b)]
+            # - vibrant, faithful, dysfunctional, muted: k-means with scheme-specific scoring
+            # Results are cached per image file, so a prewarmed or repeated wallpaper skips decoding
+            # With --progressive, a cache miss first prints a theme from a subsampled image
+            method = extraction_method(scheme_type)
+            cache = None if args.no_cache else ExtractionCache()
+            palette = cache.get(args.image, method, max_pixels(args)) if cache else None
+
+            if palette is None:
+                try:
+                    if args.progressive:
+                        progress = extract_image_palette_progressive(args.image, method, max_pixels(args))
+                        for progress_stage, palette in progress:
+                            if progress_stage == "coarse" and palette:
+                                coarse = {mode: generate_theme(palette, mode, scheme_type) for mode in modes}
+                                print_progress(progress_stage, coarse, palette[0].to_hex())
+                                progress_palette = [color.to_hex() for color in palette]
+                    else:
+                        palette = extract_image_palettes(args.image, [method], max_pixels(args))[method]
+                except ImageReadError as e:
+                    print(f"Error reading image: {e}", file=sys.stderr)
+                    return 1
+                except Exception as e:
+                    print(f"Unexpected error reading image: {e}", file=sys.stderr)
+                    return 1
+
+                if palette and cache:
+                    cache.put(args.image, {method: palette}, max_pixels(args))
 
             if not palette:
                 print("Error: Could not extract colors from image", file=sys.stderr)
                 return 1
 
+            source_color = palette[0].to_hex()
+
             # Generate theme for each mode
-            for mode in modes:
-                result[mode] = generate_theme(palette, mode, scheme_type)
+            with stage("theme"):
+                for mode in modes:
+                    result[mode] = generate_theme(palette, mode, scheme_type)
 
     # Output JSON
     json_output = json.dumps(result, indent=2)
@@ -314,13 +520,25 @@ def main() -> int:
         except IOError as e:
             print(f"Error writing output: {e}", file=sys.stderr)
             return 1
-    elif not args.render and not args.config:
+    elif not args.render and not args.config and not args.progressive:
         print(json_output)
 
+    if args.progressive:
+        palette_hex = [color.to_hex() for color in palette] if source_color else None
+        if progress_palette is None or palette_hex != progress_palette:
+            print_progress("refined", result, source_color)
+
     # Process templates
+    renderer = None
+    render_specs: list[tuple[Path, Path]] = []
+    config_paths: list[Path] = []
     if args.render or args.config:
+        from lib import TemplateRenderer, HookRunner
+        from lib.memprofile import stage
+
         image_path = str(args.image) if args.image else None
-        renderer = TemplateRenderer(result, default_mode=args.default_mode, image_path=image_path, scheme_type=args.scheme_type)
+        hooks = HookRunner(batch=args.batch_hooks, dry_run=args.dry_run_hooks, trace=args.trace)
+        renderer = TemplateRenderer(result, default_mode=args.default_mode, image_path=image_path, scheme_type=args.scheme_type, hooks=hooks, trace=args.trace, source_color=source_color)
 
         if args.render:
             for render_spec in args.render:
@@ -336,60 +554,73 @@ def main() -> int:
                     print(f"Error: Template not found: {input_path}", file=sys.stderr)
                     continue
 
-                renderer.render_file(input_path, output_path)
+                with stage("render"):
+                    renderer.render_file(input_path, output_path)
+                render_specs.append((input_path, output_path))
 
         if args.config:
-            if not args.config.exists():
-                print(f"Error: Config file not found: {args.config}", file=sys.stderr)
-            else:
-                renderer.process_config_file(args.config)
+            for config_path in args.config:
+                if not config_path.exists():
+                    print(f"Error: Config file not found: {config_path}", file=sys.stderr)
+                else:
+                    config_paths.append(config_path)
+            if config_paths:
+                with stage("render"):
+                    renderer.process_config_files(config_paths)
+
+        renderer.log_stats()
 
     # Process terminal output if specified
-    if args.terminal_output and args.scheme:
+    if args.terminal_output:
+        from lib import TerminalColors
+
         try:
             terminal_outputs = json.loads(args.terminal_output)
         except json.JSONDecodeError as e:
             print(f"Error parsing --terminal-output JSON: {e}", file=sys.stderr)
             return 1
 
-        # Load scheme to check for terminal section
-        with open(args.scheme, 'r') as f:
-            scheme_data = json.load(f)
-
         # Determine which mode to use for terminal colors
         mode = args.default_mode
 
-        # Check if scheme has terminal colors
-        mode_data = scheme_data.get(mode, scheme_data)
-        if "terminal" not in mode_data:
-            print(f"Warning: Scheme has no 'terminal' section for mode '{mode}'", file=sys.stderr)
-            return 0
-
         try:
-            # Extract scheme UI colors for derivation (mPrimary, mOnPrimary, mSecondary)
-            scheme_colors = {
-                "mPrimary": mode_data.get("mPrimary"),
-                "mOnPrimary": mode_data.get("mOnPrimary"),
-                "mSecondary": mode_data.get("mSecondary"),
-            }
-            terminal_colors = TerminalColors.from_dict(mode_data["terminal"], scheme_colors)
-            generator = TerminalGenerator(terminal_colors)
-
-            for terminal_id, output_path in terminal_outputs.items():
-                try:
-                    content = generator.generate(terminal_id)
-                    output_file = Path(output_path).expanduser()
-                    output_file.parent.mkdir(parents=True, exist_ok=True)
-                    output_file.write_text(content)
-                except ValueError as e:
-                    print(f"Error generating {terminal_id}: {e}", file=sys.stderr)
-                except IOError as e:
-                    print(f"Error writing {output_path}: {e}", file=sys.stderr)
+            if args.scheme:
+                # Load scheme to check for terminal section
+                with open(args.scheme, 'r') as f:
+                    scheme_data = json.load(f)
+
+                # Check if scheme has terminal colors
+                mode_data = scheme_data.get(mode, scheme_data)
+                if "terminal" not in mode_data:
+                    print(f"Warning: Scheme has no 'terminal' section for mode '{mode}'", file=sys.stderr)
+                    terminal_colors = None
+                else:
+                    # Extract scheme UI colors for derivation (mPrimary, mOnPrimary, mSecondary)
+                    scheme_colors = {
+                        "mPrimary": mode_data.get("mPrimary"),
+                        "mOnPrimary": mode_data.get("mOnPrimary"),
+                        "mSecondary": mode_data.get("mSecondary"),
+                    }
+                    terminal_colors = TerminalColors.from_dict(mode_data["terminal"], scheme_colors)
+            else:
+                # Wallpaper/palette theme: derive from the colors generated above
+                if mode not in result:
+                    mode = next(iter(result))
+                terminal_colors = TerminalColors.from_theme(result[mode])
 
         except KeyError as e:
             print(f"Error: Missing required terminal color: {e}", file=sys.stderr)
             return 1
 
+        if terminal_colors is not None:
+            write_terminal_themes(terminal_colors, terminal_outputs)
+
+    # Keep the theme in memory and re-render edited templates (--watch)
+    if args.watch and renderer is not None:
+        from lib import watch_templates
+
+        return watch_templates(renderer, config_paths, render_specs)
+
     return 0
 
 
@@ -10,50 +10,150 @@ Singleton {
   id: root
 
   // Python scripts
-  readonly property string checkCalendarAvailableScript: Quickshell.shellDir + '/Scripts/python/src/calendar/check-calendar.py'
-  readonly property string listCalendarsScript: Quickshell.shellDir + '/Scripts/python/src/calendar/list-calendars.py'
+  readonly property string calendarSourcesScript: Quickshell.shellDir + '/Scripts/python/src/calendar/calendar-sources.py'
   readonly property string calendarEventsScript: Quickshell.shellDir + '/Scripts/python/src/calendar/calendar-events.py'
 
+  // Range of the events shown, so batches of a new range replace them
+  property int batchStart: 0
+  property int batchEnd: 0
+
   function init() {
     availabilityCheckProcess.running = true;
   }
   function loadCalendars() {
-    listCalendarsProcess.running = true;
+    // The events daemon keeps the list current from registry notifications
+    if (!eventsDaemonProcess.running) {
+      listCalendarsProcess.running = true;
+    }
   }
   function loadEvents(daysAhead = 31, daysBehind = 14) {
-    CalendarService.loading = true;
     CalendarService.lastError = "";
 
-    const now = new Date();
-    const startDate = new Date(now.getTime() - (daysBehind * 24 * 60 * 60 * 1000));
-    const endDate = new Date(now.getTime() + (daysAhead * 24 * 60 * 60 * 1000));
+    // Whole days, so refreshes within a day leave the daemon's range (and its views) alone
+    const startDate = new Date();
+    startDate.setHours(0, 0, 0, 0);
+    startDate.setDate(startDate.getDate() - daysBehind);
+    const endDate = new Date();
+    endDate.setHours(0, 0, 0, 0);
+    endDate.setDate(endDate.getDate() + daysAhead + 1);
+
+    const startTime = Math.floor(startDate.getTime() / 1000);
+    const endTime = Math.floor(endDate.getTime() / 1000);
+
+    if (eventsDaemonProcess.running) {
+      if (startTime !== eventsDaemonProcess.startTime || endTime !== eventsDaemonProcess.endTime) {
+        CalendarService.loading = true;
+        eventsDaemonProcess.startTime = startTime;
+        eventsDaemonProcess.endTime = endTime;
+        eventsDaemonProcess.write(`${startTime} ${endTime}\n`);
+      }
+      return;
+    }
 
-    loadEventsProcess.startTime = Math.floor(startDate.getTime() / 1000);
-    loadEventsProcess.endTime = Math.floor(endDate.getTime() / 1000);
-    loadEventsProcess.running = true;
+    CalendarService.loading = true;
+    eventsDaemonProcess.startTime = startTime;
+    eventsDaemonProcess.endTime = endTime;
+    eventsDaemonProcess.running = true;
 
     Logger.d("Calendar", `Loading events (${daysBehind} days behind, ${daysAhead} days ahead): ${startDate.toLocaleDateString()} to ${endDate.toLocaleDateString()}`);
   }
 
-  // Process to check for evolution-data-server libraries
+  // Merge two event lists sorted like the daemon's snapshots (start, end, key)
+  function mergeEvents(a, b) {
+    const before = (x, y) => x.start !== y.start ? x.start < y.start : x.end !== y.end ? x.end < y.end : x.key <= y.key;
+    const merged = [];
+    let i = 0;
+    let j = 0;
+    while (i < a.length && j < b.length) {
+      merged.push(before(a[i], b[j]) ? a[i++] : b[j++]);
+    }
+    return merged.concat(a.slice(i), b.slice(j));
+  }
+
+  // Apply one JSON line from the events daemon
+  function handleDaemonMessage(line) {
+    let message;
+    try {
+      message = JSON.parse(line);
+    } catch (e) {
+      Logger.d("Calendar", "Failed to parse events: " + e);
+      return;
+    }
+
+    if (message.type === "batch") {
+      // One calendar of a range that is still loading: replace its events.
+      // The first batch of a new range drops the previous range's events
+      const sameRange = message.start === root.batchStart && message.end === root.batchEnd;
+      root.batchStart = message.start;
+      root.batchEnd = message.end;
+      const prefix = message.calendar + "/";
+      // Cached or other-provider events have no key and are kept
+      const kept = sameRange ? CalendarService.events.filter(event => !(event.key && event.key.startsWith(prefix))) : [];
+      CalendarService.loading = false;
+      CalendarService.setEvents(mergeEvents(kept, message.events));
+      Logger.d("Calendar", `Loaded ${message.events.length} events(s) of ${message.calendar}`);
+    } else if (message.type === "snapshot") {
+      CalendarService.loading = false;
+      root.batchStart = message.start;
+      root.batchEnd = message.end;
+      CalendarService.setEvents(message.events);
+      Logger.d("Calendar", `Loaded ${message.events.length} events(s)`);
+    } else if (message.type === "changes") {
+      // Replace every event of the changed components
+      const replaced = new Set(message.keys);
+      const events = CalendarService.events.filter(event => !replaced.has(event.key)).concat(message.events);
+      events.sort((a, b) => a.start - b.start);
+      CalendarService.setEvents(events);
+      Logger.d("Calendar", `Updated ${message.keys.length} event(s)`);
+    } else if (message.type === "calendars") {
+      CalendarService.setCalendars(message.calendars);
+      Logger.d("Calendar", `Found ${message.calendars.length} calendar(s)`);
+    } else if (message.type === "error") {
+      Logger.d("Calendar", `Load events error (${message.calendar}): ${message.message}`);
+      CalendarService.lastError = message.message;
+    }
+  }
+
+  // Process to check for evolution-data-server libraries; also lists the
+  // calendars, so startup loads the typelibs once
   Process {
     id: availabilityCheckProcess
     running: false
-    command: ["sh", "-c", "command -v python3 >/dev/null 2>&1 && python3 " + root.checkCalendarAvailableScript + " || echo 'unavailable: python3 not installed'"]
+    command: ["sh", "-c", "command -v python3 >/dev/null 2>&1 && python3 " + root.calendarSourcesScript + " probe || echo '{\"available\": false, \"error\": \"python3 not installed\"}'"]
 
     stdout: StdioCollector {
       onStreamFinished: {
-        const result = text.trim();
-        if (result === "available") {
+        let result;
+        try {
+          result = JSON.parse(text.trim());
+        } catch (e) {
+          result = {
+            "available": false,
+            "error": text.trim()
+          };
+        }
+
+        if (result.available) {
           CalendarService.dataProvider = CalendarService.dataProvider || root;
           CalendarService.available = true;
         }
 
-        if (CalendarService.available) {
+        // Another provider (khal, vdir) may already own CalendarService.events
+        if (result.available && CalendarService.dataProvider === root) {
           Logger.i("Calendar", "EDS libraries available");
-          loadCalendars();
-        } else {
-          Logger.w("Calendar", "EDS libraries not available: " + result);
+          if (result.error) {
+            Logger.w("Calendar", "Calendar registry error: " + result.error);
+            CalendarService.lastError = result.error;
+          }
+          CalendarService.setCalendars(result.calendars);
+          Logger.d("Calendar", `Found ${result.calendars.length} calendar(s)`);
+
+          // Auto-load events after discovering calendars
+          if (result.calendars.length > 0) {
+            loadEvents();
+          }
+        } else if (!CalendarService.available) {
+          Logger.w("Calendar", "EDS libraries not available: " + result.error);
           CalendarService.lastError = "Evolution Data Server libraries not installed";
         }
       }
@@ -73,7 +173,7 @@ Singleton {
   Process {
     id: listCalendarsProcess
     running: false
-    command: ["python3", root.listCalendarsScript]
+    command: ["python3", root.calendarSourcesScript, "list"]
 
     stdout: StdioCollector {
       onStreamFinished: {
@@ -103,46 +203,35 @@ Singleton {
     }
   }
 
-  // Process to load events
+  // Long-running events process: keeps live EDS views open and prints
+  // JSON lines on changes; range changes are written to its stdin
   Process {
-    id: loadEventsProcess
+    id: eventsDaemonProcess
     running: false
+    stdinEnabled: true
     property int startTime: 0
     property int endTime: 0
 
-    command: ["python3", root.calendarEventsScript, startTime.toString(), endTime.toString()]
+    command: ["python3", root.calendarEventsScript, "--daemon", startTime.toString(), endTime.toString()]
 
-    stdout: StdioCollector {
-      onStreamFinished: {
-        CalendarService.loading = false;
+    stdout: SplitParser {
+      onRead: line => root.handleDaemonMessage(line)
+    }
 
-        try {
-          const events = JSON.parse(text.trim());
-          CalendarService.setEvents(events);
-          Logger.d("Calendar", `Loaded ${events.length} events(s)`);
-        } catch (e) {
-          Logger.d("Calendar", "Failed to parse events: " + e);
-          CalendarService.lastError = "Failed to parse events";
-          // Fall back to cached events
-          CalendarService.loadCachedEvents();
-          Logger.d("Calendar", "Using cached events");
-        }
-      }
+    stderr: SplitParser {
+      onRead: line => Logger.d("Calendar", "Events daemon: " + line)
     }
 
-    stderr: StdioCollector {
-      onStreamFinished: {
+    onExited: function (exitCode, exitStatus) {
+      // Restarted by the next loadEvents() (CalendarService refresh timer)
+      if (CalendarService.loading) {
         CalendarService.loading = false;
-
-        if (text.trim()) {
-          Logger.d("Calendar", "Load events error: " + text);
-          CalendarService.lastError = text.trim();
-
-          // Fall back to cached events
-          CalendarService.loadCachedEvents();
-          Logger.d("Calendar", "Using cached events");
-        }
+        CalendarService.lastError = "Calendar events process exited";
+        // Fall back to cached events
+        CalendarService.loadCachedEvents();
+        Logger.d("Calendar", "Using cached events");
       }
+      Logger.d("Calendar", "Events daemon exited with code: " + exitCode);
     }
   }
 }
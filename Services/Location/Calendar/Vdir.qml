@@ -0,0 +1,157 @@
+pragma Singleton
+
+import QtQuick
+import Quickshell
+import Quickshell.Io
+import qs.Commons
+import qs.Services.Location
+
+Singleton {
+  id: root
+
+  readonly property string vdirEventsScript: Quickshell.shellDir + '/Scripts/python/src/calendar/vdir-events.py'
+
+  function init() {
+    availabilityCheckProcess.running = true;
+  }
+  function loadCalendars() {
+    listCalendarsProcess.running = true;
+  }
+  function loadEvents(daysAhead = 31, daysBehind = 14) {
+    CalendarService.loading = true;
+    CalendarService.lastError = "";
+
+    const startDate = new Date();
+    startDate.setHours(0, 0, 0, 0);
+    startDate.setDate(startDate.getDate() - daysBehind);
+    const endDate = new Date();
+    endDate.setHours(0, 0, 0, 0);
+    endDate.setDate(endDate.getDate() + daysAhead + 1);
+
+    loadEventsProcess.startTime = Math.floor(startDate.getTime() / 1000);
+    loadEventsProcess.endTime = Math.floor(endDate.getTime() / 1000);
+    loadEventsProcess.running = true;
+
+    Logger.d("Calendar", `Loading events (${daysBehind} days behind, ${daysAhead} days ahead): ${startDate.toLocaleDateString()} to ${endDate.toLocaleDateString()}`);
+  }
+
+  // Process to look for vdir calendars (~/.calendars, vdirsyncer's data directory)
+  Process {
+    id: availabilityCheckProcess
+    running: false
+    command: ["sh", "-c", "command -v python3 >/dev/null 2>&1 && python3 " + root.vdirEventsScript + " --list"]
+
+    stdout: StdioCollector {
+      onStreamFinished: {
+        let calendars = [];
+        try {
+          calendars = JSON.parse(text.trim() || "[]");
+        } catch (e) {
+          Logger.d("Calendar", "Failed to parse vdir calendars: " + e);
+        }
+
+        if (calendars.length > 0) {
+          CalendarService.available = true;
+          CalendarService.dataProvider = CalendarService.dataProvider || root;
+        }
+
+        if (calendars.length > 0 && CalendarService.dataProvider === root) {
+          Logger.i("Calendar", "vdir calendars available");
+          // The check already listed them; no need for listCalendarsProcess
+          CalendarService.setCalendars(calendars);
+          loadEvents();
+        } else if (calendars.length === 0) {
+          Logger.w("Calendar", "No vdir calendars found");
+        }
+      }
+    }
+  }
+
+  // Process to list available calendars
+  Process {
+    id: listCalendarsProcess
+    running: false
+    command: ["python3", root.vdirEventsScript, "--list"]
+
+    stdout: StdioCollector {
+      id: listStdout
+    }
+    stderr: StdioCollector {
+      id: listStderr
+    }
+
+    // stderr may only carry warnings: the exit code and stdout decide
+    onExited: function (exitCode) {
+      const errors = (listStderr.text || "").trim();
+      if (errors) {
+        Logger.d("Calendar", "List calendars stderr: " + errors);
+      }
+      if (exitCode !== 0) {
+        CalendarService.lastError = errors || `vdir-events.py --list exited with code ${exitCode}`;
+        return;
+      }
+
+      try {
+        const result = JSON.parse(listStdout.text.trim());
+        CalendarService.setCalendars(result);
+        Logger.d("Calendar", `Found ${result.length} calendar(s)`);
+
+        // Auto-load events after discovering calendars
+        if (result.length > 0) {
+          loadEvents();
+        }
+      } catch (e) {
+        Logger.d("Calendar", "Failed to parse calendars: " + e);
+        CalendarService.lastError = "Failed to parse calendar list";
+      }
+    }
+  }
+
+  // Process to load events; only .ics files changed since the last run are parsed
+  Process {
+    id: loadEventsProcess
+    running: false
+    property int startTime: 0
+    property int endTime: 0
+
+    command: ["python3", root.vdirEventsScript, startTime.toString(), endTime.toString()]
+
+    stdout: StdioCollector {
+      id: eventsStdout
+    }
+    stderr: StdioCollector {
+      id: eventsStderr
+    }
+
+    // stderr may only carry warnings: fall back to the cache only when the
+    // script failed or its output does not parse
+    onExited: function (exitCode) {
+      CalendarService.loading = false;
+      const errors = (eventsStderr.text || "").trim();
+      if (errors) {
+        Logger.d("Calendar", "Load events stderr: " + errors);
+      }
+
+      let events = null;
+      if (exitCode !== 0) {
+        CalendarService.lastError = errors || `vdir-events.py exited with code ${exitCode}`;
+      } else {
+        try {
+          events = JSON.parse(eventsStdout.text.trim());
+        } catch (e) {
+          Logger.d("Calendar", "Failed to parse events: " + e);
+          CalendarService.lastError = "Failed to parse events";
+        }
+      }
+
+      if (events === null) {
+        // Fall back to cached events
+        CalendarService.loadCachedEvents();
+        Logger.d("Calendar", "Using cached events");
+        return;
+      }
+      CalendarService.setEvents(events);
+      Logger.d("Calendar", `Loaded ${events.length} events(s)`);
+    }
+  }
+}
@@ -116,6 +116,7 @@ Singleton {
     }
 
     Khal.init();
+    Vdir.init();
     EvolutionDataServer.init();
   }
 
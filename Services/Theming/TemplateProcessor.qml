@@ -103,6 +103,7 @@ Singleton {
       return;
     }
     const wp = wallpaperPath.replace(/'/g, "'\\''");
+    lastWallpaperDirectory = wallpaperPath.substring(0, wallpaperPath.lastIndexOf('/'));
 
     const script = buildGenerationScript(content, wp, mode);
 
@@ -110,6 +111,21 @@ Singleton {
     generateProcess.running = true;
   }
 
+  // Directory of the last wallpaper themed; prewarmed for slideshow/random rotation
+  property string lastWallpaperDirectory: ""
+
+  /**
+  * Pre-compute extraction results for the wallpaper directory in the background
+  * (low-priority pool, unchanged files skipped) so the next automatic wallpaper
+  * change can be themed without decoding the image.
+  */
+  function prewarmWallpaperDirectory() {
+    if (!Settings.data.colorSchemes.useWallpaperColors || !Settings.data.wallpaper.automationEnabled || !lastWallpaperDirectory || prewarmProcess.running)
+      return;
+    prewarmProcess.command = ["python3", templateProcessorScript, "--prewarm", lastWallpaperDirectory, "--scheme-type", getSchemeType()];
+    prewarmProcess.running = true;
+  }
+
   readonly property string schemeJsonPath: Settings.cacheDir + "predefined-scheme.json"
   readonly property string predefinedConfigPath: Settings.cacheDir + "theming.predefined.toml"
 
@@ -163,11 +179,11 @@ Singleton {
     // Don't pass --mode so templates get both dark and light colors (e.g., zed.json needs both)
     // Pass --default-mode so "default" in templates resolves to the current theme mode
     // Pass wallpaper as positional arg so image_path is available in templates (no extraction occurs when --scheme is used)
+    // Pass --batch-hooks so shared post-hooks run once, in a single shell
+    // User templates (if enabled) are passed as a second --config to the same process
     const wpArg = wallpaperPath ? `'${wallpaperPath.replace(/'/g, "'\\''")}'` : "";
-    script += `python3 "${templateProcessorScript}" ${wpArg} --scheme '${schemeJsonPathEsc}' --config '${configPathEsc}' --default-mode ${mode}\n`;
-
-    // Add user templates if enabled
-    script += buildUserTemplateCommandForPredefined(schemeData, mode, wallpaperPath);
+    script += buildUserConfigArgs();
+    script += `python3 "${templateProcessorScript}" ${wpArg} --scheme '${schemeJsonPathEsc}' --config '${configPathEsc}' "$@" --default-mode ${mode} --batch-hooks\n`;
 
     generateProcess.command = ["sh", "-c", script];
     generateProcess.running = true;
@@ -206,23 +222,13 @@ Singleton {
   }
 
   function addWallpaperTheming(lines, mode) {
-    const homeDir = Quickshell.env("HOME");
     // Noctalia colors JSON
     lines.push("[templates.noctalia]");
     lines.push('input_path = "' + Quickshell.shellDir + '/Assets/Templates/noctalia.json"');
     lines.push('output_path = "' + Settings.configDir + 'colors.json"');
 
-    // Terminal templates
-    TemplateRegistry.terminals.forEach(terminal => {
-                                         if (isTemplateEnabled(terminal.id)) {
-                                           lines.push(`\n[templates.${terminal.id}]`);
-                                           lines.push(`input_path = "${Quickshell.shellDir}/Assets/Templates/${terminal.templatePath}"`);
-                                           const outputPath = terminal.outputPath.replace("~", homeDir);
-                                           lines.push(`output_path = "${outputPath}"`);
-                                           const postHookEsc = escapeTomlString(terminal.postHook);
-                                           lines.push(`post_hook = "${postHookEsc}"`);
-                                         }
-                                       });
+    // Terminal themes are not templates here: buildGenerationScript() passes
+    // --terminal-output so they are derived from the same generated theme
   }
 
   function addApplicationTheming(lines, mode) {
@@ -330,10 +336,19 @@ Singleton {
     // Use template-processor.py (Python implementation)
     // Don't pass --mode so templates get both dark and light colors (e.g., zed.json needs both)
     // Pass --default-mode so "default" in templates resolves to the current theme mode
+    // Pass --batch-hooks so shared post-hooks run once, in a single shell
+    // User templates (if enabled) are passed as a second --config so the wallpaper is only extracted once
     const schemeType = getSchemeType();
-    script += `python3 "${templateProcessorScript}" "$NOCTALIA_WP_PATH" --scheme-type ${schemeType} --config '${pathEsc}' --default-mode ${mode} `;
-
-    script += buildUserTemplateCommand("$NOCTALIA_WP_PATH", mode);
+    script += buildUserConfigArgs();
+    script += `python3 "${templateProcessorScript}" "$NOCTALIA_WP_PATH" --scheme-type ${schemeType} --config '${pathEsc}' "$@" --default-mode ${mode} --batch-hooks`;
+
+    // Terminal themes for all enabled emulators, generated in the same run
+    const terminalOutputs = Settings.data.colorSchemes.useWallpaperColors ? getTerminalOutputs(Quickshell.env("HOME")) : {};
+    if (Object.keys(terminalOutputs).length > 0) {
+      const terminalOutputsJson = JSON.stringify(terminalOutputs).replace(/'/g, "'\\''");
+      script += ` --terminal-output '${terminalOutputsJson}'\n`;
+      script += buildTerminalPostHooks();
+    }
 
     return script + "\n";
   }
@@ -368,13 +383,7 @@ Singleton {
   */
   function handleTerminalThemesGenerate(schemeData, mode, homeDir) {
     // Build terminal output mapping for enabled terminals
-    const terminalOutputs = {};
-    TemplateRegistry.terminals.forEach(terminal => {
-                                         if (isTemplateEnabled(terminal.id)) {
-                                           const outputPath = terminal.outputPath.replace("~", homeDir);
-                                           terminalOutputs[terminal.id] = outputPath;
-                                         }
-                                       });
+    const terminalOutputs = getTerminalOutputs(homeDir);
 
     if (Object.keys(terminalOutputs).length === 0) {
       Logger.d("TemplateProcessor", "No terminal templates enabled for generation");
@@ -403,14 +412,32 @@ Singleton {
     script += `python3 "${templateProcessorScript}" --scheme '${schemeJsonPathEsc}' --default-mode ${mode} --terminal-output '${terminalOutputsJson}'; `;
 
     // Run post-hooks for enabled terminals
+    script += buildTerminalPostHooks();
+
+    copyProcess.command = ["sh", "-c", script];
+    copyProcess.running = true;
+  }
+
+  // Enabled terminal IDs mapped to their expanded output paths
+  function getTerminalOutputs(homeDir) {
+    const terminalOutputs = {};
     TemplateRegistry.terminals.forEach(terminal => {
                                          if (isTemplateEnabled(terminal.id)) {
-                                           script += `${terminal.postHook}; `;
+                                           terminalOutputs[terminal.id] = terminal.outputPath.replace("~", homeDir);
                                          }
                                        });
+    return terminalOutputs;
+  }
 
-    copyProcess.command = ["sh", "-c", script];
-    copyProcess.running = true;
+  // Post-hooks (config include + reload) for enabled terminals
+  function buildTerminalPostHooks() {
+    let script = "";
+    TemplateRegistry.terminals.forEach(terminal => {
+                                         if (isTemplateEnabled(terminal.id)) {
+                                           script += `${terminal.postHook}; `;
+                                         }
+                                       });
+    return script;
   }
 
   /**
@@ -498,44 +525,18 @@ Singleton {
   // ================================================================================
   // USER TEMPLATES, advanced usage
   // ================================================================================
-  function buildUserTemplateCommand(input, mode) {
+  // Sets the positional parameters to the extra --config argument for
+  // user-templates.toml (when enabled and present); expanded as "$@"
+  function buildUserConfigArgs() {
     if (!Settings.data.templates.enableUserTheming)
-      return "";
-
-    const userConfigPath = getUserConfigPath();
-    let script = "\n# Execute user config if it exists\n";
-    script += `if [ -f '${userConfigPath}' ]; then\n`;
-    // If input is a shell variable (starts with $), use double quotes to allow expansion
-    // Otherwise, use single quotes for safety with file paths
-    const inputQuoted = input.startsWith("$") ? `"${input}"` : `'${input.replace(/'/g, "'\\''")}'`;
-
-    const schemeType = getSchemeType();
-    // Don't pass --mode so user templates get both dark and light colors
-    // Pass --default-mode so "default" in templates resolves to the current theme mode
-    script += `  python3 "${templateProcessorScript}" ${inputQuoted} --scheme-type ${schemeType} --config '${userConfigPath}' --default-mode ${mode}\n`;
-    script += "fi";
-
-    return script;
-  }
-
-  function buildUserTemplateCommandForPredefined(schemeData, mode, wallpaperPath) {
-    if (!Settings.data.templates.enableUserTheming)
-      return "";
+      return "set --\n";
 
     const userConfigPath = getUserConfigPath();
-
-    // Reuse the scheme JSON already written by processPredefinedScheme()
-    const schemeJsonPathEsc = schemeJsonPath.replace(/'/g, "'\\''");
-    const wpArg = wallpaperPath ? `'${wallpaperPath.replace(/'/g, "'\\''")}'` : "";
-
-    let script = "\n# Execute user templates with predefined scheme colors\n";
+    let script = "# Include user config if it exists\n";
+    script += "set --\n";
     script += `if [ -f '${userConfigPath}' ]; then\n`;
-    // Use --scheme flag with the already-written scheme JSON
-    // Don't pass --mode so user templates get both dark and light colors
-    // Pass --default-mode so "default" in templates resolves to the current theme mode
-    // Pass wallpaper as positional arg so image_path is available in templates
-    script += `  python3 "${templateProcessorScript}" ${wpArg} --scheme '${schemeJsonPathEsc}' --config '${userConfigPath}' --default-mode ${mode}\n`;
-    script += "fi";
+    script += `  set -- --config '${userConfigPath}'\n`;
+    script += "fi\n";
 
     return script;
   }
@@ -595,6 +596,7 @@ Singleton {
       } else if (exitCode === 0) {
         // No pending request and successful completion - emit signal
         root.colorsGenerated();
+        prewarmWallpaperDirectory();
       }
     }
 
@@ -611,6 +613,20 @@ Singleton {
     }
   }
 
+  // ------------
+  Process {
+    id: prewarmProcess
+    workingDirectory: Quickshell.shellDir
+    running: false
+    stderr: StdioCollector {
+      onStreamFinished: {
+        if (this.text) {
+          Logger.d("TemplateProcessor", "prewarmProcess:", this.text.trim());
+        }
+      }
+    }
+  }
+
   // ------------
   Process {
     id: copyProcess